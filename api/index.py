@@ -4,10 +4,26 @@ Autor: Javier Gacitúa | Octubre 2025
 """
 from flask import Flask, request, jsonify
 from pathlib import Path
+from concurrent.futures import Future
 import csv
+import json
+import os
+import queue
+import time
+import threading
+import warnings
+import sys
+import numpy as np
 
 app = Flask(__name__)
 
+SRC_PATH = Path(__file__).parent.parent / 'src'
+
+DATA_PATH = Path(__file__).parent.parent / 'data' / 'raw' / 'train.csv'
+MODEL_PATH = Path(__file__).parent.parent / 'models' / 'saved_models' / 'best_sales_model.pkl'
+MODEL_BUNDLE_PATH = Path(__file__).parent.parent / 'models' / 'saved_models' / 'best_sales_model.bundle.joblib'
+PREPROCESSOR_PATH = Path(__file__).parent.parent / 'models' / 'saved_models' / 'preprocessor.json'
+
 # Datos de respaldo en caso de que no se encuentre el CSV
 FALLBACK_DATA = [
     {'Sales': 261.96, 'Category': 'Furniture', 'Region': 'South', 'Segment': 'Consumer'},
@@ -16,42 +32,735 @@ FALLBACK_DATA = [
     {'Sales': 957.58, 'Category': 'Technology', 'Region': 'West', 'Segment': 'Consumer'},
 ] * 25  # 100 registros de respaldo
 
-def load_data():
-    """Carga datos reales del CSV o datos de respaldo"""
-    data_path = Path(__file__).parent.parent / 'data' / 'raw' / 'train.csv'
+
+class AggregateIndex:
+    """
+    Índice de agregados precalculados por combinación de categorías.
     
-    if not data_path.exists():
-        print("CSV no encontrado, usando datos de respaldo")
-        return FALLBACK_DATA
+    Guarda, para cada celda (combinación de Category, Sub-Category, Region y
+    Segment), count, sum, min, max y un sketch de cuantiles con buckets
+    logarítmicos (tipo DDSketch, error relativo ~1%). Todas las estadísticas
+    son combinables, así que cualquier group-by o filtro sobre las dimensiones
+    se resuelve fusionando celdas en O(grupos) en lugar de O(filas), y las
+    filas nuevas se integran con update() sin recalcular lo anterior.
+    """
     
-    data = []
-    try:
-        with open(data_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for i, row in enumerate(reader):
-                if i >= 200:  # Limitar a 200 registros para Vercel
-                    break
-                
+    RELATIVE_ACCURACY = 0.01
+    MIN_VALUE = 1e-2
+    MAX_VALUE = 1e9
+    
+    def __init__(self, dimensions):
+        self.dimensions = list(dimensions)
+        self.gamma = (1 + self.RELATIVE_ACCURACY) / (1 - self.RELATIVE_ACCURACY)
+        self.log_gamma = np.log(self.gamma)
+        self.key_offset = int(np.floor(np.log(self.MIN_VALUE) / self.log_gamma))
+        self.n_buckets = int(np.ceil(np.log(self.MAX_VALUE) / self.log_gamma)) - self.key_offset + 1
+        self.reset()
+    
+    def reset(self):
+        """Vacía el índice."""
+        self.cell_ids = {}
+        self.cell_keys = np.empty((0, len(self.dimensions)), dtype=np.int32)
+        self.count = np.empty(0, dtype=np.int64)
+        self.sum = np.empty(0, dtype=np.float64)
+        self.min = np.empty(0, dtype=np.float64)
+        self.max = np.empty(0, dtype=np.float64)
+        # Columnas: [negativos | cero | positivos]
+        self.sketch = np.empty((0, 2 * self.n_buckets + 1), dtype=np.int64)
+    
+    def _buckets(self, values):
+        """Asigna cada valor a una columna del sketch."""
+        magnitude = np.clip(np.abs(values), self.MIN_VALUE, self.MAX_VALUE)
+        keys = np.ceil(np.log(magnitude) / self.log_gamma).astype(np.int64) - self.key_offset
+        keys = np.clip(keys, 0, self.n_buckets - 1)
+        columns = np.full(len(values), self.n_buckets, dtype=np.int64)
+        positive = values >= self.MIN_VALUE
+        negative = values <= -self.MIN_VALUE
+        columns[positive] = self.n_buckets + 1 + keys[positive]
+        columns[negative] = self.n_buckets - 1 - keys[negative]
+        return columns
+    
+    def _bucket_values(self):
+        """Valor representativo de cada columna del sketch."""
+        keys = np.arange(self.n_buckets) + self.key_offset
+        magnitude = 2 * self.gamma ** keys / (self.gamma + 1)
+        return np.concatenate([-magnitude[::-1], [0.0], magnitude])
+    
+    def _grow(self, n_new):
+        """Reserva celdas nuevas inicializadas a vacío."""
+        self.count = np.concatenate([self.count, np.zeros(n_new, dtype=np.int64)])
+        self.sum = np.concatenate([self.sum, np.zeros(n_new)])
+        self.min = np.concatenate([self.min, np.full(n_new, np.inf)])
+        self.max = np.concatenate([self.max, np.full(n_new, -np.inf)])
+        self.sketch = np.vstack([self.sketch, np.zeros((n_new, self.sketch.shape[1]), dtype=np.int64)])
+    
+    def update(self, codes, values):
+        """
+        Integra un lote de filas en el índice.
+        
+        Args:
+            codes (dict): Códigos int32 por dimensión para las filas nuevas
+            values (np.ndarray): Valores a agregar (p. ej. Sales)
+        """
+        if len(values) == 0:
+            return
+        
+        keys = np.column_stack([codes[dim] for dim in self.dimensions])
+        combos, inverse = np.unique(keys, axis=0, return_inverse=True)
+        
+        # Resolver el id de celda solo para las combinaciones distintas
+        combo_cells = np.empty(len(combos), dtype=np.int64)
+        new_keys = []
+        for i, combo in enumerate(map(tuple, combos.tolist())):
+            cell = self.cell_ids.get(combo)
+            if cell is None:
+                cell = len(self.cell_ids)
+                self.cell_ids[combo] = cell
+                new_keys.append(combo)
+            combo_cells[i] = cell
+        
+        if new_keys:
+            self.cell_keys = np.vstack([self.cell_keys, np.array(new_keys, dtype=np.int32)])
+            self._grow(len(new_keys))
+        
+        cells = combo_cells[inverse.ravel()]
+        np.add.at(self.count, cells, 1)
+        np.add.at(self.sum, cells, values)
+        np.minimum.at(self.min, cells, values)
+        np.maximum.at(self.max, cells, values)
+        np.add.at(self.sketch, (cells, self._buckets(values)), 1)
+    
+    def query(self, group_by=(), filters=None, quantiles=(0.5,)):
+        """
+        Fusiona celdas para responder un group-by con filtros.
+        
+        Args:
+            group_by (list): Dimensiones por las que agrupar (vacío = total)
+            filters (dict): Dimensión -> lista de códigos permitidos
+            quantiles (tuple): Cuantiles aproximados a devolver
+            
+        Returns:
+            tuple: (claves de grupo como array, dict de estadísticas por grupo)
+        """
+        mask = np.ones(len(self.count), dtype=bool)
+        for dim, allowed in (filters or {}).items():
+            col = self.dimensions.index(dim)
+            mask &= np.isin(self.cell_keys[:, col], allowed)
+        
+        cols = [self.dimensions.index(dim) for dim in group_by]
+        selected = np.flatnonzero(mask)
+        group_keys, inverse = np.unique(self.cell_keys[selected][:, cols], axis=0,
+                                        return_inverse=True)
+        inverse = inverse.ravel()
+        n_groups = len(group_keys)
+        
+        count = np.bincount(inverse, weights=self.count[selected], minlength=n_groups)
+        total = np.bincount(inverse, weights=self.sum[selected], minlength=n_groups)
+        low = np.full(n_groups, np.inf)
+        high = np.full(n_groups, -np.inf)
+        np.minimum.at(low, inverse, self.min[selected])
+        np.maximum.at(high, inverse, self.max[selected])
+        sketch = np.zeros((n_groups, self.sketch.shape[1]), dtype=np.int64)
+        np.add.at(sketch, inverse, self.sketch[selected])
+        
+        stats = {
+            'count': count.astype(np.int64),
+            'sum': total,
+            'mean': np.divide(total, count, out=np.zeros(n_groups), where=count > 0),
+            'min': low,
+            'max': high,
+        }
+        
+        # Cuantiles: primera columna cuya frecuencia acumulada supera q * (n - 1)
+        cumulative = np.cumsum(sketch, axis=1)
+        bucket_values = self._bucket_values()
+        for q in quantiles:
+            rank = q * (count - 1)
+            idx = (cumulative <= rank[:, None]).sum(axis=1)
+            idx = np.minimum(idx, sketch.shape[1] - 1)
+            stats[f'p{q * 100:g}'] = np.clip(bucket_values[idx], low, high)
+        
+        return group_keys, stats
+
+
+class DataStore:
+    """
+    Almacén de datos del proceso con columnas NumPy tipadas.
+    
+    El CSV se carga una sola vez y solo se vuelve a leer cuando cambia su
+    mtime. Si el archivo solo creció (filas añadidas al final), se leen
+    únicamente las filas nuevas y se integran en las columnas y en el índice
+    de agregados. Las columnas categóricas se guardan como códigos int32 más
+    la lista de categorías, de modo que los endpoints trabajan sobre arrays.
+    """
+    
+    NUMERIC_COLUMNS = {
+        'Sales': (np.float64, 0.0),
+        'Quantity': (np.int32, 1),
+        'Discount': (np.float64, 0.0),
+        'Profit': (np.float64, 0.0),
+    }
+    CATEGORICAL_COLUMNS = ['Category', 'Sub-Category', 'Region', 'Segment']
+    VALUE_COLUMN = 'Sales'
+    # Bytes previos al final leído que se comparan para detectar un append
+    APPEND_CHECK_BYTES = 4096
+    
+    def __init__(self, path):
+        self.path = Path(path)
+        self.mtime = None
+        self.offset = 0
+        self.tail_bytes = b''
+        self.fieldnames = None
+        self.n_rows = 0
+        self.numeric = {}
+        self.codes = {}
+        self.categories = {}
+        self._category_index = {}
+        self.aggregates = AggregateIndex(self.CATEGORICAL_COLUMNS)
+        self.source = None
+        self._lock = threading.Lock()
+        self._clear()
+    
+    def _clear(self):
+        """Vacía columnas, categorías y agregados."""
+        self.n_rows = 0
+        self.offset = 0
+        self.tail_bytes = b''
+        self.numeric = {col: np.empty(0, dtype=dtype)
+                        for col, (dtype, _) in self.NUMERIC_COLUMNS.items()}
+        self.codes = {col: np.empty(0, dtype=np.int32) for col in self.CATEGORICAL_COLUMNS}
+        self.categories = {col: [] for col in self.CATEGORICAL_COLUMNS}
+        self._category_index = {col: {} for col in self.CATEGORICAL_COLUMNS}
+        self.aggregates.reset()
+    
+    def refresh(self):
+        """Recarga los datos si el archivo cambió. Devuelve True si recargó."""
+        try:
+            stat = self.path.stat()
+            mtime = stat.st_mtime_ns
+        except OSError:
+            mtime = None
+        
+        if mtime == self.mtime and self.source is not None:
+            return False
+        
+        with self._lock:
+            if mtime == self.mtime and self.source is not None:
+                return False
+            
+            if mtime is None:
+                print("CSV no encontrado, usando datos de respaldo")
+                self._clear()
+                self._append(FALLBACK_DATA)
+                self.source = 'fallback'
+            else:
                 try:
-                    data.append({
-                        'Sales': float(row.get('Sales', 0)),
-                        'Category': row.get('Category', 'Unknown'),
-                        'Sub-Category': row.get('Sub-Category', 'Unknown'),
-                        'Region': row.get('Region', 'Unknown'),
-                        'Segment': row.get('Segment', 'Unknown'),
-                        'Quantity': int(row.get('Quantity', 0)) if row.get('Quantity') else 1,
-                        'Discount': float(row.get('Discount', 0)) if row.get('Discount') else 0,
-                        'Profit': float(row.get('Profit', 0)) if row.get('Profit') else 0
-                    })
-                except (ValueError, KeyError) as e:
-                    print(f"Error procesando fila {i}: {e}")
-                    continue
-        
-        print(f"Datos cargados: {len(data)} registros del CSV")
-        return data if data else FALLBACK_DATA
-    except Exception as e:
-        print(f"Error cargando CSV: {e}")
-        return FALLBACK_DATA
+                    if self.source == 'csv' and self._is_append(stat.st_size):
+                        n_before = self.n_rows
+                        self._read_csv(start=self.offset)
+                        print(f"Datos actualizados: {self.n_rows - n_before} registros nuevos")
+                    else:
+                        self._clear()
+                        self._read_csv()
+                        print(f"Datos cargados: {self.n_rows} registros del CSV")
+                    if self.n_rows == 0:
+                        raise ValueError("CSV sin registros válidos")
+                    self.source = 'csv'
+                except Exception as e:
+                    print(f"Error cargando CSV: {e}")
+                    self._clear()
+                    self._append(FALLBACK_DATA)
+                    self.source = 'fallback'
+            self.mtime = mtime
+            return True
+    
+    def _is_append(self, size):
+        """Comprueba si el archivo conserva intacto lo ya leído."""
+        if size < self.offset or not self.tail_bytes:
+            return False
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset - len(self.tail_bytes))
+            return f.read(len(self.tail_bytes)) == self.tail_bytes
+    
+    def _read_csv(self, start=0):
+        """Lee el CSV desde el byte start e integra las filas validadas."""
+        records = []
+        with open(self.path, 'rb') as f:
+            f.seek(start)
+            data = f.read()
+        
+        # Solo se consumen líneas completas; el resto se lee en la próxima recarga
+        end = data.rfind(b'\n') + 1
+        lines = data[:end].decode('utf-8').splitlines()
+        if start == 0:
+            reader = csv.DictReader(lines)
+        else:
+            reader = csv.DictReader(lines, fieldnames=self.fieldnames)
+        
+        for i, row in enumerate(reader):
+            try:
+                record = {}
+                for col, (dtype, default) in self.NUMERIC_COLUMNS.items():
+                    value = row.get(col)
+                    record[col] = dtype(float(value)) if value else default
+                for col in self.CATEGORICAL_COLUMNS:
+                    record[col] = row.get(col) or 'Unknown'
+                records.append(record)
+            except (ValueError, KeyError) as e:
+                print(f"Error procesando fila {self.n_rows + i}: {e}")
+        
+        if start == 0:
+            self.fieldnames = reader.fieldnames
+        self.offset = start + end
+        self.tail_bytes = data[:end][-self.APPEND_CHECK_BYTES:] if end else self.tail_bytes
+        self._append(records)
+    
+    def _encode(self, col, values):
+        """Codifica etiquetas a int32, ampliando las categorías si hace falta."""
+        index = self._category_index[col]
+        labels = self.categories[col]
+        codes = np.empty(len(values), dtype=np.int32)
+        for i, value in enumerate(values):
+            code = index.get(value)
+            if code is None:
+                code = index[value] = len(labels)
+                labels.append(value)
+            codes[i] = code
+        return codes
+    
+    def _append(self, records):
+        """Añade registros a las columnas NumPy y al índice de agregados."""
+        new_numeric = {}
+        for col, (dtype, default) in self.NUMERIC_COLUMNS.items():
+            new_numeric[col] = np.fromiter((r.get(col, default) for r in records),
+                                           dtype=dtype, count=len(records))
+            self.numeric[col] = np.concatenate([self.numeric[col], new_numeric[col]])
+        
+        new_codes = {}
+        for col in self.CATEGORICAL_COLUMNS:
+            new_codes[col] = self._encode(col, [r.get(col, 'Unknown') for r in records])
+            self.codes[col] = np.concatenate([self.codes[col], new_codes[col]])
+        
+        self.aggregates.update(new_codes, new_numeric[self.VALUE_COLUMN].astype(np.float64))
+        self.n_rows += len(records)
+    
+    def resolve_filters(self, params):
+        """
+        Traduce filtros por etiqueta (p. ej. Region=West,East) a códigos.
+        
+        Args:
+            params (dict): Dimensión -> lista de etiquetas
+            
+        Returns:
+            dict: Dimensión -> lista de códigos
+        """
+        filters = {}
+        for dim, labels in params.items():
+            index = self._category_index[dim]
+            filters[dim] = [index[label] for label in labels if label in index]
+        return filters
+    
+    def group_label(self, dims, key):
+        """Convierte una clave de grupo (códigos) en una etiqueta legible."""
+        return ' | '.join(self.categories[dim][code] for dim, code in zip(dims, key))
+    
+    def records(self, limit=None):
+        """Devuelve las primeras filas como lista de diccionarios."""
+        n = self.n_rows if limit is None else min(limit, self.n_rows)
+        columns = {col: values[:n].tolist() for col, values in self.numeric.items()}
+        for col, codes in self.codes.items():
+            labels = self.categories[col]
+            columns[col] = [labels[c] for c in codes[:n]]
+        return [{col: columns[col][i] for col in columns} for i in range(n)]
+
+
+store = DataStore(DATA_PATH)
+store.refresh()
+
+
+def load_data():
+    """Devuelve el almacén de datos, recargándolo si el CSV cambió"""
+    store.refresh()
+    return store
+
+class ModelService:
+    """
+    Modelo de predicción cargado una sola vez por proceso.
+    
+    Acepta un bundle (ModelBundle: estimador, estado del preprocesador y
+    esquema de features en un archivo) o un modelo suelto guardado con
+    SalesPredictor.save_model (joblib). El archivo se abre con
+    mmap_mode='r' para que los arrays del modelo se compartan entre los
+    procesos trabajadores. Los lotes se puntúan con una única llamada
+    vectorizada a predict, con las columnas en el orden del esquema. Si hay
+    estado de DataPreprocessor (en el bundle o en un JSON aparte), se
+    aplica a cada lote con transform_columns. Si el bundle incluye la
+    versión compilada del modelo (tree_compiler), se predice con sus arrays
+    de nodos mapeados y el estimador no llega a deserializarse, así que los
+    trabajadores comparten una sola copia del bosque. Con compile_trees, los
+    modelos sueltos de árboles se compilan al cargar para evitar el coste
+    fijo por llamada de predict en lotes pequeños; los lotes que superan el
+    punto de cruce (tree_compiler.NATIVE_CROSSOVER_ROWS) siguen usando
+    model.predict.
+    """
+    
+    def __init__(self, path, preprocessor_path=None, max_batch_size=10000, mmap_mode='r',
+                 compile_trees=False):
+        self.path = Path(path)
+        self.preprocessor_path = Path(preprocessor_path) if preprocessor_path else None
+        self.max_batch_size = max_batch_size
+        self.mmap_mode = mmap_mode
+        self.compile_trees = compile_trees
+        self.model = None
+        self.compiled = None
+        self.preprocessor = None
+        self.feature_names = None
+        self.bundle_info = None
+        self.error = None
+    
+    def load(self):
+        """Carga el modelo; deja el motivo en self.error si no es posible."""
+        if not self.path.exists():
+            self.error = f"Modelo no encontrado: {self.path}"
+            print(self.error)
+            return False
+        
+        try:
+            import joblib
+            if str(SRC_PATH) not in sys.path:
+                sys.path.append(str(SRC_PATH))
+            from model_bundle import ModelBundle
+            
+            self.compiled = None
+            payload = joblib.load(self.path, mmap_mode=self.mmap_mode)
+            if ModelBundle.is_bundle(payload):
+                bundle = ModelBundle.from_dict(payload)
+                # Con arrays compilados, el estimador (copia privada de los nodos) no se carga
+                self.compiled = bundle.compiled
+                self.model = bundle.estimator if bundle.compiled is None else None
+                self.feature_names = bundle.feature_names
+                self.preprocessor = bundle.preprocessor
+                self.bundle_info = bundle.summary()
+            else:
+                self.model = payload
+                names = getattr(self.model, 'feature_names_in_', None)
+                self.feature_names = [str(name) for name in names] if names is not None else None
+            self.error = None
+            print(f"Modelo cargado desde: {self.path}")
+        except Exception as e:
+            self.model = None
+            self.compiled = None
+            self.error = f"Error al cargar modelo: {e}"
+            print(self.error)
+            return False
+        
+        # El estado del bundle tiene prioridad sobre el JSON del preprocesador
+        if (self.preprocessor is None and self.preprocessor_path is not None
+                and self.preprocessor_path.exists()):
+            try:
+                from preprocessing import DataPreprocessor
+                self.preprocessor = DataPreprocessor.load(self.preprocessor_path)
+                print(f"Preprocesador cargado desde: {self.preprocessor_path}")
+            except Exception as e:
+                self.model = None
+                self.compiled = None
+                self.error = f"Error al cargar preprocesador: {e}"
+                print(self.error)
+                return False
+        
+        if self.compiled is None and self.compile_trees:
+            try:
+                from tree_compiler import compile_model
+                self.compiled = compile_model(self.model)
+            except Exception as e:
+                # Sin compilar se sigue sirviendo con model.predict
+                self.compiled = None
+                print(f"No se pudo compilar el modelo: {e}")
+        if self.compiled is not None:
+            # Primera llamada aquí para no pagar la compilación de Numba en una petición
+            self.compiled.predict(np.zeros((1, self.compiled.n_features)))
+            print(f"Modelo compilado: {self.compiled.n_trees} árboles")
+        return True
+    
+    @property
+    def available(self):
+        return self.model is not None or self.compiled is not None
+    
+    def to_matrix(self, rows):
+        """
+        Convierte filas (diccionarios o listas) en una matriz float64.
+        
+        Args:
+            rows (list): Filas como dict (por nombre de feature) o listas
+            
+        Returns:
+            np.ndarray: Matriz (n_filas, n_features)
+        """
+        if rows and isinstance(rows[0], dict):
+            if self.feature_names is None:
+                raise ValueError("El modelo no guarda nombres de features; envía filas como listas")
+            # Columnas crudas: las de hash/one-hot se calculan desde su columna de origen
+            inputs = self.feature_names
+            imputed = set()
+            if self.preprocessor is not None:
+                inputs = self.preprocessor.input_columns(self.feature_names)
+                # Las features que el preprocesador imputa pueden omitirse
+                imputed = set(self.preprocessor.state['impute'])
+            missing = sorted({f for row in rows for f in inputs
+                              if f not in row and f not in imputed})
+            if missing:
+                raise ValueError(f"Faltan features: {missing}")
+            
+            columns = {f: [row.get(f) for row in rows] for f in inputs}
+            if self.preprocessor is not None:
+                columns = self.preprocessor.transform_columns(columns)
+            X = np.column_stack([np.asarray(columns[f], dtype=np.float64)
+                                 for f in self.feature_names])
+        else:
+            X = np.asarray(rows, dtype=np.float64)
+            if X.ndim != 2:
+                raise ValueError("Cada fila debe ser una lista de valores o un objeto")
+        
+        # Un ancho incorrecto rompería el lote completo del micro-batcher
+        n_features = self.n_features
+        if n_features is not None and X.shape[1] != n_features:
+            raise ValueError(f"Cada fila debe tener {n_features} features (recibidas {X.shape[1]})")
+        if not np.isfinite(X).all():
+            raise ValueError("Las features deben ser números finitos")
+        return X
+    
+    @property
+    def n_features(self):
+        """Número de features que espera el modelo (None si no se conoce)."""
+        if self.feature_names is not None:
+            return len(self.feature_names)
+        if self.compiled is not None:
+            return self.compiled.n_features
+        return getattr(self.model, 'n_features_in_', None)
+    
+    def predict(self, X):
+        """Puntúa una matriz completa en una sola llamada al modelo."""
+        # Lotes grandes con el estimador en memoria: el predict nativo es más rápido
+        if self.compiled is not None and not (self.model is not None
+                                              and self.compiled.native_is_faster(len(X))):
+            return self.compiled.predict(X)
+        with warnings.catch_warnings():
+            # La matriz ya sigue el orden de feature_names_in_
+            warnings.filterwarnings('ignore', message='X does not have valid feature names')
+            return np.asarray(self.model.predict(X), dtype=np.float64)
+
+
+class Histogram:
+    """Histograma de buckets fijos, seguro entre hilos."""
+    
+    def __init__(self, bounds):
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self._lock = threading.Lock()
+    
+    def observe(self, value):
+        """Registra una observación."""
+        idx = int(np.searchsorted(self.bounds, value, side='left'))
+        with self._lock:
+            self.counts[idx] += 1
+            self.count += 1
+            self.total += value
+    
+    def snapshot(self):
+        """Devuelve los conteos por bucket (el último bucket no tiene límite)."""
+        with self._lock:
+            return {
+                'bounds': self.bounds,
+                'counts': list(self.counts),
+                'count': self.count,
+                'mean': round(self.total / self.count, 3) if self.count else 0.0
+            }
+
+
+class MicroBatcher:
+    """
+    Agrupa peticiones concurrentes en una sola llamada a predict.
+    
+    Un hilo de fondo toma peticiones de la cola durante hasta max_wait_ms o
+    hasta reunir max_rows filas, apila las matrices, llama una vez a
+    predict_fn y reparte los resultados a cada petición. Expone histogramas
+    de latencia (ms, desde que se encola hasta que se responde) y de tamaño
+    de lote.
+    """
+    
+    LATENCY_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 250, 500, 1000]
+    BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024]
+    
+    def __init__(self, predict_fn, max_rows=256, max_wait_ms=5.0, timeout_s=30.0):
+        self.predict_fn = predict_fn
+        self.max_rows = max_rows
+        self.max_wait_ms = max_wait_ms
+        self.timeout_s = timeout_s
+        self.latency_ms = Histogram(self.LATENCY_BUCKETS_MS)
+        self.batch_size = Histogram(self.BATCH_SIZE_BUCKETS)
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+    
+    def _ensure_started(self):
+        """Arranca el hilo de fondo la primera vez (tras un posible fork)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+                self._thread.start()
+    
+    def submit(self, X):
+        """
+        Encola una matriz y espera sus predicciones.
+        
+        Args:
+            X (np.ndarray): Matriz (n_filas, n_features)
+            
+        Returns:
+            np.ndarray: Predicciones de las filas de X
+        """
+        self._ensure_started()
+        future = Future()
+        self._queue.put((X, future, time.perf_counter()))
+        return future.result(timeout=self.timeout_s)
+    
+    def _collect(self):
+        """Espera la primera petición y acumula más hasta el límite de tiempo o filas."""
+        batch = [self._queue.get()]
+        n_rows = len(batch[0][0])
+        deadline = time.perf_counter() + self.max_wait_ms / 1000
+        
+        while n_rows < self.max_rows:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            n_rows += len(item[0])
+        
+        return batch, n_rows
+    
+    def _run(self):
+        while True:
+            batch, n_rows = self._collect()
+            self.batch_size.observe(n_rows)
+            
+            # Se agrupan por ancho para que una petición mal formada no falle el resto
+            by_width = {}
+            for item in batch:
+                by_width.setdefault(item[0].shape[1:], []).append(item)
+            for group in by_width.values():
+                self._predict_group(group)
+    
+    def _predict_group(self, group):
+        """Predice un grupo de peticiones del mismo ancho; si falla, una a una."""
+        try:
+            predictions = self.predict_fn(np.vstack([X for X, _, _ in group]))
+        except Exception as e:
+            if len(group) == 1:
+                group[0][1].set_exception(e)
+                return
+            for item in group:
+                self._predict_group([item])
+            return
+        
+        offsets = np.cumsum([0] + [len(X) for X, _, _ in group])
+        done = time.perf_counter()
+        for i, (_, future, enqueued) in enumerate(group):
+            future.set_result(predictions[offsets[i]:offsets[i + 1]])
+            self.latency_ms.observe((done - enqueued) * 1000)
+    
+    def metrics(self):
+        """Histogramas de latencia y tamaño de lote."""
+        return {
+            'latency_ms': self.latency_ms.snapshot(),
+            'batch_size': self.batch_size.snapshot(),
+            'max_rows': self.max_rows,
+            'max_wait_ms': self.max_wait_ms,
+            'queue_size': self._queue.qsize()
+        }
+
+
+def parse_prediction_rows(req):
+    """
+    Lee las filas de una petición JSON (objeto o array) o NDJSON.
+    
+    Returns:
+        tuple: (filas, True si la petición era un único objeto)
+    """
+    content_type = (req.content_type or '').split(';')[0].strip()
+    if content_type in ('application/x-ndjson', 'application/ndjson'):
+        lines = req.get_data(as_text=True).splitlines()
+        return [json.loads(line) for line in lines if line.strip()], False
+    
+    payload = req.get_json(force=True)
+    if isinstance(payload, dict):
+        rows = payload.get('rows')
+        if isinstance(rows, list):
+            return rows, False
+        return [payload], True
+    if isinstance(payload, list):
+        return payload, False
+    raise ValueError("Se esperaba un objeto, un array de filas o NDJSON")
+
+
+model_service = ModelService(
+    os.environ.get('MODEL_PATH') or (MODEL_BUNDLE_PATH if MODEL_BUNDLE_PATH.exists() else MODEL_PATH),
+    preprocessor_path=os.environ.get('PREPROCESSOR_PATH', PREPROCESSOR_PATH),
+    max_batch_size=int(os.environ.get('PREDICT_MAX_BATCH', 10000)),
+    compile_trees=os.environ.get('COMPILE_TREES', '0') == '1'
+)
+model_service.load()
+
+# Las peticiones pequeñas se agrupan; los lotes grandes van directo al modelo
+batcher = MicroBatcher(
+    model_service.predict,
+    max_rows=int(os.environ.get('BATCH_MAX_ROWS', 256)),
+    max_wait_ms=float(os.environ.get('BATCH_MAX_WAIT_MS', 5))
+)
+
+
+def parse_aggregate_query(args, default_group_by=()):
+    """
+    Lee group_by, filtros y cuantiles de los parámetros de la petición.
+    
+    Ejemplo: ?group_by=Region,Segment&Category=Furniture&quantiles=0.5,0.9
+    
+    Returns:
+        tuple: (group_by, filtros por etiqueta, cuantiles)
+    """
+    dimensions = DataStore.CATEGORICAL_COLUMNS
+    group_by = [d for d in args.get('group_by', ','.join(default_group_by)).split(',') if d]
+    unknown = [d for d in group_by if d not in dimensions]
+    if unknown:
+        raise ValueError(f"Dimensiones no válidas: {unknown}. Disponibles: {dimensions}")
+    
+    filters = {dim: args.get(dim).split(',') for dim in dimensions if args.get(dim)}
+    quantiles = [float(q) for q in args.get('quantiles', '0.5').split(',') if q]
+    if any(not 0 <= q <= 1 for q in quantiles):
+        raise ValueError("Los cuantiles deben estar entre 0 y 1")
+    
+    return group_by, filters, quantiles
+
+
+def aggregate_groups(data, group_by, filters, quantiles):
+    """Consulta el índice de agregados y devuelve estadísticas por grupo."""
+    keys, stats = data.aggregates.query(group_by, data.resolve_filters(filters), quantiles)
+    groups = {}
+    for i, key in enumerate(keys):
+        label = data.group_label(group_by, key) if group_by else 'total'
+        groups[label] = {
+            name: (int(values[i]) if name == 'count' else round(float(values[i]), 2))
+            for name, values in stats.items()
+        }
+    return groups
 
 @app.route('/')
 def home():
@@ -85,19 +794,28 @@ def home():
 
 @app.route('/api/stats')
 def get_stats():
-    """API: Estadísticas del dataset"""
+    """API: Estadísticas del dataset (admite group_by y filtros)"""
+    try:
+        group_by, filters, quantiles = parse_aggregate_query(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
     try:
         data = load_data()
-        sales = [record['Sales'] for record in data]
+        total = aggregate_groups(data, [], filters, sorted(set(quantiles) | {0.5})).get('total')
+        if total is None:
+            return jsonify({'total_records': 0})
         
         stats = {
-            'total_records': len(data),
-            'mean_sales': round(sum(sales) / len(sales), 2),
-            'max_sales': round(max(sales), 2),
-            'min_sales': round(min(sales), 2),
-            'total_sales': round(sum(sales), 2),
-            'median_sales': round(sorted(sales)[len(sales) // 2], 2)
+            'total_records': total['count'],
+            'mean_sales': total['mean'],
+            'max_sales': total['max'],
+            'min_sales': total['min'],
+            'total_sales': total['sum'],
+            'median_sales': total['p50']
         }
+        if group_by:
+            stats['groups'] = aggregate_groups(data, group_by, filters, quantiles)
         
         return jsonify(stats)
     except Exception as e:
@@ -110,57 +828,52 @@ def get_data():
         data = load_data()
         
         # Limitar a 50 registros para gráficos
-        sample = data[:50]
+        sample = data.records(limit=50)
         
         return jsonify({
             'data': sample,
             'columns': ['Sales', 'Category', 'Region', 'Segment'],
-            'total_records': len(data)
+            'total_records': data.n_rows
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/categories')
 def get_categories():
-    """API: Análisis por categorías"""
+    """API: Análisis por categorías (admite group_by y filtros)"""
+    try:
+        group_by, filters, quantiles = parse_aggregate_query(request.args, ('Category',))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
     try:
         data = load_data()
         
-        # Agrupar por categoría manualmente
-        categories = {}
-        for record in data:
-            cat = record['Category']
-            if cat not in categories:
-                categories[cat] = {'sales': [], 'count': 0}
-            categories[cat]['sales'].append(record['Sales'])
-            categories[cat]['count'] += 1
-        
-        # Calcular estadísticas
-        category_stats = {}
-        for cat, info in categories.items():
-            category_stats[cat] = {
-                'sum': round(sum(info['sales']), 2),
-                'mean': round(sum(info['sales']) / info['count'], 2),
-                'count': info['count']
-            }
-        
         return jsonify({
-            'categories': category_stats,
-            'category_column': 'Category'
+            'categories': aggregate_groups(data, group_by, filters, quantiles),
+            'category_column': ','.join(group_by)
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/predict', methods=['POST'])
 def predict():
-    """API: Predicción simple (simulada)"""
+    """API: Predicción por lotes con el modelo entrenado (JSON o NDJSON)"""
     try:
-        data = request.json
+        rows, single = parse_prediction_rows(request)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if not model_service.available:
+        if not single:
+            return jsonify({'error': model_service.error or 'Modelo no disponible'}), 503
         
-        # Predicción simulada basada en precio
-        # En producción, aquí cargarías un modelo .pkl
-        price = float(data.get('price', 100))
-        quantity = int(data.get('quantity', 1))
+        # Sin modelo: predicción simulada basada en precio
+        try:
+            price = float(rows[0].get('price', 100))
+            quantity = int(rows[0].get('quantity', 1))
+        except (TypeError, ValueError, AttributeError) as e:
+            return jsonify({'error': str(e)}), 400
         
         # Fórmula simple de predicción
         base_prediction = price * quantity * 1.15  # 15% de margen
@@ -168,10 +881,51 @@ def predict():
         return jsonify({
             'prediction': round(base_prediction, 2),
             'status': 'success',
-            'note': 'Predicción simulada. En producción usaría modelo ML entrenado.'
+            'note': 'Predicción simulada. No se encontró un modelo entrenado.'
         })
-    except Exception as e:
+    
+    if len(rows) > model_service.max_batch_size:
+        return jsonify({
+            'error': f"Lote de {len(rows)} filas supera el máximo de {model_service.max_batch_size}"
+        }), 413
+    
+    try:
+        X = model_service.to_matrix(rows)
+    except (TypeError, ValueError, KeyError) as e:
         return jsonify({'error': str(e)}), 400
+    
+    try:
+        start = time.perf_counter()
+        if len(X) < batcher.max_rows:
+            predictions = batcher.submit(X)
+        else:
+            predictions = model_service.predict(X)
+        model_time_ms = (time.perf_counter() - start) * 1000
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    
+    if single:
+        return jsonify({
+            'prediction': round(float(predictions[0]), 2),
+            'status': 'success'
+        })
+    
+    return jsonify({
+        'predictions': np.round(predictions, 2).tolist(),
+        'count': len(predictions),
+        'model_time_ms': round(model_time_ms, 3),
+        'status': 'success'
+    })
+
+@app.route('/api/metrics')
+def metrics():
+    """API: Histogramas del micro-batcher de predicción"""
+    return jsonify({
+        'model_loaded': model_service.available,
+        'model': model_service.bundle_info,
+        'compiled': model_service.compiled is not None,
+        'micro_batching': batcher.metrics()
+    })
 
 @app.route('/api/health')
 def health():
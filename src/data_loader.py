@@ -7,9 +7,85 @@ URL: https://www.kaggle.com/datasets/rohitsahoo/sales-forecasting
 """
 
 import os
+import re
+import hashlib
 import pandas as pd
 from pathlib import Path
 
+
+# Explicit schema for the Superstore sales export
+CATEGORICAL_COLUMNS = ['Ship Mode', 'Segment', 'Region', 'Category', 'Sub-Category']
+DATE_COLUMNS = ['Order Date', 'Ship Date']
+DATE_FORMAT = '%d/%m/%Y'
+SALES_SCHEMA = {
+    'Row ID': 'int32',
+    'Postal Code': 'Int32',
+    'Sales': 'float32',
+    **{col: 'category' for col in CATEGORICAL_COLUMNS},
+}
+
+# Bytes hashed from the head and tail of the source file for the cache key
+FINGERPRINT_SAMPLE_BYTES = 1024 * 1024
+
+
+def file_fingerprint(file_path):
+    """
+    Compute a cheap fingerprint of a file (size + mtime + sampled content hash).
+    
+    Only the first and last FINGERPRINT_SAMPLE_BYTES are hashed, so the cost
+    is constant regardless of file size.
+    
+    Args:
+        file_path (str or Path): File to fingerprint
+        
+    Returns:
+        str: Hex digest identifying the current file contents
+    """
+    file_path = Path(file_path)
+    stat = file_path.stat()
+    digest = hashlib.sha1(f"{stat.st_size}:{stat.st_mtime_ns}".encode())
+    
+    with open(file_path, 'rb') as f:
+        digest.update(f.read(FINGERPRINT_SAMPLE_BYTES))
+        if stat.st_size > 2 * FINGERPRINT_SAMPLE_BYTES:
+            f.seek(-FINGERPRINT_SAMPLE_BYTES, os.SEEK_END)
+            digest.update(f.read(FINGERPRINT_SAMPLE_BYTES))
+    
+    return digest.hexdigest()[:16]
+
+
+def apply_schema(df):
+    """
+    Cast a raw sales frame to the explicit dtype schema.
+    
+    Columns missing from the frame are ignored, so the function also works
+    on subsets or on other exports sharing some of the columns.
+    
+    Args:
+        df (pd.DataFrame): Frame as returned by pd.read_csv
+        
+    Returns:
+        pd.DataFrame: Same frame with typed columns
+    """
+    for col in DATE_COLUMNS:
+        if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = pd.to_datetime(df[col], format=DATE_FORMAT, errors='coerce')
+    
+    for col, dtype in SALES_SCHEMA.items():
+        if col in df.columns and df[col].dtype != dtype:
+            df[col] = df[col].astype(dtype)
+    
+    return df
+
+
+def _parquet_available():
+    """Return True if a Parquet engine (pyarrow) is installed."""
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
 class DataLoader:
     """Clase para gestionar la descarga y carga de datos"""
     
@@ -17,6 +93,7 @@ class DataLoader:
         self.base_path = Path(base_path)
         self.raw_path = self.base_path / 'raw'
         self.processed_path = self.base_path / 'processed'
+        self.cache_path = self.processed_path / 'cache'
         
         # Crear directorios si no existen
         self.raw_path.mkdir(parents=True, exist_ok=True)
@@ -85,12 +162,76 @@ class DataLoader:
             print(f"Error loading CSV: {e}")
             return None
     
-    def load_from_local(self, filename='train.csv'):
+    def _cache_file(self, file_path):
+        """
+        Build the cache file path for a source file.
+        
+        Args:
+            file_path (Path): Source CSV file
+            
+        Returns:
+            Path: Cache file keyed by the source fingerprint
+        """
+        suffix = '.parquet' if _parquet_available() else '.pkl'
+        key = file_fingerprint(file_path)
+        return self.cache_path / f"{file_path.stem}-{key}{suffix}"
+    
+    def _write_cache(self, df, cache_file):
+        """
+        Store a typed frame in the columnar cache, removing stale entries.
+        
+        Args:
+            df (pd.DataFrame): Typed dataset
+            cache_file (Path): Destination returned by _cache_file
+        """
+        self.cache_path.mkdir(parents=True, exist_ok=True)
+        # Only <stem>-<fingerprint>.<ext> of this same source: a prefix glob would
+        # also match other sources such as 'train-2024' for 'train'
+        stem = cache_file.name.rsplit('-', 1)[0]
+        pattern = re.compile(re.escape(stem) + r'-[0-9a-f]{16}\.(parquet|pkl)(\.tmp)?')
+        for stale in self.cache_path.iterdir():
+            if stale != cache_file and pattern.fullmatch(stale.name):
+                stale.unlink()
+        
+        tmp_file = cache_file.with_name(cache_file.name + '.tmp')
+        if cache_file.suffix == '.parquet':
+            df.to_parquet(tmp_file, index=False)
+        else:
+            df.to_pickle(tmp_file)
+        tmp_file.replace(cache_file)
+    
+    def _read_cache(self, cache_file):
+        """
+        Read a frame from the columnar cache.
+        
+        Args:
+            cache_file (Path): Cache file returned by _cache_file
+            
+        Returns:
+            pd.DataFrame: Cached dataset
+        """
+        if cache_file.suffix == '.parquet':
+            df = pd.read_parquet(cache_file)
+            # pyarrow shares read-only buffers for categorical codes
+            for col in df.select_dtypes(include=['category']).columns:
+                df[col] = df[col].copy()
+            return df
+        return pd.read_pickle(cache_file)
+    
+    def load_from_local(self, filename='train.csv', use_cache=True, optimize_memory=False):
         """
         Load dataset from local file.
         
+        The parsed frame is typed with SALES_SCHEMA and stored in
+        data/processed/cache as Parquet (pickle if pyarrow is missing),
+        keyed by the source file fingerprint. Later loads of an unchanged
+        file read the cache instead of re-parsing the CSV.
+        
         Args:
             filename (str): Name of the file to load
+            use_cache (bool): Read/write the columnar cache
+            optimize_memory (bool): Downcast the remaining columns with
+                DataPreprocessor.optimize_memory after loading
             
         Returns:
             pd.DataFrame: Loaded dataset, None if failed
@@ -102,13 +243,73 @@ class DataLoader:
             print(f"Place {filename} in: {self.raw_path}")
             return None
         
+        cache_file = self._cache_file(file_path) if use_cache else None
+        if cache_file is not None and cache_file.exists():
+            try:
+                df = self._read_cache(cache_file)
+                print(f"Dataset loaded from cache: {df.shape[0]:,} rows, {df.shape[1]} columns")
+                return self._optimize(df) if optimize_memory else df
+            except Exception as e:
+                print(f"Error reading cache, re-parsing CSV: {e}")
+        
         try:
-            df = pd.read_csv(file_path)
+            df = pd.read_csv(file_path, dtype={'Postal Code': 'float64'})
+            df = apply_schema(df)
             print(f"Dataset loaded from local: {df.shape[0]:,} rows, {df.shape[1]} columns")
-            return df
         except Exception as e:
             print(f"Error loading file: {e}")
             return None
+        
+        if cache_file is not None:
+            try:
+                self._write_cache(df, cache_file)
+                print(f"Cache saved to: {cache_file}")
+            except Exception as e:
+                print(f"Error saving cache: {e}")
+        
+        return self._optimize(df) if optimize_memory else df
+    
+    def _optimize(self, df):
+        """
+        Apply DataPreprocessor.optimize_memory to a loaded frame.
+        
+        Args:
+            df (pd.DataFrame): Loaded dataset
+            
+        Returns:
+            pd.DataFrame: Same dataset with the smallest safe dtypes
+        """
+        from preprocessing import DataPreprocessor
+        return DataPreprocessor().optimize_memory(df, inplace=True)
+    
+    def iter_chunks(self, filename='train.csv', chunksize=100_000):
+        """
+        Stream a local dataset in typed chunks with bounded memory.
+        
+        Peak memory depends on chunksize only, not on the file size. Each
+        chunk is cast with apply_schema; categorical columns get the
+        categories present in that chunk, so use union_categoricals (or
+        astype(str)) if chunks are later concatenated.
+        
+        Args:
+            filename (str): Name of the file to load
+            chunksize (int): Rows per chunk
+            
+        Yields:
+            pd.DataFrame: Typed chunk of the dataset
+        """
+        file_path = self.raw_path / filename
+        
+        if not file_path.exists():
+            print(f"File not found: {file_path}")
+            print(f"Place {filename} in: {self.raw_path}")
+            return
+        
+        reader = pd.read_csv(file_path, chunksize=chunksize,
+                             dtype={'Postal Code': 'float64'})
+        with reader:
+            for chunk in reader:
+                yield apply_schema(chunk)
     
     def load_dataset(self, force_download=False):
         """
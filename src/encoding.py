@@ -0,0 +1,391 @@
+"""
+Encoding Module
+===============
+Codificadores para variables categóricas de alta cardinalidad (Product ID,
+Customer ID, City, Product Name...) con memoria acotada.
+
+- HashingEncoder: feature hashing a una matriz dispersa de ancho fijo; no
+  necesita ajuste y las categorías nuevas no cambian el número de columnas.
+- FrequencyEncoder: sustituye cada categoría por su frecuencia relativa.
+- TargetEncoder: media suavizada del target por categoría, con valores
+  out-of-fold en entrenamiento para no filtrar el target al modelo.
+- OneHotEncoder: indicadoras construidas directamente como matriz CSR.
+
+to_sparse_matrix() convierte un DataFrame (columnas densas y dispersas) en
+una matriz CSR con su índice de nombres de features sin densificar nada.
+
+Todos guardan su estado como diccionarios serializables en JSON (to_dict /
+encoder_from_dict), de modo que los mapas ajustados se reutilizan en
+inferencia, y trabajan sobre columnas NumPy (dict nombre -> array).
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+
+MISSING_TOKEN = '__missing__'
+
+
+def _as_str(values):
+    """Convierte valores a texto, con un token fijo para los faltantes."""
+    values = pd.Series(np.asarray(values, dtype=object))
+    return values.where(values.notna(), MISSING_TOKEN).astype(str).to_numpy(dtype=object)
+
+
+def _lookup(keys, mapped, values, default):
+    """Busca cada valor en keys y devuelve el valor asociado (default si no existe)."""
+    index = pd.Index(np.asarray(keys, dtype=object)).get_indexer(_as_str(values))
+    mapped = np.asarray(mapped, dtype=np.float64)
+    return np.where(index >= 0, mapped[index] if len(mapped) else default, default)
+
+
+def _get_column(data, col):
+    """Columna de un DataFrame o de un diccionario de arrays."""
+    values = data[col]
+    return values.to_numpy(dtype=object) if hasattr(values, 'to_numpy') else values
+
+
+class HashingEncoder:
+    """Feature hashing de varias columnas a una matriz CSR de n_features columnas."""
+
+    kind = 'hash'
+
+    def __init__(self, columns, n_features=1024, alternate_sign=True, prefix='hash'):
+        """
+        Inicializa el codificador.
+
+        Args:
+            columns (list): Columnas categóricas a codificar
+            n_features (int): Ancho fijo de la matriz de salida
+            alternate_sign (bool): Signo según el hash para que las colisiones se compensen
+            prefix (str): Prefijo de los nombres de las columnas de salida
+        """
+        self.columns = list(columns)
+        self.n_features = int(n_features)
+        self.alternate_sign = alternate_sign
+        self.prefix = prefix
+
+    def fit(self, data, y=None):
+        """No aprende nada: el hash no depende de los datos."""
+        return self
+
+    @property
+    def feature_names(self):
+        return [f'{self.prefix}_{i}' for i in range(self.n_features)]
+
+    def transform_sparse(self, data):
+        """
+        Codifica las columnas en una matriz dispersa.
+
+        Cada valor se convierte en el token 'columna=valor' y se le aplica un
+        hash estable (pd.util.hash_array), calculado solo una vez por valor único.
+
+        Args:
+            data: DataFrame o diccionario de arrays con las columnas
+
+        Returns:
+            scipy.sparse.csr_matrix: Matriz (n_filas, n_features)
+        """
+        rows, cols, vals = [], [], []
+        n_rows = None
+        for col in self.columns:
+            values = _as_str(_get_column(data, col))
+            n_rows = len(values)
+            codes, uniques = pd.factorize(values)
+            tokens = np.array([f'{col}={u}' for u in uniques], dtype=object)
+            hashes = pd.util.hash_array(tokens) if len(tokens) else np.array([], dtype=np.uint64)
+            bucket = (hashes % np.uint64(self.n_features)).astype(np.int32)
+            sign = np.where(hashes >> np.uint64(63), -1.0, 1.0) if self.alternate_sign \
+                else np.ones(len(hashes))
+            rows.append(np.arange(n_rows, dtype=np.int32))
+            cols.append(bucket[codes])
+            vals.append(sign[codes])
+
+        n_rows = n_rows or 0
+        if not rows:
+            return sparse.csr_matrix((n_rows, self.n_features))
+        # Las colisiones dentro de una fila se suman al convertir a CSR
+        return sparse.csr_matrix(
+            (np.concatenate(vals), (np.concatenate(rows), np.concatenate(cols))),
+            shape=(n_rows, self.n_features)
+        )
+
+    def transform_columns(self, columns):
+        """Versión densa para lotes pequeños: una columna por bucket."""
+        matrix = self.transform_sparse(columns).toarray()
+        return {name: matrix[:, i] for i, name in enumerate(self.feature_names)}
+
+    def to_dict(self):
+        return {'type': self.kind, 'columns': self.columns, 'n_features': self.n_features,
+                'alternate_sign': self.alternate_sign, 'prefix': self.prefix}
+
+
+class FrequencyEncoder:
+    """Frecuencia relativa (o conteo) de cada categoría."""
+
+    kind = 'frequency'
+
+    def __init__(self, columns, normalize=True, maps=None):
+        """
+        Inicializa el codificador.
+
+        Args:
+            columns (list): Columnas a codificar
+            normalize (bool): Frecuencia relativa (True) o conteo absoluto
+            maps (dict): Mapas ya ajustados (al reconstruir desde to_dict)
+        """
+        self.columns = list(columns)
+        self.normalize = normalize
+        self.maps = maps or {}
+
+    def fit(self, data, y=None):
+        """Cuenta las categorías de cada columna."""
+        for col in self.columns:
+            counts = pd.Series(_as_str(_get_column(data, col))).value_counts()
+            values = counts / counts.sum() if self.normalize else counts
+            self.maps[col] = {'keys': counts.index.tolist(), 'values': values.astype(float).tolist()}
+        return self
+
+    def transform_columns(self, columns):
+        """Sustituye cada categoría por su frecuencia; las no vistas valen 0."""
+        return {col: _lookup(self.maps[col]['keys'], self.maps[col]['values'], columns[col], 0.0)
+                for col in self.columns if col in columns}
+
+    def to_dict(self):
+        return {'type': self.kind, 'columns': self.columns, 'normalize': self.normalize,
+                'maps': self.maps}
+
+
+class TargetEncoder:
+    """Media del target por categoría con suavizado y valores out-of-fold."""
+
+    kind = 'target'
+
+    def __init__(self, columns, smoothing=10.0, n_folds=5, random_state=42, prior=None, maps=None):
+        """
+        Inicializa el codificador.
+
+        La codificación es (suma_target + smoothing * media_global) /
+        (conteo + smoothing): las categorías con pocas filas se acercan a la
+        media global.
+
+        Args:
+            columns (list): Columnas a codificar
+            smoothing (float): Peso de la media global
+            n_folds (int): Folds para los valores out-of-fold de entrenamiento
+            random_state (int): Semilla para asignar folds
+            prior (float): Media global (al reconstruir desde to_dict)
+            maps (dict): Mapas ya ajustados (al reconstruir desde to_dict)
+        """
+        self.columns = list(columns)
+        self.smoothing = float(smoothing)
+        self.n_folds = int(n_folds)
+        self.random_state = random_state
+        self.prior = prior
+        self.maps = maps or {}
+        self.oof_ = {}
+
+    def fit(self, data, y):
+        """
+        Ajusta los mapas con todas las filas y calcula los valores out-of-fold.
+
+        Tras fit, self.oof_ tiene para cada columna la codificación de cada
+        fila calculada sin su propio fold; es la que debe usarse para entrenar.
+        """
+        if y is None:
+            raise ValueError("TargetEncoder necesita el target")
+        y = np.asarray(y, dtype=np.float64)
+        self.prior = float(np.mean(y))
+        s = self.smoothing
+
+        n_folds = max(2, min(self.n_folds, len(y)))
+        folds = np.random.default_rng(self.random_state).permutation(len(y)) % n_folds
+
+        for col in self.columns:
+            codes, uniques = pd.factorize(_as_str(_get_column(data, col)))
+            n_unique = len(uniques)
+            sums = np.bincount(codes, weights=y, minlength=n_unique)
+            counts = np.bincount(codes, minlength=n_unique).astype(np.float64)
+            self.maps[col] = {
+                'keys': uniques.tolist(),
+                'values': ((sums + s * self.prior) / (counts + s)).tolist()
+            }
+
+            # Estadísticas de cada fold con un solo bincount; fuera del fold = total - fold
+            cell = folds * n_unique + codes
+            fold_sums = np.bincount(cell, weights=y, minlength=n_folds * n_unique)
+            fold_counts = np.bincount(cell, minlength=n_folds * n_unique)
+            out_sums = sums[codes] - fold_sums[cell]
+            out_counts = counts[codes] - fold_counts[cell]
+            self.oof_[col] = (out_sums + s * self.prior) / (out_counts + s)
+        return self
+
+    def transform_columns(self, columns):
+        """Sustituye cada categoría por su media suavizada; las no vistas reciben la media global."""
+        return {col: _lookup(self.maps[col]['keys'], self.maps[col]['values'], columns[col], self.prior)
+                for col in self.columns if col in columns}
+
+    def to_dict(self):
+        return {'type': self.kind, 'columns': self.columns, 'smoothing': self.smoothing,
+                'n_folds': self.n_folds, 'random_state': self.random_state,
+                'prior': self.prior, 'maps': self.maps}
+
+
+class OneHotEncoder:
+    """One-hot de categorías vistas en fit, directamente a matriz CSR."""
+
+    kind = 'onehot'
+
+    def __init__(self, columns, drop_first=True, categories=None, prefix_sep='_'):
+        """
+        Inicializa el codificador.
+
+        Args:
+            columns (list): Columnas categóricas a codificar
+            drop_first (bool): Omitir la primera categoría (como pd.get_dummies)
+            categories (dict): Categorías ya ajustadas (al reconstruir desde to_dict)
+            prefix_sep (str): Separador entre columna y categoría en los nombres
+        """
+        self.columns = list(columns)
+        self.drop_first = drop_first
+        self.categories = categories or {}
+        self.prefix_sep = prefix_sep
+
+    def fit(self, data, y=None):
+        """Aprende las categorías ordenadas de cada columna (los faltantes no generan columna)."""
+        for col in self.columns:
+            values = pd.Series(_get_column(data, col)).dropna().astype(str)
+            self.categories[col] = sorted(values.unique().tolist())
+        return self
+
+    def _kept(self, col):
+        """Categorías que generan columna."""
+        categories = self.categories[col]
+        return categories[1:] if self.drop_first else categories
+
+    @property
+    def feature_names(self):
+        return [f'{col}{self.prefix_sep}{cat}' for col in self.columns for cat in self._kept(col)]
+
+    def transform_sparse(self, data):
+        """
+        Codifica las columnas en una matriz CSR de indicadoras.
+
+        Las categorías no vistas, los faltantes y la categoría omitida con
+        drop_first dejan la fila a cero en esa columna.
+
+        Args:
+            data: DataFrame o diccionario de arrays con las columnas
+
+        Returns:
+            scipy.sparse.csr_matrix: Matriz (n_filas, len(feature_names))
+        """
+        rows, cols = [], []
+        n_rows, offset = 0, 0
+        for col in self.columns:
+            values = pd.Series(_get_column(data, col))
+            n_rows = len(values)
+            kept = self._kept(col)
+            index = pd.Index(kept).get_indexer(values.astype(str).where(values.notna()))
+            present = np.flatnonzero(index >= 0)
+            rows.append(present.astype(np.int32))
+            cols.append((index[present] + offset).astype(np.int32))
+            offset += len(kept)
+
+        if not rows:
+            return sparse.csr_matrix((n_rows, 0))
+        rows = np.concatenate(rows)
+        return sparse.csr_matrix(
+            (np.ones(len(rows)), (rows, np.concatenate(cols))), shape=(n_rows, offset)
+        )
+
+    def transform_columns(self, columns):
+        """Versión densa para lotes pequeños: una columna por categoría."""
+        matrix = self.transform_sparse(columns).toarray()
+        return {name: matrix[:, i] for i, name in enumerate(self.feature_names)}
+
+    def to_dict(self):
+        return {'type': self.kind, 'columns': self.columns, 'drop_first': self.drop_first,
+                'categories': self.categories, 'prefix_sep': self.prefix_sep}
+
+
+ENCODERS = {cls.kind: cls for cls in (HashingEncoder, FrequencyEncoder, TargetEncoder, OneHotEncoder)}
+
+
+def encoder_from_dict(spec):
+    """
+    Reconstruye un codificador guardado con to_dict().
+
+    Args:
+        spec (dict): Estado del codificador
+
+    Returns:
+        Codificador listo para transform_columns
+    """
+    spec = dict(spec)
+    kind = spec.pop('type')
+    if kind not in ENCODERS:
+        raise ValueError(f"Codificador desconocido: {kind}")
+    return ENCODERS[kind](**spec)
+
+
+def to_sparse_matrix(df, columns=None, dtype=np.float64):
+    """
+    Convierte columnas de un DataFrame en una matriz CSR y su índice de features.
+
+    Las columnas con dtype Sparse (hash, one-hot) se copian con sus valores
+    almacenados, sin densificar; las densas se añaden omitiendo los ceros.
+
+    Args:
+        df (pd.DataFrame): Dataset con columnas numéricas, booleanas o dispersas
+        columns (list): Columnas a incluir, en orden (None = todas)
+        dtype: Tipo de los valores de la matriz
+
+    Returns:
+        tuple: (scipy.sparse.csr_matrix, lista de nombres de features)
+    """
+    columns = list(df.columns if columns is None else columns)
+    is_sparse = [isinstance(df[col].dtype, pd.SparseDtype) for col in columns]
+
+    # Bloques de columnas consecutivas del mismo tipo, para respetar el orden
+    blocks, start = [], 0
+    for i in range(1, len(columns) + 1):
+        if i == len(columns) or is_sparse[i] != is_sparse[start]:
+            block = columns[start:i]
+            if is_sparse[start]:
+                blocks.append(_sparse_block(df, block, dtype))
+            else:
+                blocks.append(sparse.csr_matrix(df[block].to_numpy(dtype=dtype, na_value=np.nan)))
+            start = i
+
+    if not blocks:
+        return sparse.csr_matrix((len(df), 0), dtype=dtype), []
+    return sparse.hstack(blocks, format='csr', dtype=dtype), [str(col) for col in columns]
+
+
+def _sparse_block(df, columns, dtype):
+    """Columnas Sparse a CSC usando solo sus valores almacenados."""
+    data, indices, indptr = [], [], [0]
+    for col in columns:
+        array = df[col].array
+        stored = array.sp_index.indices
+        values = array.sp_values.astype(dtype)
+        fill_value = array.fill_value
+        if not pd.isna(fill_value) and fill_value != 0:
+            # Un relleno distinto de cero no es disperso: se densifica esta columna
+            dense = np.asarray(array, dtype=dtype)
+            stored = np.flatnonzero(dense)
+            values = dense[stored]
+        data.append(values)
+        indices.append(stored)
+        indptr.append(indptr[-1] + len(stored))
+    return sparse.csc_matrix(
+        (np.concatenate(data), np.concatenate(indices), np.asarray(indptr)),
+        shape=(len(df), len(columns))
+    ).tocsr()
+
+
+# Ejemplo de uso
+if __name__ == "__main__":
+    print(" Módulo encoding.py listo para usar")
@@ -0,0 +1,170 @@
+"""
+Evaluation Module
+=================
+Acumulador de métricas de regresión para evaluar por lotes.
+
+Cada lote actualiza sumas de errores y una varianza de Welford del target,
+de modo que la memoria no depende del tamaño del conjunto de prueba y los
+resultados parciales de varios procesos se combinan con merge().
+
+MAPE se calcula solo sobre los valores reales distintos de cero (las ventas
+a cero darían infinito); sMAPE y WAPE están definidos también con ceros.
+"""
+
+import numpy as np
+
+
+class RegressionAccumulator:
+    """Métricas de regresión acumulables y combinables (RMSE, MAE, R2, MAPE, sMAPE, WAPE)."""
+
+    def __init__(self):
+        """Inicializa un acumulador vacío."""
+        self.n = 0
+        self.sum_sq_error = 0.0
+        self.sum_abs_error = 0.0
+        self.sum_abs_true = 0.0
+        # Welford/Chan: media y suma de cuadrados de desviaciones del target (para R2)
+        self.mean_true = 0.0
+        self.m2_true = 0.0
+        self.n_nonzero = 0
+        self.sum_ape = 0.0
+        self.sum_sape = 0.0
+
+    def _merge_moments(self, n, mean, m2):
+        """Combina media y M2 de otro bloque (fórmula paralela de Chan)."""
+        total = self.n + n
+        delta = mean - self.mean_true
+        self.m2_true += m2 + delta * delta * self.n * n / total
+        self.mean_true += delta * n / total
+
+    def update(self, y_true, y_pred):
+        """
+        Añade un lote de valores reales y predicciones.
+
+        Args:
+            y_true: Valores reales
+            y_pred: Predicciones
+
+        Returns:
+            RegressionAccumulator: self
+        """
+        y_true = np.asarray(y_true, dtype=np.float64).ravel()
+        y_pred = np.asarray(y_pred, dtype=np.float64).ravel()
+        if y_true.shape != y_pred.shape:
+            raise ValueError(f"Tamaños distintos: {y_true.shape} y {y_pred.shape}")
+        n = len(y_true)
+        if n == 0:
+            return self
+
+        error = y_pred - y_true
+        abs_error = np.abs(error)
+        abs_true = np.abs(y_true)
+        mean = y_true.mean()
+        m2 = np.square(y_true - mean).sum()
+
+        self._merge_moments(n, mean, m2)
+        self.n += n
+        self.sum_sq_error += np.dot(error, error)
+        self.sum_abs_error += abs_error.sum()
+        self.sum_abs_true += abs_true.sum()
+
+        nonzero = abs_true > 0
+        self.n_nonzero += int(nonzero.sum())
+        self.sum_ape += (abs_error[nonzero] / abs_true[nonzero]).sum()
+
+        denominator = abs_true + np.abs(y_pred)
+        positive = denominator > 0
+        # Real y predicción a cero es un acierto: su término es 0
+        self.sum_sape += (2 * abs_error[positive] / denominator[positive]).sum()
+        return self
+
+    def merge(self, other):
+        """
+        Combina los resultados parciales de otro acumulador.
+
+        Args:
+            other (RegressionAccumulator): Acumulador de otro lote o proceso
+
+        Returns:
+            RegressionAccumulator: self
+        """
+        if other.n == 0:
+            return self
+        self._merge_moments(other.n, other.mean_true, other.m2_true)
+        self.n += other.n
+        self.sum_sq_error += other.sum_sq_error
+        self.sum_abs_error += other.sum_abs_error
+        self.sum_abs_true += other.sum_abs_true
+        self.n_nonzero += other.n_nonzero
+        self.sum_ape += other.sum_ape
+        self.sum_sape += other.sum_sape
+        return self
+
+    def result(self):
+        """
+        Calcula las métricas finales.
+
+        Returns:
+            dict: RMSE, MAE, R2, MAPE, sMAPE y WAPE (porcentajes en %)
+        """
+        if self.n == 0:
+            return {key: np.nan for key in ('RMSE', 'MAE', 'R2', 'MAPE', 'sMAPE', 'WAPE')}
+
+        if self.m2_true > 0:
+            r2 = 1 - self.sum_sq_error / self.m2_true
+        else:
+            # Target constante: mismo criterio que sklearn.metrics.r2_score
+            r2 = 1.0 if self.sum_sq_error == 0 else 0.0
+
+        return {
+            'RMSE': float(np.sqrt(self.sum_sq_error / self.n)),
+            'MAE': float(self.sum_abs_error / self.n),
+            'R2': float(r2),
+            'MAPE': float(self.sum_ape / self.n_nonzero * 100) if self.n_nonzero else np.nan,
+            'sMAPE': float(self.sum_sape / self.n * 100),
+            'WAPE': float(self.sum_abs_error / self.sum_abs_true * 100) if self.sum_abs_true else np.nan
+        }
+
+
+def iter_batches(X, y, batch_size):
+    """
+    Recorre X e y en lotes de filas.
+
+    Args:
+        X: Features (array, DataFrame o matriz dispersa CSR)
+        y: Target (array o Series)
+        batch_size (int): Filas por lote
+
+    Yields:
+        tuple: (X_lote, y_lote)
+    """
+    for start in range(0, X.shape[0], batch_size):
+        stop = start + batch_size
+        if hasattr(X, 'iloc'):
+            X_batch = X.iloc[start:stop]
+        else:
+            X_batch = X[start:stop]
+        y_batch = y.iloc[start:stop] if hasattr(y, 'iloc') else y[start:stop]
+        yield X_batch, y_batch
+
+
+def evaluate_batches(model, batches):
+    """
+    Evalúa un modelo prediciendo lote a lote.
+
+    Args:
+        model: Modelo con predict
+        batches (iterable): Pares (X_lote, y_lote)
+
+    Returns:
+        RegressionAccumulator: Acumulador con todos los lotes
+    """
+    accumulator = RegressionAccumulator()
+    for X_batch, y_batch in batches:
+        accumulator.update(y_batch, model.predict(X_batch))
+    return accumulator
+
+
+# Ejemplo de uso
+if __name__ == "__main__":
+    print(" Módulo evaluation.py listo para usar")
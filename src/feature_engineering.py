@@ -8,13 +8,126 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 
+from rolling import ROLLING_STATS, rolling_stats
+
 
 class FeatureEngineer:
     """Clase para ingeniería de características."""
     
-    def __init__(self):
-        """Inicializa el ingeniero de características."""
+    # Pasos que pueden aplicarse chunk a chunk en iter_transform
+    STREAMABLE_STEPS = {
+        'create_date_features', 'create_lag_features', 'create_rolling_features',
+        'create_interaction_features', 'create_polynomial_features',
+    }
+    
+    # Funciones acumulables para agregados "as of" (solo filas de fechas anteriores)
+    AS_OF_FUNCS = ('count', 'sum', 'mean', 'std', 'min', 'max')
+    
+    # Método público -> función que calcula sus columnas en run_pipeline
+    PIPELINE_STEPS = {
+        'create_date_features': '_date_columns',
+        'create_lag_features': '_lag_columns',
+        'create_rolling_features': '_rolling_columns',
+        'create_aggregation_features': '_aggregation_columns',
+        'create_group_aggregates': '_group_aggregate_columns',
+        'create_interaction_features': '_interaction_columns',
+        'create_polynomial_features': '_polynomial_columns',
+        'create_binning_features': '_binning_columns',
+    }
+    
+    def __init__(self, verbose=True):
+        """
+        Inicializa el ingeniero de características.
+        
+        Args:
+            verbose (bool): Mostrar mensajes de progreso
+        """
         self.created_features = []
+        self.verbose = verbose
+    
+    def _log(self, message):
+        """Muestra un mensaje si verbose está activo."""
+        if self.verbose:
+            print(message)
+    
+    def run_pipeline(self, df, steps, inplace=False, optimize_memory=False, sparse_output=False):
+        """
+        Ejecuta varios pasos de feature engineering en una sola pasada.
+        
+        Cada paso calcula sus columnas como arrays NumPy sin copiar el
+        dataset; al final todas las columnas nuevas se concatenan de una vez.
+        Los pasos pueden usar columnas creadas por pasos anteriores.
+        
+        Args:
+            df (pd.DataFrame): Dataset
+            steps (list): Lista de tuplas (nombre_método, kwargs), por ejemplo
+                [('create_date_features', {'date_column': 'Order Date'}),
+                 ('create_lag_features', {'column': 'Sales', 'lags': [1, 7]})]
+            inplace (bool): Añadir las columnas a df en lugar de devolver una copia
+            optimize_memory (bool): Reducir las columnas nuevas al tipo más
+                pequeño seguro (DataPreprocessor.optimize_memory)
+            sparse_output (bool): Devolver una matriz CSR con las columnas
+                numéricas, booleanas y dispersas (ver encoding.to_sparse_matrix)
+            
+        Returns:
+            pd.DataFrame: Dataset con las nuevas características, o la tupla
+            (matriz CSR, nombres de features) si sparse_output
+        """
+        new_columns = {}
+        
+        def get(name):
+            if name in new_columns:
+                return pd.Series(new_columns[name], index=df.index, name=name)
+            return df[name]
+        
+        for method, kwargs in steps:
+            if method not in self.PIPELINE_STEPS:
+                raise ValueError(f"Paso desconocido: {method}")
+            compute = getattr(self, self.PIPELINE_STEPS[method])
+            new_columns.update(compute(get, **kwargs))
+        
+        if optimize_memory and new_columns:
+            from preprocessing import DataPreprocessor
+            optimized = DataPreprocessor().optimize_memory(
+                pd.DataFrame(new_columns, index=df.index), inplace=True, verbose=self.verbose
+            )
+            new_columns = {col: optimized[col].array for col in optimized.columns}
+        
+        df_features = self._assemble(df, new_columns, inplace)
+        if sparse_output:
+            from encoding import to_sparse_matrix
+            columns = [col for col in df_features.columns
+                       if pd.api.types.is_numeric_dtype(df_features[col])
+                       or pd.api.types.is_bool_dtype(df_features[col])]
+            return to_sparse_matrix(df_features, columns)
+        return df_features
+    
+    def _assemble(self, df, new_columns, inplace):
+        """
+        Une las columnas calculadas al dataset con una sola concatenación.
+        
+        Args:
+            df (pd.DataFrame): Dataset original
+            new_columns (dict): Nombre -> array de la columna
+            inplace (bool): Modificar df directamente
+            
+        Returns:
+            pd.DataFrame: Dataset con las columnas nuevas
+        """
+        replaced = {col: values for col, values in new_columns.items() if col in df.columns}
+        added = {col: values for col, values in new_columns.items() if col not in df.columns}
+        
+        if inplace:
+            for col, values in replaced.items():
+                df[col] = values
+            if added:
+                df[list(added)] = pd.DataFrame(added, index=df.index)
+            return df
+        
+        df_new = pd.concat([df, pd.DataFrame(added, index=df.index)], axis=1) if added else df.copy()
+        for col, values in replaced.items():
+            df_new[col] = values
+        return df_new
     
     def create_date_features(self, df, date_column):
         """
@@ -27,38 +140,38 @@ class FeatureEngineer:
         Returns:
             pd.DataFrame: Dataset con nuevas características
         """
-        df_new = df.copy()
-        
-        print(f"\n Creando características de fecha desde: {date_column}")
+        return self.run_pipeline(df, [('create_date_features', {'date_column': date_column})])
+    
+    def _date_columns(self, get, date_column):
+        """Calcula las columnas de create_date_features."""
+        self._log(f"\n Creando características de fecha desde: {date_column}")
         
         # Convertir a datetime si no lo es
-        df_new[date_column] = pd.to_datetime(df_new[date_column])
-        
-        # Extraer componentes de fecha
-        df_new[f'{date_column}_year'] = df_new[date_column].dt.year
-        df_new[f'{date_column}_month'] = df_new[date_column].dt.month
-        df_new[f'{date_column}_day'] = df_new[date_column].dt.day
-        df_new[f'{date_column}_dayofweek'] = df_new[date_column].dt.dayofweek
-        df_new[f'{date_column}_quarter'] = df_new[date_column].dt.quarter
-        df_new[f'{date_column}_weekofyear'] = df_new[date_column].dt.isocalendar().week
-        
-        # Características adicionales
-        df_new[f'{date_column}_is_weekend'] = df_new[f'{date_column}_dayofweek'].isin([5, 6]).astype(int)
-        df_new[f'{date_column}_is_month_start'] = df_new[date_column].dt.is_month_start.astype(int)
-        df_new[f'{date_column}_is_month_end'] = df_new[date_column].dt.is_month_end.astype(int)
-        
-        new_features = [
-            f'{date_column}_year', f'{date_column}_month', f'{date_column}_day',
-            f'{date_column}_dayofweek', f'{date_column}_quarter', f'{date_column}_weekofyear',
-            f'{date_column}_is_weekend', f'{date_column}_is_month_start', f'{date_column}_is_month_end'
-        ]
-        
+        dates = pd.to_datetime(get(date_column))
+        dt = dates.dt
+        dayofweek = dt.dayofweek.to_numpy()
+        
+        # Extraer componentes de fecha y características adicionales
+        columns = {
+            date_column: dates.array,
+            f'{date_column}_year': dt.year.to_numpy(),
+            f'{date_column}_month': dt.month.to_numpy(),
+            f'{date_column}_day': dt.day.to_numpy(),
+            f'{date_column}_dayofweek': dayofweek,
+            f'{date_column}_quarter': dt.quarter.to_numpy(),
+            f'{date_column}_weekofyear': dt.isocalendar().week.array,
+            f'{date_column}_is_weekend': np.isin(dayofweek, [5, 6]).astype(int),
+            f'{date_column}_is_month_start': dt.is_month_start.to_numpy().astype(int),
+            f'{date_column}_is_month_end': dt.is_month_end.to_numpy().astype(int),
+        }
+        
+        new_features = list(columns)[1:]
         self.created_features.extend(new_features)
-        print(f" Creadas {len(new_features)} características de fecha")
+        self._log(f" Creadas {len(new_features)} características de fecha")
         
-        return df_new
+        return columns
     
-    def create_lag_features(self, df, column, lags=[1, 7, 30]):
+    def create_lag_features(self, df, column, lags=[1, 7, 30], group_by=None, sort_by=None):
         """
         Crea características de rezago (lag features).
         
@@ -66,56 +179,153 @@ class FeatureEngineer:
             df (pd.DataFrame): Dataset
             column (str): Columna a rezagar
             lags (list): Lista de períodos de rezago
+            group_by (str or list): Entidad(es) cuyos rezagos se calculan por
+                separado (p. ej. 'Product ID' o ['Region', 'Category'])
+            sort_by (str): Columna que define el orden temporal (p. ej. 'Order Date')
             
         Returns:
             pd.DataFrame: Dataset con características de rezago
         """
-        df_new = df.copy()
-        
-        print(f"\n⏳ Creando lag features para: {column}")
-        
-        for lag in lags:
-            df_new[f'{column}_lag_{lag}'] = df_new[column].shift(lag)
-            self.created_features.append(f'{column}_lag_{lag}')
+        return self.run_pipeline(df, [('create_lag_features', {
+            'column': column, 'lags': lags, 'group_by': group_by, 'sort_by': sort_by
+        })])
+    
+    def _series_layout(self, get, column, group_by=None, sort_by=None):
+        """
+        Ordena una columna por (entidad, tiempo) para cálculos por serie.
         
-        print(f" Creados {len(lags)} lag features")
-        return df_new
+        Args:
+            get (callable): Acceso a columnas del dataset
+            column (str): Columna de valores
+            group_by (str or list): Columnas que identifican cada serie
+            sort_by (str): Columna temporal
+            
+        Returns:
+            tuple: (valores ordenados, orden original, códigos de grupo
+                ordenados o None, posición de cada fila dentro de su serie,
+                fechas ordenadas o None)
+        """
+        values = get(column).to_numpy()
+        n = len(values)
+        
+        sort_keys = []
+        dates = None
+        if sort_by is not None:
+            dates = pd.to_datetime(get(sort_by)).to_numpy()
+            sort_keys.append(dates)
+        
+        group_codes = None
+        if group_by is not None:
+            group_cols = [group_by] if isinstance(group_by, str) else list(group_by)
+            keys = pd.DataFrame({col: get(col).to_numpy() for col in group_cols})
+            group_codes = keys.groupby(group_cols, sort=False, dropna=False).ngroup().to_numpy()
+            sort_keys.append(group_codes)
+        
+        # np.lexsort es estable y usa la última clave como principal
+        order = np.lexsort(sort_keys) if sort_keys else np.arange(n)
+        values = values[order]
+        if dates is not None:
+            dates = dates[order]
+        
+        positions = np.arange(n)
+        if group_codes is not None:
+            group_codes = group_codes[order]
+            starts = np.r_[True, group_codes[1:] != group_codes[:-1]]
+            positions = positions - np.maximum.accumulate(np.where(starts, positions, 0))
+        
+        return values, order, group_codes, positions, dates
+    
+    def _lag_columns(self, get, column, lags=[1, 7, 30], group_by=None, sort_by=None):
+        """Calcula las columnas de create_lag_features."""
+        self._log(f"\n⏳ Creando lag features para: {column}")
+        
+        columns = {}
+        if group_by is None and sort_by is None:
+            values = get(column)
+            for lag in lags:
+                columns[f'{column}_lag_{lag}'] = values.shift(lag).to_numpy()
+        else:
+            values, order, _, positions, _ = self._series_layout(get, column, group_by, sort_by)
+            values = pd.Series(values)
+            for lag in lags:
+                # Desplazar la serie ordenada e invalidar lo que cruza de entidad
+                shifted = values.shift(lag).to_numpy(dtype=float, copy=True)
+                if group_by is not None:
+                    shifted[positions < lag] = np.nan
+                result = np.empty_like(shifted)
+                result[order] = shifted
+                columns[f'{column}_lag_{lag}'] = result
+        
+        self.created_features.extend(columns)
+        self._log(f" Creados {len(lags)} lag features")
+        return columns
     
-    def create_rolling_features(self, df, column, windows=[7, 30]):
+    def create_rolling_features(self, df, column, windows=[7, 30], group_by=None, sort_by=None):
         """
         Crea características de ventana móvil (rolling features).
         
         Args:
             df (pd.DataFrame): Dataset
             column (str): Columna para calcular rolling
-            windows (list): Tamaños de ventana
+            windows (list): Tamaños de ventana, en filas (7) o en tiempo
+                ('7D', '30D'; requiere sort_by con la columna de fecha)
+            group_by (str or list): Entidad(es) cuyas ventanas se calculan por
+                separado (p. ej. 'Product ID' o ['Region', 'Category'])
+            sort_by (str): Columna que define el orden temporal (p. ej. 'Order Date')
             
         Returns:
             pd.DataFrame: Dataset con rolling features
         """
-        df_new = df.copy()
-        
-        print(f"\n Creando rolling features para: {column}")
-        
+        return self.run_pipeline(df, [('create_rolling_features', {
+            'column': column, 'windows': windows, 'group_by': group_by, 'sort_by': sort_by
+        })])
+    
+    def _rolling_columns(self, get, column, windows=[7, 30], group_by=None, sort_by=None):
+        """Calcula las columnas de create_rolling_features."""
+        self._log(f"\n Creando rolling features para: {column}")
+        
+        if sort_by is None and any(isinstance(w, str) for w in windows):
+            raise ValueError("Las ventanas temporales requieren sort_by con la columna de fecha")
+        
+        if group_by is None and sort_by is None:
+            values = get(column)
+            order = positions = None
+        else:
+            values, order, group_codes, positions, dates = self._series_layout(
+                get, column, group_by, sort_by
+            )
+        
+        # Ventanas en filas: todas las estadísticas y tamaños en una pasada
+        fixed = rolling_stats(
+            values, [w for w in windows if not isinstance(w, str)],
+            positions=positions if group_by is not None else None
+        )
+        
+        columns = {}
         for window in windows:
-            # Media móvil
-            df_new[f'{column}_rolling_mean_{window}'] = df_new[column].rolling(window=window).mean()
-            # Desviación estándar móvil
-            df_new[f'{column}_rolling_std_{window}'] = df_new[column].rolling(window=window).std()
-            # Máximo móvil
-            df_new[f'{column}_rolling_max_{window}'] = df_new[column].rolling(window=window).max()
-            # Mínimo móvil
-            df_new[f'{column}_rolling_min_{window}'] = df_new[column].rolling(window=window).min()
-            
-            self.created_features.extend([
-                f'{column}_rolling_mean_{window}',
-                f'{column}_rolling_std_{window}',
-                f'{column}_rolling_max_{window}',
-                f'{column}_rolling_min_{window}'
-            ])
-        
-        print(f" Creados {len(windows) * 4} rolling features")
-        return df_new
+            if isinstance(window, str):
+                # Ventana temporal: una pasada de groupby().rolling sobre el índice de fechas
+                series = pd.Series(values, index=pd.DatetimeIndex(dates))
+                if group_by is not None:
+                    rolling = series.groupby(group_codes, sort=False).rolling(window)
+                else:
+                    rolling = series.rolling(window)
+            
+            # Media, desviación estándar, máximo y mínimo móviles
+            for stat in ROLLING_STATS:
+                if isinstance(window, str):
+                    result = getattr(rolling, stat)().to_numpy(dtype=float, copy=True)
+                else:
+                    result = fixed[(stat, window)]
+                if order is not None:
+                    unsorted = np.empty_like(result)
+                    unsorted[order] = result
+                    result = unsorted
+                columns[f'{column}_rolling_{stat}_{window}'] = result
+        
+        self.created_features.extend(columns)
+        self._log(f" Creados {len(windows) * 4} rolling features")
+        return columns
     
     def create_aggregation_features(self, df, group_column, agg_column, agg_funcs=['mean', 'sum', 'count']):
         """
@@ -130,18 +340,200 @@ class FeatureEngineer:
         Returns:
             pd.DataFrame: Dataset con características agregadas
         """
-        df_new = df.copy()
+        return self.run_pipeline(df, [('create_aggregation_features', {
+            'group_column': group_column, 'agg_column': agg_column, 'agg_funcs': agg_funcs
+        })])
+    
+    def _aggregation_columns(self, get, group_column, agg_column, agg_funcs=['mean', 'sum', 'count']):
+        """Calcula las columnas de create_aggregation_features."""
+        self._log(f"\n Creando características de agregación: {group_column} -> {agg_column}")
+        
+        columns = self._group_aggregate_columns(get, [(group_column, agg_column, agg_funcs)], log=False)
         
-        print(f"\n Creando características de agregación: {group_column} -> {agg_column}")
+        self._log(f" Creadas {len(agg_funcs)} características de agregación")
+        return columns
+    
+    def create_group_aggregates(self, df, specs, as_of=None):
+        """
+        Crea muchas agregaciones por grupo con una sola agrupación por clave.
         
-        for func in agg_funcs:
-            agg_data = df_new.groupby(group_column)[agg_column].transform(func)
-            feature_name = f'{group_column}_{agg_column}_{func}'
-            df_new[feature_name] = agg_data
-            self.created_features.append(feature_name)
+        Las especificaciones que comparten claves se calculan juntas: las
+        claves se factorizan una vez, se hace un único groupby().agg con todas
+        las columnas y funciones, y el resultado se lleva a cada fila por su
+        código de grupo.
         
-        print(f" Creadas {len(agg_funcs)} características de agregación")
-        return df_new
+        Con as_of (columna de fecha), cada fila solo ve las filas de su grupo
+        con fecha estrictamente anterior, de modo que el agregado no incluye
+        el propio pedido ni otros del mismo día (sin fuga del target).
+        
+        Args:
+            df (pd.DataFrame): Dataset
+            specs (list): Tuplas (claves, columna, funciones), por ejemplo
+                [('Customer ID', 'Sales', ['mean', 'sum', 'count']),
+                 (['State', 'Category'], 'Profit', ['mean'])]
+            as_of (str): Columna de fecha para agregados sin fuga (opcional;
+                funciones admitidas: count, sum, mean, std, min, max)
+            
+        Returns:
+            pd.DataFrame: Dataset con las características agregadas
+        """
+        return self.run_pipeline(df, [('create_group_aggregates', {'specs': specs, 'as_of': as_of})])
+    
+    def _group_aggregate_columns(self, get, specs, as_of=None, log=True):
+        """Calcula las columnas de create_group_aggregates."""
+        by_keys = {}
+        for keys, column, funcs in specs:
+            keys = (keys,) if isinstance(keys, str) else tuple(keys)
+            funcs = [funcs] if isinstance(funcs, str) else list(funcs)
+            if as_of is not None:
+                unsupported = [func for func in funcs if func not in self.AS_OF_FUNCS]
+                if unsupported:
+                    raise ValueError(f"Funciones no admitidas con as_of: {unsupported}. "
+                                     f"Opciones: {self.AS_OF_FUNCS}")
+            by_keys.setdefault(keys, []).append((column, funcs))
+        
+        columns = {}
+        for keys, key_specs in by_keys.items():
+            if log:
+                self._log(f"\n Creando agregados por {', '.join(keys)}"
+                          f"{f' (as of {as_of})' if as_of is not None else ''}")
+            
+            codes = self._group_codes(get, keys)
+            
+            if as_of is None:
+                columns.update(self._aggregate_full(get, keys, key_specs, codes))
+            else:
+                columns.update(self._aggregate_as_of(get, keys, key_specs, codes, as_of))
+        
+        self.created_features.extend(columns)
+        if log:
+            self._log(f" Creadas {len(columns)} características de agregación")
+        return columns
+    
+    @staticmethod
+    def _group_codes(get, keys):
+        """
+        Factoriza una vez un conjunto de claves en códigos de grupo.
+        
+        Con varias claves, los códigos se combinan de dos en dos y se vuelven
+        a factorizar, así el producto nunca desborda int64.
+        
+        Returns:
+            np.ndarray: Código de grupo por fila (-1 si alguna clave es nula)
+        """
+        codes = None
+        for key in keys:
+            key_codes, uniques = pd.factorize(get(key))
+            if codes is None:
+                codes = key_codes.astype(np.int64)
+                continue
+            valid = (codes >= 0) & (key_codes >= 0)
+            combined = codes[valid] * len(uniques) + key_codes[valid]
+            codes = np.full(len(key_codes), -1, dtype=np.int64)
+            codes[valid] = pd.factorize(combined)[0]
+        return codes
+    
+    @staticmethod
+    def _feature_prefix(keys, column):
+        return f"{'_'.join(keys)}_{column}"
+    
+    def _aggregate_full(self, get, keys, key_specs, codes):
+        """Un groupby().agg con todas las columnas y funciones de unas claves."""
+        valid = codes >= 0
+        values = pd.DataFrame({column: get(column).array
+                               for column in dict.fromkeys(column for column, _ in key_specs)})
+        if not valid.all():
+            values = values[valid]
+        named = {
+            f'{self._feature_prefix(keys, column)}_{func}': (column, func)
+            for column, funcs in key_specs for func in funcs
+        }
+        aggregated = values.groupby(codes[valid], sort=True).agg(**named)
+        
+        columns = {}
+        for name in named:
+            group_values = aggregated[name].to_numpy()
+            if valid.all():
+                columns[name] = group_values[codes]
+            else:
+                # Las filas con clave nula no pertenecen a ningún grupo
+                result = np.full(len(codes), np.nan)
+                result[valid] = group_values[codes[valid]]
+                columns[name] = result
+        return columns
+    
+    def _aggregate_as_of(self, get, keys, key_specs, codes, date_column):
+        """
+        Agregados acumulados con las filas del grupo de fechas anteriores.
+        
+        Las filas se ordenan una vez por (grupo, fecha) y se resumen en bloques
+        de igual grupo y fecha; el valor de cada bloque es el acumulado de los
+        bloques anteriores de su grupo.
+        """
+        dates = pd.to_datetime(get(date_column)).to_numpy()
+        n = len(codes)
+        order = np.lexsort((dates, codes))
+        sorted_codes = codes[order]
+        sorted_dates = dates[order]
+        
+        new_block = np.r_[True, (sorted_codes[1:] != sorted_codes[:-1])
+                          | (sorted_dates[1:] != sorted_dates[:-1])]
+        block = np.cumsum(new_block) - 1
+        n_blocks = int(block[-1]) + 1 if n else 0
+        block_codes = sorted_codes[new_block]
+        first_block = np.r_[True, block_codes[1:] != block_codes[:-1]]
+        group_start = np.maximum.accumulate(np.where(first_block, np.arange(n_blocks), 0))
+        
+        def prior(block_totals):
+            """Suma de los bloques anteriores del mismo grupo."""
+            exclusive = np.cumsum(block_totals) - block_totals
+            return exclusive - exclusive[group_start]
+        
+        # Filas sin grupo o sin fecha: no aportan a los acumulados y quedan a NaN
+        invalid = (codes < 0) | pd.isna(dates)
+        columns = {}
+        for column, funcs in key_specs:
+            values = get(column).to_numpy(dtype=float, na_value=np.nan)[order]
+            values[invalid[order]] = np.nan
+            present = ~np.isnan(values)
+            filled = np.where(present, values, 0.0)
+            count = prior(np.bincount(block, weights=present, minlength=n_blocks))
+            total = prior(np.bincount(block, weights=filled, minlength=n_blocks))
+            
+            for func in funcs:
+                if func == 'count':
+                    result = count
+                elif func == 'sum':
+                    result = total
+                elif func == 'mean':
+                    with np.errstate(invalid='ignore', divide='ignore'):
+                        result = np.where(count > 0, total / count, np.nan)
+                elif func == 'std':
+                    # Centrado por la media del grupo para evitar cancelación numérica
+                    # (la varianza no depende del desplazamiento)
+                    group = (np.cumsum(first_block) - 1)[block]
+                    center = np.bincount(group, weights=filled) / np.maximum(
+                        np.bincount(group, weights=present), 1)
+                    shifted = np.where(present, values - center[group], 0.0)
+                    shifted_total = prior(np.bincount(block, weights=shifted, minlength=n_blocks))
+                    squares = prior(np.bincount(block, weights=shifted * shifted, minlength=n_blocks))
+                    with np.errstate(invalid='ignore', divide='ignore'):
+                        variance = (squares - shifted_total ** 2 / count) / (count - 1)
+                    # Misma convención que pandas (ddof=1): NaN con menos de dos valores
+                    result = np.where(count > 1, np.sqrt(np.maximum(variance, 0.0)), np.nan)
+                else:
+                    extreme = pd.Series(values).groupby(block).agg(func)
+                    running = extreme.groupby(block_codes).cummin() if func == 'min' \
+                        else extreme.groupby(block_codes).cummax()
+                    # Bloques sin valores: se mantiene el extremo anterior
+                    running = running.groupby(block_codes).ffill()
+                    result = running.groupby(block_codes).shift(1).to_numpy(dtype=float)
+                
+                row_values = np.empty(n)
+                row_values[order] = result[block]
+                row_values[invalid] = np.nan
+                columns[f'{self._feature_prefix(keys, column)}_{func}_asof'] = row_values
+        return columns
     
     def create_interaction_features(self, df, columns):
         """
@@ -154,27 +546,31 @@ class FeatureEngineer:
         Returns:
             pd.DataFrame: Dataset con interacciones
         """
-        df_new = df.copy()
-        
-        print(f"\n Creando características de interacción")
+        return self.run_pipeline(df, [('create_interaction_features', {'columns': columns})])
+    
+    def _interaction_columns(self, get, columns):
+        """Calcula las columnas de create_interaction_features."""
+        self._log(f"\n Creando características de interacción")
         
+        values = {col: get(col).to_numpy() for col in columns}
+        new_columns = {}
         for i in range(len(columns)):
             for j in range(i+1, len(columns)):
                 col1, col2 = columns[i], columns[j]
                 
                 # Producto
                 feature_name = f'{col1}_x_{col2}'
-                df_new[feature_name] = df_new[col1] * df_new[col2]
+                new_columns[feature_name] = values[col1] * values[col2]
                 self.created_features.append(feature_name)
                 
                 # Ratio (evitar división por cero)
-                if (df_new[col2] != 0).all():
+                if (values[col2] != 0).all():
                     feature_name = f'{col1}_div_{col2}'
-                    df_new[feature_name] = df_new[col1] / df_new[col2]
+                    new_columns[feature_name] = values[col1] / values[col2]
                     self.created_features.append(feature_name)
         
-        print(f" Creadas {len(self.created_features)} características de interacción")
-        return df_new
+        self._log(f" Creadas {len(self.created_features)} características de interacción")
+        return new_columns
     
     def create_polynomial_features(self, df, columns, degree=2):
         """
@@ -188,18 +584,22 @@ class FeatureEngineer:
         Returns:
             pd.DataFrame: Dataset con características polinómicas
         """
-        df_new = df.copy()
-        
-        print(f"\n Creando características polinómicas (grado {degree})")
+        return self.run_pipeline(df, [('create_polynomial_features', {'columns': columns, 'degree': degree})])
+    
+    def _polynomial_columns(self, get, columns, degree=2):
+        """Calcula las columnas de create_polynomial_features."""
+        self._log(f"\n Creando características polinómicas (grado {degree})")
         
+        new_columns = {}
         for col in columns:
+            values = get(col).to_numpy()
             for d in range(2, degree + 1):
                 feature_name = f'{col}_pow_{d}'
-                df_new[feature_name] = df_new[col] ** d
+                new_columns[feature_name] = values ** d
                 self.created_features.append(feature_name)
         
-        print(f" Creadas {len(columns) * (degree - 1)} características polinómicas")
-        return df_new
+        self._log(f" Creadas {len(columns) * (degree - 1)} características polinómicas")
+        return new_columns
     
     def create_binning_features(self, df, column, bins=5, labels=None):
         """
@@ -214,16 +614,86 @@ class FeatureEngineer:
         Returns:
             pd.DataFrame: Dataset con variable discretizada
         """
-        df_new = df.copy()
-        
-        print(f"\n Creando bins para: {column}")
+        return self.run_pipeline(df, [('create_binning_features', {
+            'column': column, 'bins': bins, 'labels': labels
+        })])
+    
+    def _binning_columns(self, get, column, bins=5, labels=None):
+        """Calcula las columnas de create_binning_features."""
+        self._log(f"\n Creando bins para: {column}")
         
         feature_name = f'{column}_binned'
-        df_new[feature_name] = pd.cut(df_new[column], bins=bins, labels=labels)
+        columns = {feature_name: pd.cut(get(column), bins=bins, labels=labels).array}
         self.created_features.append(feature_name)
         
-        print(f" Variable discretizada en {bins} bins")
-        return df_new
+        self._log(f" Variable discretizada en {bins} bins")
+        return columns
+    
+    def _history_rows(self, steps):
+        """
+        Calcula cuántas filas previas necesita cada chunk para los pasos dados.
+        
+        Args:
+            steps (list): Lista de tuplas (nombre_método, kwargs)
+            
+        Returns:
+            int: Filas de historia requeridas
+        """
+        history = 0
+        for method, kwargs in steps:
+            if kwargs.get('group_by') is not None or kwargs.get('sort_by') is not None:
+                raise ValueError(f"{method} con group_by/sort_by no admite modo streaming")
+            if method == 'create_lag_features':
+                history = max(history, max(kwargs.get('lags', [1, 7, 30])))
+            elif method == 'create_rolling_features':
+                history = max(history, max(kwargs.get('windows', [7, 30])) - 1)
+        return history
+    
+    def iter_transform(self, chunks, steps):
+        """
+        Aplica pasos de feature engineering a un flujo de chunks.
+        
+        Cada chunk se procesa junto con las últimas filas del anterior, de modo
+        que lags y ventanas móviles dan el mismo resultado que sobre el
+        dataset completo. La memoria pico depende del tamaño del chunk y de la
+        historia requerida, no del tamaño total del archivo.
+        
+        Args:
+            chunks (iterable): Chunks de pd.DataFrame (ver DataLoader.iter_chunks)
+            steps (list): Lista de tuplas (nombre_método, kwargs), por ejemplo
+                [('create_lag_features', {'column': 'Sales', 'lags': [1, 7]})]
+            
+        Yields:
+            pd.DataFrame: Chunk con las nuevas características
+        """
+        for method, _ in steps:
+            if method not in self.STREAMABLE_STEPS:
+                raise ValueError(f"El paso {method} no admite modo streaming")
+        
+        history = self._history_rows(steps)
+        verbose = self.verbose
+        n_features = None
+        tail = None
+        
+        try:
+            for chunk in chunks:
+                n_tail = 0 if tail is None else len(tail)
+                frame = chunk if tail is None else pd.concat([tail, chunk])
+                if history > 0:
+                    tail = frame.iloc[-history:]
+                
+                result = self.run_pipeline(frame, steps)
+                
+                # Registrar las características una sola vez
+                if n_features is None:
+                    n_features = len(self.created_features)
+                    self.verbose = False
+                else:
+                    del self.created_features[n_features:]
+                
+                yield result.iloc[n_tail:]
+        finally:
+            self.verbose = verbose
     
     def get_feature_summary(self):
         """
@@ -0,0 +1,396 @@
+"""
+Feature Store Module
+====================
+Caché de matrices de features direccionada por contenido.
+
+La clave de cada entrada es un hash de la huella de los datos de entrada y de
+la lista ordenada de pasos (feature engineering y preprocesamiento) con sus
+parámetros; si los datos o la configuración cambian, la clave cambia.
+
+Cada entrada se guarda en data/processed/feature_store/<clave>/:
+
+- Un archivo .npy por tipo de dato con las columnas numéricas (una fila del
+  array por columna), que se abre con mmap: cargar la matriz no lee el disco
+  hasta que se usan los datos.
+- Las categorías como códigos en .npy más su lista de categorías.
+- Las columnas dispersas (hash, one-hot) en .npz como matriz CSC con sus
+  valores almacenados, sin densificar.
+- El resto de columnas (texto, índice no trivial) en Parquet (pickle sin pyarrow).
+
+Un índice JSON guarda tamaño y último acceso de cada entrada; al superar el
+presupuesto de disco se eliminan las menos usadas recientemente (LRU).
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from pandas._libs.sparse import IntIndex
+from scipy import sparse
+
+from data_loader import _parquet_available, file_fingerprint
+
+
+STORE_VERSION = 1
+DEFAULT_STORE_PATH = Path('data/processed/feature_store')
+
+
+def frame_fingerprint(df):
+    """
+    Huella de un DataFrame en memoria (contenido, columnas, tipos e índice).
+
+    Para datos leídos de un CSV es más barato usar file_fingerprint del archivo.
+
+    Args:
+        df (pd.DataFrame): Dataset
+
+    Returns:
+        str: Hash hexadecimal
+    """
+    digest = hashlib.sha1()
+    digest.update(json.dumps([[str(c), str(t)] for c, t in df.dtypes.items()]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return digest.hexdigest()[:16]
+
+
+def _normalize(value):
+    """Convierte parámetros a una forma JSON estable para el hash."""
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in sorted(value.items(), key=lambda kv: str(kv[0]))}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return repr(value)
+
+
+class FeatureStore:
+    """Caché en disco de matrices de features con expulsión LRU."""
+
+    def __init__(self, root=DEFAULT_STORE_PATH, max_bytes=2 * 1024**3):
+        """
+        Inicializa el feature store.
+
+        Args:
+            root (str): Carpeta del store
+            max_bytes (int): Presupuesto de disco (se expulsan entradas LRU al superarlo)
+        """
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+
+    @property
+    def index_file(self):
+        return self.root / 'index.json'
+
+    def _read_index(self):
+        if not self.index_file.exists():
+            return {}
+        with open(self.index_file, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        # Entradas borradas a mano dejan de contar
+        return {key: entry for key, entry in index.items() if (self.root / key).is_dir()}
+
+    def _write_index(self, index):
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.index_file.with_suffix('.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_file, self.index_file)
+
+    def key(self, data_fingerprint, steps):
+        """
+        Clave de una matriz de features.
+
+        Args:
+            data_fingerprint (str): Huella de los datos de entrada
+            steps (list): Lista ordenada de (paso, kwargs)
+
+        Returns:
+            str: Clave hexadecimal
+        """
+        payload = json.dumps({
+            'version': STORE_VERSION,
+            'data': data_fingerprint,
+            'steps': [[name, _normalize(kwargs)] for name, kwargs in steps]
+        }, sort_keys=True)
+        return hashlib.sha1(payload.encode()).hexdigest()[:20]
+
+    def __contains__(self, key):
+        return (self.root / key / 'meta.json').exists()
+
+    def get(self, key, mmap=True):
+        """
+        Lee una matriz guardada.
+
+        Args:
+            key (str): Clave de la entrada
+            mmap (bool): Abrir las columnas numéricas como memmap de solo lectura
+
+        Returns:
+            tuple: (pd.DataFrame, metadatos) o (None, None) si no existe
+        """
+        entry_dir = self.root / key
+        if key not in self:
+            return None, None
+
+        with open(entry_dir / 'meta.json', 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+
+        mmap_mode = 'r' if mmap else None
+        columns = {}
+        for block in meta['blocks']:
+            values = np.load(entry_dir / block['file'], mmap_mode=mmap_mode)
+            for i, name in enumerate(block['columns']):
+                columns[name] = values[i]
+        for name, categories in meta['categories'].items():
+            codes = np.load(entry_dir / f"cat_{meta['column_files'][name]}.npy", mmap_mode=mmap_mode)
+            columns[name] = pd.Categorical.from_codes(codes, categories=categories,
+                                                      ordered=meta['ordered'].get(name, False))
+        for block in meta.get('sparse_blocks', []):
+            matrix = sparse.load_npz(entry_dir / block['file'])
+            dtype = pd.SparseDtype(np.dtype(block['dtype']), block['fill_value'])
+            for i, name in enumerate(block['columns']):
+                start, end = matrix.indptr[i], matrix.indptr[i + 1]
+                index_i = IntIndex(matrix.shape[0], matrix.indices[start:end].astype(np.int32))
+                columns[name] = pd.arrays.SparseArray(matrix.data[start:end], sparse_index=index_i,
+                                                      dtype=dtype)
+
+        index = None
+        other = None
+        if meta['other_file']:
+            other_path = entry_dir / meta['other_file']
+            other = pd.read_parquet(other_path) if other_path.suffix == '.parquet' \
+                else pd.read_pickle(other_path)
+            index = other.index
+
+        df = pd.DataFrame(columns, index=index, copy=False)
+        if other is not None:
+            for name in other.columns:
+                # .array conserva el tipo (texto, fechas con zona horaria) sin alinear índices
+                df[name] = other[name].array
+        df = df[meta['columns']]
+
+        self._touch(key)
+        return df, meta
+
+    def _touch(self, key):
+        """Actualiza el último acceso de una entrada."""
+        index = self._read_index()
+        if key in index:
+            index[key]['last_access'] = time.time()
+            self._write_index(index)
+
+    def put(self, key, df, metadata=None):
+        """
+        Guarda una matriz y expulsa entradas antiguas si se supera el presupuesto.
+
+        Args:
+            key (str): Clave (ver key())
+            df (pd.DataFrame): Matriz de features
+            metadata (dict): Metadatos adicionales (pasos, estado del preprocesador...)
+
+        Returns:
+            int: Bytes ocupados por la entrada
+        """
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_dir = self.root / f'{key}.tmp-{os.getpid()}'
+        if tmp_dir.exists():
+            shutil.rmtree(tmp_dir)
+        tmp_dir.mkdir()
+
+        try:
+            meta = {
+                'version': STORE_VERSION,
+                'key': key,
+                'rows': len(df),
+                'columns': [str(c) for c in df.columns],
+                'blocks': [],
+                'sparse_blocks': [],
+                'categories': {},
+                'ordered': {},
+                'column_files': {},
+                'other_file': None,
+                'created_at': time.time(),
+                **(metadata or {})
+            }
+            if len(set(meta['columns'])) != len(meta['columns']):
+                raise ValueError("Nombres de columnas duplicados")
+            df = df.set_axis(meta['columns'], axis=1)
+
+            # Columnas numéricas agrupadas por tipo: un array (n_columnas, n_filas) por tipo
+            by_dtype = {}
+            by_sparse_dtype = {}
+            other_columns = []
+            for i, (name, dtype) in enumerate(df.dtypes.items()):
+                if isinstance(dtype, pd.CategoricalDtype):
+                    meta['column_files'][name] = i
+                    meta['categories'][name] = dtype.categories.tolist()
+                    meta['ordered'][name] = bool(dtype.ordered)
+                    np.save(tmp_dir / f'cat_{i}.npy', df[name].cat.codes.to_numpy())
+                elif isinstance(dtype, pd.SparseDtype):
+                    by_sparse_dtype.setdefault(dtype, []).append(name)
+                elif isinstance(dtype, np.dtype) and dtype.kind in 'biufcmM':
+                    by_dtype.setdefault(dtype.str, []).append(name)
+                else:
+                    other_columns.append(name)
+
+            for n_block, (dtype, names) in enumerate(by_dtype.items()):
+                file_name = f'block_{n_block}.npy'
+                values = np.empty((len(names), len(df)), dtype=np.dtype(dtype))
+                for j, name in enumerate(names):
+                    values[j] = df[name].to_numpy()
+                np.save(tmp_dir / file_name, values)
+                meta['blocks'].append({'file': file_name, 'dtype': dtype, 'columns': names})
+
+            # Columnas dispersas: una matriz CSC por tipo con los valores almacenados
+            # de cada columna; el resto de posiciones toma el valor de relleno
+            for n_block, (dtype, names) in enumerate(by_sparse_dtype.items()):
+                file_name = f'sparse_{n_block}.npz'
+                arrays = [df[name].array for name in names]
+                matrix = sparse.csc_matrix(
+                    (np.concatenate([a.sp_values for a in arrays]),
+                     np.concatenate([a.sp_index.indices for a in arrays]),
+                     np.cumsum([0] + [a.npoints for a in arrays])),
+                    shape=(len(df), len(names))
+                )
+                sparse.save_npz(tmp_dir / file_name, matrix, compressed=False)
+                meta['sparse_blocks'].append({'file': file_name, 'dtype': dtype.subtype.str,
+                                              'fill_value': dtype.fill_value, 'columns': names})
+
+            if other_columns or not df.index.equals(pd.RangeIndex(len(df))):
+                other = df[other_columns]
+                if _parquet_available():
+                    meta['other_file'] = 'other.parquet'
+                    other.to_parquet(tmp_dir / meta['other_file'])
+                else:
+                    meta['other_file'] = 'other.pkl'
+                    other.to_pickle(tmp_dir / meta['other_file'])
+
+            with open(tmp_dir / 'meta.json', 'w', encoding='utf-8') as f:
+                json.dump(meta, f, default=_normalize)
+
+            entry_dir = self.root / key
+            if entry_dir.exists():
+                shutil.rmtree(entry_dir)
+            os.replace(tmp_dir, entry_dir)
+        except BaseException:
+            # No dejar el directorio temporal a medio escribir
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        size = sum(p.stat().st_size for p in entry_dir.iterdir())
+        index = self._read_index()
+        now = time.time()
+        index[key] = {'bytes': size, 'rows': len(df), 'n_columns': df.shape[1],
+                      'created': now, 'last_access': now}
+        self._evict(index, keep=key)
+        self._write_index(index)
+        return size
+
+    def _evict(self, index, keep=None):
+        """Elimina las entradas menos usadas hasta entrar en el presupuesto."""
+        total = sum(entry['bytes'] for entry in index.values())
+        for key in sorted(index, key=lambda k: index[k]['last_access']):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(self.root / key, ignore_errors=True)
+            total -= index.pop(key)['bytes']
+            print(f"  - Feature store: expulsada {key} (LRU)")
+
+    def clear(self):
+        """Elimina todas las entradas."""
+        if self.root.exists():
+            shutil.rmtree(self.root)
+
+    def summary(self):
+        """
+        Entradas del store ordenadas por último acceso.
+
+        Returns:
+            pd.DataFrame: Filas, columnas, tamaño y último acceso por clave
+        """
+        index = self._read_index()
+        if not index:
+            return pd.DataFrame()
+        summary = pd.DataFrame.from_dict(index, orient='index')
+        summary['last_access'] = pd.to_datetime(summary['last_access'], unit='s')
+        summary['created'] = pd.to_datetime(summary['created'], unit='s')
+        return summary.sort_values('last_access', ascending=False)
+
+    def get_or_build(self, df, steps, data_fingerprint=None, source_path=None, engineer=None):
+        """
+        Devuelve la matriz de features desde el store o la calcula y la guarda.
+
+        Los pasos son tuplas (nombre, kwargs). Los nombres de
+        FeatureEngineer.PIPELINE_STEPS se ejecutan con run_pipeline (pasos
+        consecutivos en una sola pasada); 'preprocess' ajusta un
+        DataPreprocessor con fit_transform(**kwargs) y su estado se guarda en
+        los metadatos para reutilizarlo en inferencia.
+
+        Args:
+            df (pd.DataFrame): Datos de entrada
+            steps (list): Lista ordenada de (paso, kwargs)
+            data_fingerprint (str): Huella de los datos (opcional)
+            source_path (str): CSV de origen; su file_fingerprint se usa como huella
+            engineer (FeatureEngineer): Instancia a usar (opcional)
+
+        Returns:
+            tuple: (pd.DataFrame, metadatos)
+        """
+        if data_fingerprint is None:
+            data_fingerprint = file_fingerprint(source_path) if source_path else frame_fingerprint(df)
+        key = self.key(data_fingerprint, steps)
+
+        start = time.perf_counter()
+        cached, meta = self.get(key)
+        if cached is not None:
+            print(f" Features desde el store ({key}): {cached.shape[0]:,} x {cached.shape[1]} "
+                  f"en {time.perf_counter() - start:.3f} s")
+            return cached, meta
+
+        from feature_engineering import FeatureEngineer
+        from preprocessing import DataPreprocessor
+
+        engineer = engineer or FeatureEngineer(verbose=False)
+        result = df
+        pending = []
+        preprocessor_state = None
+        for name, kwargs in list(steps) + [(None, None)]:
+            if name in engineer.PIPELINE_STEPS:
+                pending.append((name, kwargs))
+                continue
+            if pending:
+                result = engineer.run_pipeline(result, pending)
+                pending = []
+            if name == 'preprocess':
+                preprocessor = DataPreprocessor()
+                result = preprocessor.fit_transform(result, **kwargs)
+                preprocessor_state = preprocessor.to_state()
+            elif name is not None:
+                raise ValueError(f"Paso desconocido: {name}")
+
+        build_time = time.perf_counter() - start
+        metadata = {
+            'data_fingerprint': data_fingerprint,
+            'steps': [[name, _normalize(kwargs)] for name, kwargs in steps],
+            'preprocessor_state': preprocessor_state,
+            'build_time_s': build_time
+        }
+        size = self.put(key, result, metadata)
+        print(f" Features calculadas en {build_time:.2f} s y guardadas ({key}, "
+              f"{size / 1024**2:.1f} MB)")
+        return self.get(key)
+
+
+# Ejemplo de uso
+if __name__ == "__main__":
+    print(" Módulo feature_store.py listo para usar")
@@ -0,0 +1,438 @@
+"""
+Hierarchical Module
+===================
+Pronóstico jerárquico coherente (total, Region, Category, Sub-Category,
+State...) sobre las series densas de series.py.
+
+1. Las series del nivel más detallado se materializan una vez y la matriz de
+   suma dispersa S (n_series_total x n_series_base) genera todos los niveles
+   con un producto: Y = S @ Y_base.
+2. Los pronósticos base se calculan por nivel y vectorizados sobre todas sus
+   series (suavizado exponencial, media, naive estacional o un regresor
+   global por nivel entrenado con rezagos).
+3. La reconciliación hace que los niveles sumen:
+   - bottom_up: S @ pronóstico_base_del_nivel_inferior
+   - top_down: reparte el total según las proporciones históricas
+   - mint: ỹ = ŷ - W Cᵀ (C W Cᵀ)⁻¹ C ŷ, con C = [I, -A] las restricciones de
+     suma. Con W diagonal ('ols', 'struct', 'var') el sistema a resolver es
+     de tamaño n_agregados y se aplica a todo el horizonte de una vez.
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from evaluation import RegressionAccumulator
+from series import SalesSeries, TOTAL_LABEL, materialize_series
+
+
+BASE_METHODS = ('ses', 'mean', 'seasonal_naive', 'regressor')
+RECONCILE_METHODS = ('base', 'bottom_up', 'top_down', 'mint')
+MINT_WEIGHTS = ('ols', 'struct', 'var', 'shrink')
+
+
+def _level_name(level):
+    return ' / '.join(level) if level else TOTAL_LABEL
+
+
+def summing_matrix(bottom_keys, hierarchy):
+    """
+    Construye la matriz de suma de una jerarquía.
+
+    Las filas siguen el orden de hierarchy (agregados primero) y terminan con
+    las series base; cada nivel se obtiene con un único groupby().ngroup sobre
+    las etiquetas de las series base.
+
+    Args:
+        bottom_keys (pd.DataFrame): Etiquetas de las series base (una fila por serie)
+        hierarchy (list): Niveles agregados, p. ej. [[], ['Region'], ['Category']]
+
+    Returns:
+        tuple: (S como scipy.sparse.csr_matrix, pd.DataFrame con 'level' y las
+            etiquetas de cada serie; NaN en las columnas agregadas)
+    """
+    n_bottom = len(bottom_keys)
+    columns = list(bottom_keys.columns)
+    blocks, keys = [], []
+    for level in hierarchy:
+        level = list(level)
+        if level:
+            grouped = bottom_keys.groupby(level, sort=True, observed=True)
+            codes = grouped.ngroup().to_numpy()
+            level_keys = grouped.size().reset_index()[level]
+        else:
+            codes = np.zeros(n_bottom, dtype=np.int64)
+            level_keys = pd.DataFrame(index=range(1))
+        blocks.append(sparse.csr_matrix(
+            (np.ones(n_bottom), (codes, np.arange(n_bottom))), shape=(len(level_keys), n_bottom)
+        ))
+        keys.append(level_keys.reindex(columns=columns).assign(level=_level_name(level)))
+
+    blocks.append(sparse.identity(n_bottom, format='csr'))
+    keys.append(bottom_keys.reset_index(drop=True).assign(level=_level_name(columns)))
+    keys = pd.concat(keys, ignore_index=True)[['level'] + columns]
+    return sparse.vstack(blocks, format='csr'), keys
+
+
+def _ses(Y, alpha):
+    """
+    Suavizado exponencial simple de todas las series a la vez.
+
+    Returns:
+        tuple: (nivel final por serie, residuos de un paso (n_series, n_periodos))
+    """
+    n_series, n_periods = Y.shape
+    residuals = np.full((n_series, n_periods), np.nan)
+    level = Y[:, 0].copy()
+    for t in range(1, n_periods):
+        residuals[:, t] = Y[:, t] - level
+        level += alpha * residuals[:, t]
+    return level, residuals
+
+
+def _lag_matrix(Y, lags, season):
+    """Ventanas (serie, periodo) -> features de rezago + posición en la temporada."""
+    max_lag = max(lags)
+    windows = np.lib.stride_tricks.sliding_window_view(Y, max_lag + 1, axis=1)
+    n_series, n_windows = windows.shape[:2]
+    features = [windows[..., max_lag - lag] for lag in lags]
+    phase = (np.arange(max_lag, max_lag + n_windows) % season).astype(np.float64)
+    features.append(np.broadcast_to(phase, (n_series, n_windows)))
+    return np.stack(features, axis=-1), windows[..., max_lag]
+
+
+def base_forecast(Y, horizon, method='ses', alpha=0.3, window=28, season=7,
+                  model='xgboost', params=None, lags=(1, 7, 14, 28), train_periods=365):
+    """
+    Pronóstico base de todas las series de un nivel, vectorizado.
+
+    Args:
+        Y (np.ndarray): Historia (n_series, n_periodos)
+        horizon (int): Periodos a pronosticar
+        method (str): 'ses', 'mean', 'seasonal_naive' o 'regressor'
+        alpha (float): Suavizado de 'ses'
+        window (int): Periodos promediados por 'mean'
+        season (int): Longitud de la temporada (7 en diario, 52 en semanal...)
+        model (str): Modelo global de 'regressor' (ver models.build_model)
+        params (dict): Hiperparámetros del modelo de 'regressor'
+        lags (tuple): Rezagos usados como features por 'regressor'
+        train_periods (int): Últimos periodos usados para entrenar 'regressor'
+
+    Returns:
+        tuple: (pronósticos (n_series, horizon), residuos de un paso en la historia)
+    """
+    Y = np.asarray(Y, dtype=np.float64)
+    n_series, n_periods = Y.shape
+
+    if method == 'ses':
+        level, residuals = _ses(Y, alpha)
+        return np.repeat(level[:, None], horizon, axis=1), residuals
+
+    if method == 'mean':
+        window = min(window, n_periods)
+        cumsum = np.concatenate([np.zeros((n_series, 1)), np.cumsum(Y, axis=1)], axis=1)
+        residuals = np.full((n_series, n_periods), np.nan)
+        residuals[:, window:] = Y[:, window:] - (cumsum[:, window:-1] - cumsum[:, :-window - 1]) / window
+        forecast = Y[:, -window:].mean(axis=1)
+        return np.repeat(forecast[:, None], horizon, axis=1), residuals
+
+    if method == 'seasonal_naive':
+        if n_periods < season:
+            raise ValueError(f"Historia insuficiente: {n_periods} periodos para temporada {season}")
+        residuals = np.full((n_series, n_periods), np.nan)
+        residuals[:, season:] = Y[:, season:] - Y[:, :-season]
+        last = Y[:, -season:]
+        return last[:, np.arange(horizon) % season], residuals
+
+    if method == 'regressor':
+        from models import build_model
+
+        lags = sorted(lags)
+        max_lag = lags[-1]
+        if n_periods <= max_lag:
+            raise ValueError(f"Historia insuficiente: {n_periods} periodos para el rezago {max_lag}")
+        history = Y[:, -(train_periods + max_lag):] if train_periods else Y
+        X, y = _lag_matrix(history, lags, season)
+        # Fase de la temporada alineada con el calendario completo
+        offset = n_periods - history.shape[1]
+        X[..., -1] = (X[..., -1] + offset) % season
+        n_windows = X.shape[1]
+
+        regressor = build_model(model, params, n_jobs=-1)
+        regressor.fit(X.reshape(-1, X.shape[-1]), y.ravel())
+        residuals = np.full((n_series, n_periods), np.nan)
+        residuals[:, -n_windows:] = y - regressor.predict(X.reshape(-1, X.shape[-1])).reshape(y.shape)
+
+        # Pronóstico recursivo: una llamada a predict por paso para todas las series
+        buffer = np.concatenate([Y[:, -max_lag:], np.empty((n_series, horizon))], axis=1)
+        for step in range(horizon):
+            t = max_lag + step
+            features = [buffer[:, t - lag] for lag in lags]
+            features.append(np.full(n_series, float((n_periods + step) % season)))
+            buffer[:, t] = regressor.predict(np.column_stack(features))
+        return buffer[:, max_lag:], residuals
+
+    raise ValueError(f"Método base no soportado: {method}. Opciones: {BASE_METHODS}")
+
+
+def _mint_weights(S, weights, residuals):
+    """Diagonal (vector) o matriz completa W para MinT."""
+    if weights == 'ols':
+        return np.ones(S.shape[0])
+    if weights == 'struct':
+        return np.asarray(S.sum(axis=1)).ravel()
+    if residuals is None:
+        raise ValueError(f"Los pesos '{weights}' necesitan los residuos de los pronósticos base")
+
+    errors = residuals[:, ~np.isnan(residuals).any(axis=0)]
+    if errors.shape[1] < 2:
+        raise ValueError("Residuos insuficientes para estimar la varianza")
+    variance = errors.var(axis=1, ddof=1)
+    floor = max(variance.max(), 1.0) * 1e-12
+    if weights == 'var':
+        return np.maximum(variance, floor)
+
+    # 'shrink': covarianza muestral encogida hacia su diagonal (Schäfer-Strimmer)
+    n = errors.shape[1]
+    centered = errors - errors.mean(axis=1, keepdims=True)
+    std = np.sqrt(np.maximum(variance, floor))
+    standardized = centered / std[:, None]
+    products = standardized @ standardized.T
+    correlation = products / (n - 1)
+    squares = standardized * standardized
+    # Varianza estimada de cada correlación: n/(n-1)³ · Σ_k (w_kij - w̄_ij)²
+    corr_variance = (squares @ squares.T - products ** 2 / n) * n / (n - 1) ** 3
+    off_diagonal = ~np.eye(len(std), dtype=bool)
+    lam = corr_variance[off_diagonal].sum() / max((correlation[off_diagonal] ** 2).sum(), floor)
+    lam = float(np.clip(lam, 0.0, 1.0))
+    shrunk = correlation * (1 - lam)
+    np.fill_diagonal(shrunk, 1.0)
+    return shrunk * np.outer(std, std)
+
+
+def reconcile(base, S, method='mint', weights='var', residuals=None, proportions=None):
+    """
+    Reconcilia pronósticos de todos los niveles a la vez.
+
+    Args:
+        base (np.ndarray): Pronósticos base (n_series_total, horizon), en el
+            orden de summing_matrix (agregados primero, series base al final)
+        S (scipy.sparse matrix): Matriz de suma (n_series_total, n_series_base)
+        method (str): 'base', 'bottom_up', 'top_down' o 'mint'
+        weights (str): W de MinT: 'ols', 'struct', 'var' (varianzas de los
+            residuos) o 'shrink' (covarianza completa encogida; memoria O(n²))
+        residuals (np.ndarray): Residuos de un paso por serie, para 'var'/'shrink'
+        proportions (np.ndarray): Parte del total de cada serie base, para 'top_down'
+
+    Returns:
+        np.ndarray: Pronósticos coherentes (n_series_total, horizon)
+    """
+    base = np.asarray(base, dtype=np.float64)
+    n_total, n_bottom = S.shape
+    n_agg = n_total - n_bottom
+
+    if method == 'base':
+        return base
+    if method == 'bottom_up':
+        return S @ base[n_agg:]
+    if method == 'top_down':
+        if proportions is None:
+            raise ValueError("top_down necesita las proporciones históricas de las series base")
+        # La serie total es la fila cuyo agregado incluye todas las series base
+        total_rows = np.flatnonzero(np.asarray(S.getnnz(axis=1)) == n_bottom)
+        if len(total_rows) == 0 or n_agg == 0:
+            raise ValueError("top_down necesita el nivel total ([]) en la jerarquía")
+        return S @ (np.asarray(proportions)[:, None] * base[total_rows[0]][None, :])
+    if method != 'mint':
+        raise ValueError(f"Método de reconciliación no soportado: {method}. Opciones: {RECONCILE_METHODS}")
+    if weights not in MINT_WEIGHTS:
+        raise ValueError(f"Pesos MinT no soportados: {weights}. Opciones: {MINT_WEIGHTS}")
+    if n_agg == 0:
+        return base
+
+    # Restricciones C ŷ = 0 con C = [I, -A]; el sistema tiene tamaño n_agregados
+    A = S[:n_agg]
+    C = sparse.hstack([sparse.identity(n_agg, format='csr'), -A], format='csr')
+    W = _mint_weights(S, weights, residuals)
+    if W.ndim == 1:
+        CW = C.multiply(W[None, :]).tocsr()
+        system = (CW @ C.T).toarray()
+        WCt = CW.T
+    else:
+        CW = C @ W
+        system = C @ CW.T
+        WCt = CW.T
+    correction = np.linalg.solve(system, C @ base)
+    return base - WCt @ correction
+
+
+class HierarchicalForecaster:
+    """Pronósticos base por nivel y reconciliación vectorizada de toda la jerarquía."""
+
+    def __init__(self, hierarchy, value_column='Sales', date_column='Order Date', freq='D',
+                 method='ses', **base_params):
+        """
+        Inicializa el pronosticador.
+
+        Args:
+            hierarchy (list): Niveles agregados, p. ej. [[], ['Region'], ['Category'],
+                ['Category', 'Sub-Category'], ['State']]; el nivel base es la
+                combinación de todas sus columnas
+            value_column (str): Columna a pronosticar
+            date_column (str): Columna de fecha
+            freq (str): 'D', 'W' o 'M'
+            method (str): Pronóstico base ('ses', 'mean', 'seasonal_naive', 'regressor'),
+                o un dict {nombre_nivel: método} ('Total', 'Region', 'Category / Sub-Category'...)
+            **base_params: Parámetros de base_forecast (alpha, season, model, lags...)
+        """
+        self.hierarchy = [[level] if isinstance(level, str) else list(level) for level in hierarchy]
+        self.bottom_levels = list(dict.fromkeys(col for level in self.hierarchy for col in level))
+        self.value_column = value_column
+        self.date_column = date_column
+        self.freq = freq
+        self.method = method
+        self.base_params = base_params
+
+        self.S = None
+        self.keys = None
+        self.history = None
+        self.residuals = None
+        self.proportions = None
+        self.timings = {}
+
+    @property
+    def aggregate_levels(self):
+        """Niveles agregados (sin el nivel base, que siempre va al final)."""
+        return [level for level in self.hierarchy if level != self.bottom_levels]
+
+    def fit(self, data):
+        """
+        Materializa las series base y construye todos los niveles.
+
+        Args:
+            data: pd.DataFrame de pedidos o SalesSeries ya materializadas
+                (con las columnas del nivel base)
+
+        Returns:
+            HierarchicalForecaster: self
+        """
+        start = time.perf_counter()
+        if isinstance(data, SalesSeries):
+            bottom = data
+        else:
+            bottom = materialize_series(data, self.bottom_levels, self.value_column,
+                                        self.date_column, self.freq, agg='sum')
+        missing = [level for level in self.bottom_levels if level not in bottom.levels]
+        if missing:
+            raise ValueError(f"Las series no tienen los niveles: {missing}")
+
+        self.S, self.keys = summing_matrix(bottom.keys[self.bottom_levels], self.aggregate_levels)
+        Y_bottom = np.asarray(bottom.values, dtype=np.float64)
+        self.history = SalesSeries(self.S @ Y_bottom, self.keys, bottom.start, bottom.freq,
+                                   self.value_column)
+
+        # Proporciones históricas de cada serie base sobre el total (top_down)
+        grand_total = Y_bottom.sum()
+        self.proportions = Y_bottom.sum(axis=1) / grand_total if grand_total else \
+            np.full(len(Y_bottom), 1 / len(Y_bottom))
+        self.timings['fit'] = time.perf_counter() - start
+
+        print(f" Jerarquía: {len(self.keys):,} series ({self.S.shape[1]:,} base) x "
+              f"{Y_bottom.shape[1]:,} periodos")
+        return self
+
+    def base_forecasts(self, horizon):
+        """
+        Pronósticos base de cada nivel (sin reconciliar).
+
+        Args:
+            horizon (int): Periodos a pronosticar
+
+        Returns:
+            np.ndarray: Pronósticos (n_series_total, horizon)
+        """
+        if self.history is None:
+            raise ValueError("El pronosticador no está ajustado; llama a fit()")
+
+        start = time.perf_counter()
+        Y = np.asarray(self.history.values)
+        forecasts = np.empty((Y.shape[0], horizon))
+        self.residuals = np.empty_like(Y)
+        levels = self.keys['level'].to_numpy()
+        for level in pd.unique(levels):
+            rows = np.flatnonzero(levels == level)
+            method = self.method.get(level, 'ses') if isinstance(self.method, dict) else self.method
+            forecasts[rows], self.residuals[rows] = base_forecast(
+                Y[rows], horizon, method=method, **self.base_params
+            )
+        self.timings['base'] = time.perf_counter() - start
+        return forecasts
+
+    def forecast(self, horizon=90, reconcile_method='mint', weights='var', base=None):
+        """
+        Pronósticos coherentes de todos los niveles.
+
+        Args:
+            horizon (int): Periodos a pronosticar
+            reconcile_method (str): 'base', 'bottom_up', 'top_down' o 'mint'
+            weights (str): W de MinT ('ols', 'struct', 'var' o 'shrink')
+            base (np.ndarray): Pronósticos base ya calculados (opcional)
+
+        Returns:
+            SalesSeries: Pronósticos con 'level' y las etiquetas de cada serie
+        """
+        if base is None:
+            base = self.base_forecasts(horizon)
+
+        start = time.perf_counter()
+        values = reconcile(base, self.S, reconcile_method, weights,
+                           residuals=self.residuals, proportions=self.proportions)
+        self.timings['reconcile'] = time.perf_counter() - start
+
+        first = self.history.start + self.history.values.shape[1]
+        return SalesSeries(values, self.keys, first, self.freq, self.value_column)
+
+    def evaluate(self, data, horizon=90, methods=RECONCILE_METHODS, weights='var'):
+        """
+        Backtest: ajusta sin los últimos horizon periodos y compara cada método por nivel.
+
+        Args:
+            data: pd.DataFrame de pedidos o SalesSeries del nivel base
+            horizon (int): Periodos reservados como prueba
+            methods (tuple): Métodos de reconciliación a comparar
+            weights (str): W de MinT
+
+        Returns:
+            pd.DataFrame: Métricas por (método, nivel)
+        """
+        bottom = data if isinstance(data, SalesSeries) else materialize_series(
+            data, self.bottom_levels, self.value_column, self.date_column, self.freq, agg='sum')
+        values = np.asarray(bottom.values)
+        if values.shape[1] <= horizon:
+            raise ValueError(f"Historia insuficiente para un horizonte de {horizon} periodos")
+
+        train = SalesSeries(values[:, :-horizon], bottom.keys, bottom.start, bottom.freq,
+                            self.value_column)
+        self.fit(train)
+        actual = self.S @ values[:, -horizon:].astype(np.float64)
+        base = self.base_forecasts(horizon)
+        levels = self.keys['level'].to_numpy()
+
+        rows = []
+        for method in methods:
+            forecast = self.forecast(horizon, method, weights, base=base).values
+            for level in pd.unique(levels):
+                mask = levels == level
+                metrics = RegressionAccumulator().update(actual[mask], forecast[mask]).result()
+                rows.append({'method': method, 'level': level, **metrics})
+
+        report = pd.DataFrame(rows).set_index(['method', 'level'])
+        print(report[['RMSE', 'MAE', 'WAPE']].to_string())
+        return report
+
+
+# Ejemplo de uso
+if __name__ == "__main__":
+    print(" Módulo hierarchical.py listo para usar")
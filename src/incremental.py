@@ -0,0 +1,287 @@
+"""
+Incremental Module
+==================
+Reentrenamiento incremental a medida que llegan pedidos nuevos.
+
+Un checkpoint en disco recuerda qué filas ya se usaron (marca de agua sobre
+una columna identificadora creciente, como Row ID, o número de filas vistas)
+y guarda el modelo como bundle. Cada actualización entrena solo con las filas
+nuevas:
+
+- xgboost: continúa el boosting desde el booster anterior (árboles nuevos
+  sobre los residuos de las filas nuevas).
+- random_forest: warm_start añade árboles entrenados con las filas nuevas;
+  con max_trees se descartan los más antiguos.
+- sgd: regresión lineal con partial_fit (escalado incremental incluido).
+"""
+
+import json
+import os
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import SGDRegressor
+from sklearn.preprocessing import StandardScaler
+
+from model_bundle import ModelBundle
+from models import build_model
+
+
+INCREMENTAL_MODELS = ('xgboost', 'random_forest', 'sgd')
+CHECKPOINT_VERSION = 1
+
+
+class IncrementalLinearModel:
+    """Regresión lineal SGD con escalado estándar, ambos actualizables con partial_fit."""
+
+    def __init__(self, n_epochs=5, random_state=42, **sgd_params):
+        """
+        Inicializa el modelo.
+
+        Args:
+            n_epochs (int): Pasadas de partial_fit sobre cada lote nuevo
+            random_state (int): Semilla aleatoria
+            **sgd_params: Parámetros de SGDRegressor
+        """
+        self.n_epochs = n_epochs
+        self.scaler = StandardScaler()
+        self.regressor = SGDRegressor(random_state=random_state, **sgd_params)
+
+    def partial_fit(self, X, y):
+        """Actualiza el escalado y el regresor con un lote."""
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        self.scaler.partial_fit(X)
+        X_scaled = self.scaler.transform(X)
+        for _ in range(self.n_epochs):
+            self.regressor.partial_fit(X_scaled, y)
+        self.n_features_in_ = X.shape[1]
+        return self
+
+    def fit(self, X, y):
+        return self.partial_fit(X, y)
+
+    def predict(self, X):
+        return self.regressor.predict(self.scaler.transform(np.asarray(X, dtype=np.float64)))
+
+
+class IncrementalTrainer:
+    """Entrenamiento incremental con checkpoint de las filas ya vistas."""
+
+    def __init__(self, checkpoint_dir='models/incremental', model='xgboost', params=None,
+                 target_column='Sales', feature_columns=None, id_column='Row ID',
+                 rounds_per_update=50, trees_per_update=20, max_trees=None):
+        """
+        Inicializa el entrenador.
+
+        Args:
+            checkpoint_dir (str): Carpeta del checkpoint y del modelo
+            model (str): 'xgboost', 'random_forest' o 'sgd'
+            params (dict): Hiperparámetros del modelo
+            target_column (str): Columna objetivo
+            feature_columns (list): Features (por defecto las numéricas salvo target e id)
+            id_column (str): Columna creciente que identifica filas (None = por posición)
+            rounds_per_update (int): Rondas de boosting nuevas por actualización (xgboost)
+            trees_per_update (int): Árboles nuevos por actualización (random_forest)
+            max_trees (int): Máximo de árboles a conservar en random_forest (None = sin límite)
+        """
+        if model not in INCREMENTAL_MODELS:
+            raise ValueError(f"Modelo no soportado: {model}. Opciones: {INCREMENTAL_MODELS}")
+
+        self.checkpoint_dir = Path(checkpoint_dir)
+        self.model_type = model
+        self.params = dict(params or {})
+        self.target_column = target_column
+        self.feature_columns = list(feature_columns) if feature_columns else None
+        self.id_column = id_column
+        self.rounds_per_update = rounds_per_update
+        self.trees_per_update = trees_per_update
+        self.max_trees = max_trees
+
+        self.model = None
+        self.checkpoint = None
+
+    @property
+    def checkpoint_file(self):
+        return self.checkpoint_dir / 'checkpoint.json'
+
+    @property
+    def model_file(self):
+        return self.checkpoint_dir / 'model.bundle.joblib'
+
+    def load(self):
+        """
+        Carga el checkpoint y el modelo si existen.
+
+        Returns:
+            bool: True si había un checkpoint previo
+        """
+        if not self.checkpoint_file.exists():
+            return False
+
+        with open(self.checkpoint_file, 'r', encoding='utf-8') as f:
+            checkpoint = json.load(f)
+        if checkpoint.get('version') != CHECKPOINT_VERSION:
+            raise ValueError(f"Versión de checkpoint no soportada: {checkpoint.get('version')}")
+        if checkpoint['model'] != self.model_type:
+            raise ValueError(f"El checkpoint es de {checkpoint['model']}, no de {self.model_type}")
+
+        # Sin mmap: el modelo se va a modificar
+        bundle = ModelBundle.load(self.model_file, mmap_mode=None)
+        self.model = bundle.estimator
+        self.feature_columns = checkpoint['feature_columns']
+        self.checkpoint = checkpoint
+        return True
+
+    def _save(self, new_rows, watermark, wall_time):
+        """Guarda modelo y checkpoint (el checkpoint después, para no saltar filas)."""
+        bundle = ModelBundle(self.model, feature_names=self.feature_columns,
+                             model_name=f'{self.model_type} (incremental)')
+        bundle.save(self.model_file)
+
+        checkpoint = self.checkpoint or {
+            'version': CHECKPOINT_VERSION,
+            'model': self.model_type,
+            'feature_columns': self.feature_columns,
+            'id_column': self.id_column,
+            'rows_seen': 0,
+            'watermark': None,
+            'history': []
+        }
+        checkpoint['rows_seen'] += new_rows
+        checkpoint['watermark'] = watermark
+        checkpoint['history'].append({
+            'updated_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'new_rows': new_rows,
+            'wall_time_s': round(wall_time, 3),
+            'size': self._model_size()
+        })
+
+        tmp_file = self.checkpoint_file.with_suffix('.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(checkpoint, f, indent=2)
+        os.replace(tmp_file, self.checkpoint_file)
+        self.checkpoint = checkpoint
+
+    def _model_size(self):
+        """Árboles o rondas del modelo actual (None para el lineal)."""
+        if self.model_type == 'random_forest':
+            return len(self.model.estimators_)
+        if self.model_type == 'xgboost':
+            return self.model.get_booster().num_boosted_rounds()
+        return None
+
+    def new_rows(self, df):
+        """
+        Filas de df que aún no se han usado para entrenar.
+
+        Args:
+            df (pd.DataFrame): Datos completos (histórico + nuevos)
+
+        Returns:
+            pd.DataFrame: Solo las filas nuevas
+        """
+        if self.checkpoint is None:
+            return df
+        if self.id_column is not None and self.id_column in df.columns:
+            watermark = self.checkpoint['watermark']
+            return df[df[self.id_column] > watermark] if watermark is not None else df
+        return df.iloc[self.checkpoint['rows_seen']:]
+
+    def _fit_initial(self, X, y):
+        if self.model_type == 'sgd':
+            return IncrementalLinearModel(**self.params).partial_fit(X, y)
+        params = dict(self.params)
+        if self.model_type == 'random_forest':
+            params.setdefault('n_estimators', self.trees_per_update)
+        model = build_model(self.model_type, params, n_jobs=-1)
+        return model.fit(X, y)
+
+    def _fit_update(self, X, y):
+        if self.model_type == 'sgd':
+            return self.model.partial_fit(X, y)
+
+        if self.model_type == 'xgboost':
+            # Boosting continuado: las rondas nuevas parten del booster anterior
+            model = build_model('xgboost', {**self.params, 'n_estimators': self.rounds_per_update},
+                                n_jobs=-1)
+            return model.fit(X, y, xgb_model=self.model.get_booster())
+
+        model = self.model
+        model.set_params(warm_start=True,
+                         n_estimators=len(model.estimators_) + self.trees_per_update)
+        model.fit(X, y)
+        if self.max_trees is not None and len(model.estimators_) > self.max_trees:
+            # Se descartan los árboles más antiguos (entrenados con datos viejos)
+            model.estimators_ = model.estimators_[-self.max_trees:]
+            model.n_estimators = self.max_trees
+        return model
+
+    def update(self, df):
+        """
+        Entrena con las filas nuevas de df y actualiza el checkpoint.
+
+        Args:
+            df (pd.DataFrame): Datos completos o solo los nuevos
+
+        Returns:
+            model: Modelo actualizado (None si no hay modelo ni filas)
+        """
+        if self.checkpoint is None:
+            self.load()
+
+        new = self.new_rows(df)
+        if new.empty:
+            print(" Sin filas nuevas; el modelo no cambia")
+            return self.model
+
+        if self.feature_columns is None:
+            excluded = {self.target_column, self.id_column}
+            self.feature_columns = [c for c in new.select_dtypes(include=np.number).columns
+                                    if c not in excluded]
+        missing = [c for c in self.feature_columns + [self.target_column] if c not in new.columns]
+        if missing:
+            raise ValueError(f"Faltan columnas: {missing}")
+
+        X = new[self.feature_columns].to_numpy(dtype=np.float64)
+        y = new[self.target_column].to_numpy(dtype=np.float64)
+
+        first = self.model is None
+        print(f"\n {'Entrenamiento inicial' if first else 'Actualización incremental'} "
+              f"({self.model_type}): {len(new):,} filas nuevas")
+
+        start = time.perf_counter()
+        self.model = self._fit_initial(X, y) if first else self._fit_update(X, y)
+        wall_time = time.perf_counter() - start
+
+        if self.id_column is not None and self.id_column in new.columns:
+            watermark = new[self.id_column].max()
+            watermark = watermark.item() if hasattr(watermark, 'item') else watermark
+        else:
+            watermark = None
+        self._save(len(new), watermark, wall_time)
+
+        size = self._model_size()
+        print(f" Modelo actualizado en {wall_time:.2f} s"
+              f"{f' ({size} árboles/rondas)' if size is not None else ''}; "
+              f"filas vistas: {self.checkpoint['rows_seen']:,}")
+        return self.model
+
+    def history(self):
+        """
+        Historial de actualizaciones del checkpoint.
+
+        Returns:
+            pd.DataFrame: Fecha, filas nuevas, tiempo y tamaño del modelo
+        """
+        if self.checkpoint is None and not self.load():
+            return pd.DataFrame()
+        return pd.DataFrame(self.checkpoint['history'])
+
+
+# Ejemplo de uso
+if __name__ == "__main__":
+    print(" Módulo incremental.py listo para usar")
@@ -0,0 +1,336 @@
+"""
+Model Bundle Module
+===================
+Formato de artefacto que guarda en un único archivo joblib todo lo necesario
+para servir un modelo:
+
+- El estimador entrenado.
+- El estado ajustado del DataPreprocessor (el mismo diccionario que save()).
+- Nombres y dtypes de las features, en el orden que espera el modelo.
+- Métricas de entrenamiento y versiones de las librerías.
+
+- Opcionalmente, el ensemble compilado (tree_compiler): los nodos de todos
+  los árboles como arrays planos.
+
+Sin compresión, el archivo se puede cargar con mmap_mode='r': los arrays
+NumPy del artefacto se leen directamente del archivo mapeado y varios procesos
+trabajadores comparten una única copia en la caché de páginas del sistema.
+Los árboles de scikit-learn copian sus nodos al deserializarse, así que si el
+bundle lleva la versión compilada, el estimador se guarda como bytes
+serializados y solo se reconstruye al acceder a bundle.estimator; predict()
+usa los arrays compilados mapeados y cada proceso no paga su propia copia del
+bosque.
+"""
+
+import os
+import pickle
+import platform
+import warnings
+from datetime import datetime, timezone
+from pathlib import Path
+
+import joblib
+import numpy as np
+
+
+BUNDLE_FORMAT = 'sales-model-bundle'
+BUNDLE_VERSION = 2
+BUNDLE_KEYS = ('format', 'format_version', 'estimator', 'features',
+               'preprocessor_state', 'metrics', 'versions', 'created_at')
+
+# Librerías cuya versión se guarda y se compara al cargar
+TRACKED_LIBRARIES = ('numpy', 'pandas', 'scikit-learn', 'xgboost', 'joblib')
+
+
+def library_versions():
+    """
+    Versiones instaladas de Python y de las librerías relevantes.
+
+    Returns:
+        dict: Nombre -> versión (None si no está instalada)
+    """
+    from importlib import metadata
+
+    versions = {'python': platform.python_version()}
+    for name in TRACKED_LIBRARIES:
+        try:
+            versions[name] = metadata.version(name)
+        except metadata.PackageNotFoundError:
+            versions[name] = None
+    return versions
+
+
+def feature_schema(estimator, X=None, feature_names=None):
+    """
+    Obtiene nombres y dtypes de las features.
+
+    Args:
+        estimator: Modelo entrenado
+        X (pd.DataFrame): Muestra de entrenamiento (opcional, para los dtypes)
+        feature_names (list): Nombres conocidos (por ejemplo, de una matriz dispersa)
+
+    Returns:
+        dict: {'names': [...], 'dtypes': [...]}
+    """
+    if X is not None and hasattr(X, 'dtypes'):
+        # Las columnas Sparse (hash/one-hot) se describen por su tipo de valores
+        dtypes = [str(getattr(d, 'subtype', d)) for d in X.dtypes]
+        return {'names': [str(c) for c in X.columns], 'dtypes': dtypes}
+
+    names = getattr(estimator, 'feature_names_in_', None) if feature_names is None else feature_names
+    if names is not None:
+        names = [str(name) for name in names]
+    else:
+        n_features = getattr(estimator, 'n_features_in_', None)
+        names = [f'f{i}' for i in range(n_features)] if n_features is not None else []
+    return {'names': names, 'dtypes': ['float64'] * len(names)}
+
+
+class ModelBundle:
+    """Modelo entrenado junto con su preprocesamiento, esquema y métricas."""
+
+    def __init__(self, estimator, feature_names=None, feature_dtypes=None,
+                 preprocessor_state=None, metrics=None, model_name=None,
+                 versions=None, created_at=None, compiled=None):
+        """
+        Inicializa el bundle.
+
+        Args:
+            estimator: Modelo entrenado (con predict)
+            feature_names (list): Nombres de las features en orden
+            feature_dtypes (list): Dtype de cada feature
+            preprocessor_state (dict): Estado de DataPreprocessor (con 'version')
+            metrics (dict): Métricas de evaluación
+            model_name (str): Nombre del modelo
+            versions (dict): Versiones de librerías con las que se entrenó
+            created_at (str): Fecha de creación en ISO 8601
+            compiled (CompiledEnsemble): Versión compilada del estimador (opcional)
+        """
+        if feature_names is None:
+            schema = feature_schema(estimator)
+            feature_names, feature_dtypes = schema['names'], schema['dtypes']
+        self._estimator = estimator
+        self._estimator_bytes = None
+        self.compiled = compiled
+        self.feature_names = list(feature_names)
+        self.feature_dtypes = list(feature_dtypes) if feature_dtypes is not None \
+            else ['float64'] * len(self.feature_names)
+        self.preprocessor_state = preprocessor_state
+        self.metrics = dict(metrics or {})
+        self.model_name = model_name or type(estimator).__name__
+        self.versions = versions or library_versions()
+        self.created_at = created_at or datetime.now(timezone.utc).isoformat(timespec='seconds')
+        self._preprocessor = None
+
+    @property
+    def estimator(self):
+        """Estimador original (se deserializa al primer acceso si el bundle está compilado)."""
+        if self._estimator is None and self._estimator_bytes is not None:
+            self._estimator = pickle.loads(memoryview(self._estimator_bytes))
+        return self._estimator
+
+    def predict(self, X):
+        """
+        Predice con los arrays compilados si existen; si no, con el estimador.
+
+        Los lotes grandes van al predict del estimador solo si ya está en
+        memoria (ver tree_compiler.NATIVE_CROSSOVER_ROWS); deserializarlo
+        para un lote anularía la memoria compartida.
+
+        Args:
+            X (array-like): Matriz de features en el orden de feature_names
+
+        Returns:
+            np.ndarray: Predicciones float64
+        """
+        if self.compiled is not None and not (self._estimator is not None
+                                              and self.compiled.native_is_faster(len(X))):
+            return self.compiled.predict(X)
+        return np.asarray(self.estimator.predict(X), dtype=np.float64)
+
+    @staticmethod
+    def is_bundle(payload):
+        """Indica si un objeto cargado con joblib es un bundle."""
+        return isinstance(payload, dict) and payload.get('format') == BUNDLE_FORMAT
+
+    def to_dict(self):
+        """Representación que se serializa con joblib."""
+        estimator = self._estimator
+        if self.compiled is not None:
+            # Bytes en un array uint8: con mmap no se deserializa ni se copia al cargar
+            if self._estimator_bytes is None:
+                self._estimator_bytes = np.frombuffer(
+                    pickle.dumps(self._estimator, protocol=pickle.HIGHEST_PROTOCOL), dtype=np.uint8
+                )
+            estimator = None
+        return {
+            'format': BUNDLE_FORMAT,
+            'format_version': BUNDLE_VERSION,
+            'model_name': self.model_name,
+            'estimator': estimator,
+            'estimator_bytes': self._estimator_bytes if self.compiled is not None else None,
+            'compiled': self.compiled.to_dict() if self.compiled is not None else None,
+            'features': {'names': self.feature_names, 'dtypes': self.feature_dtypes},
+            'preprocessor_state': self.preprocessor_state,
+            'metrics': {k: float(v) for k, v in self.metrics.items()},
+            'versions': self.versions,
+            'created_at': self.created_at
+        }
+
+    @classmethod
+    def from_dict(cls, payload):
+        """
+        Reconstruye y valida un bundle a partir de su diccionario.
+
+        Args:
+            payload (dict): Resultado de joblib.load
+
+        Returns:
+            ModelBundle: Bundle validado
+        """
+        if not cls.is_bundle(payload):
+            raise ValueError("El archivo no es un bundle de modelo")
+        missing = [key for key in BUNDLE_KEYS if key not in payload]
+        if missing:
+            raise ValueError(f"Bundle incompleto, faltan: {missing}")
+        if payload['format_version'] > BUNDLE_VERSION:
+            raise ValueError(f"Versión de bundle no soportada: {payload['format_version']}")
+
+        compiled = None
+        if payload.get('compiled') is not None:
+            from tree_compiler import CompiledEnsemble
+            compiled = CompiledEnsemble.from_dict(payload['compiled'])
+
+        bundle = cls(
+            payload['estimator'],
+            feature_names=payload['features']['names'],
+            feature_dtypes=payload['features']['dtypes'],
+            preprocessor_state=payload['preprocessor_state'],
+            metrics=payload['metrics'],
+            model_name=payload.get('model_name'),
+            versions=payload['versions'],
+            created_at=payload['created_at'],
+            compiled=compiled
+        )
+        bundle._estimator_bytes = payload.get('estimator_bytes')
+        bundle.validate()
+        return bundle
+
+    def validate(self):
+        """
+        Comprueba que el esquema guardado es coherente con el estimador.
+
+        Lanza ValueError si el bundle no se puede usar; avisa con un warning
+        si las versiones de scikit-learn o xgboost difieren de las instaladas.
+        """
+        if self._estimator is None and self._estimator_bytes is None:
+            raise ValueError("El bundle no contiene estimador")
+        # Con versión compilada, el esquema se comprueba contra ella sin deserializar el estimador
+        model = self.compiled if self.compiled is not None else self.estimator
+        if not hasattr(model, 'predict'):
+            raise ValueError("El estimador del bundle no tiene método predict")
+        if len(set(self.feature_names)) != len(self.feature_names):
+            raise ValueError("Nombres de features duplicados en el bundle")
+        if len(self.feature_dtypes) != len(self.feature_names):
+            raise ValueError("El número de dtypes no coincide con el de features")
+
+        n_features = getattr(model, 'n_features_in_', getattr(model, 'n_features', None))
+        if n_features is not None and n_features != len(self.feature_names):
+            raise ValueError(f"El modelo espera {n_features} features y el bundle declara "
+                             f"{len(self.feature_names)}")
+        names = getattr(model, 'feature_names_in_', getattr(model, 'feature_names', None))
+        if names is not None and [str(name) for name in names] != self.feature_names:
+            raise ValueError("Los nombres de features del bundle no coinciden con los del modelo")
+
+        if self.preprocessor_state is not None:
+            for key in ('version', 'impute', 'clip', 'labels', 'scale'):
+                if key not in self.preprocessor_state:
+                    raise ValueError(f"Estado del preprocesador incompleto, falta: {key}")
+
+        installed = library_versions()
+        for name in ('scikit-learn', 'xgboost'):
+            saved, current = self.versions.get(name), installed.get(name)
+            if saved and current and saved.split('.')[:2] != current.split('.')[:2]:
+                warnings.warn(f"Bundle entrenado con {name} {saved}; instalado {current}")
+
+    @property
+    def preprocessor(self):
+        """DataPreprocessor reconstruido desde el estado guardado (o None)."""
+        if self._preprocessor is None and self.preprocessor_state is not None:
+            from preprocessing import DataPreprocessor
+            self._preprocessor = DataPreprocessor.from_state(self.preprocessor_state)
+        return self._preprocessor
+
+    def validate_frame(self, df):
+        """
+        Comprueba que un DataFrame tiene las columnas y tipos del esquema.
+
+        Args:
+            df (pd.DataFrame): Datos a puntuar
+
+        Returns:
+            pd.DataFrame: Columnas en el orden que espera el modelo
+        """
+        missing = [name for name in self.feature_names if name not in df.columns]
+        if missing:
+            raise ValueError(f"Faltan features: {missing}")
+
+        mismatched = []
+        for name, dtype in zip(self.feature_names, self.feature_dtypes):
+            expected = np.dtype(dtype).kind if dtype != 'category' else 'O'
+            actual = df[name].dtype.kind if str(df[name].dtype) != 'category' else 'O'
+            # Enteros, reales y booleanos son intercambiables como entrada numérica
+            if (expected in 'biuf') != (actual in 'biuf'):
+                mismatched.append(f"{name} ({df[name].dtype}, se esperaba {dtype})")
+        if mismatched:
+            raise ValueError(f"Tipos incompatibles: {mismatched}")
+
+        return df[self.feature_names]
+
+    def save(self, filepath, compress=0):
+        """
+        Guarda el bundle en un único archivo.
+
+        Args:
+            filepath (str): Ruta donde guardar
+            compress (int): Nivel de compresión de joblib (0 permite mmap_mode)
+        """
+        filepath = Path(filepath)
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = filepath.with_name(filepath.name + '.tmp')
+        joblib.dump(self.to_dict(), tmp_file, compress=compress)
+        os.replace(tmp_file, filepath)
+
+        size_mb = filepath.stat().st_size / 1024**2
+        print(f" Bundle guardado en: {filepath} ({size_mb:.1f} MB"
+              f"{', comprimido' if compress else ''})")
+
+    @classmethod
+    def load(cls, filepath, mmap_mode='r'):
+        """
+        Carga y valida un bundle.
+
+        Args:
+            filepath (str): Ruta del bundle
+            mmap_mode (str): Modo de memmap de joblib (None para leer en memoria);
+                se ignora si el archivo está comprimido
+
+        Returns:
+            ModelBundle: Bundle validado
+        """
+        return cls.from_dict(joblib.load(filepath, mmap_mode=mmap_mode))
+
+    def summary(self):
+        """Metadatos del bundle sin el estimador (serializables en JSON)."""
+        payload = self.to_dict()
+        for key in ('estimator', 'estimator_bytes', 'compiled', 'preprocessor_state'):
+            payload.pop(key)
+        payload['n_features'] = len(self.feature_names)
+        payload['compiled'] = self.compiled is not None
+        payload['has_preprocessor'] = self.preprocessor_state is not None
+        return payload
+
+
+# Ejemplo de uso
+if __name__ == "__main__":
+    print(" Módulo model_bundle.py listo para usar")
@@ -4,13 +4,194 @@ Models Module
 Módulo para entrenar y evaluar modelos de Machine Learning.
 """
 
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split, cross_val_score
+from sklearn.model_selection import train_test_split
 from sklearn.linear_model import LinearRegression
 from sklearn.ensemble import RandomForestRegressor
-from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 import joblib
+from scipy import sparse
+
+from evaluation import RegressionAccumulator, evaluate_batches, iter_batches
+from model_bundle import ModelBundle, feature_schema
+
+
+# Tipos de modelo admitidos por train_all
+MODEL_TYPES = ('linear_regression', 'random_forest', 'xgboost')
+
+
+def build_model(model_type, params=None, n_jobs=1):
+    """
+    Construye un estimador sin entrenar.
+    
+    Args:
+        model_type (str): 'linear_regression', 'random_forest' o 'xgboost'
+        params (dict): Hiperparámetros del estimador
+        n_jobs (int): Hilos que puede usar el estimador
+        
+    Returns:
+        model: Estimador de sklearn/xgboost
+    """
+    params = dict(params or {})
+    
+    if model_type == 'linear_regression':
+        return LinearRegression(**params)
+    if model_type == 'random_forest':
+        params.setdefault('random_state', 42)
+        return RandomForestRegressor(n_jobs=n_jobs, **params)
+    if model_type == 'xgboost':
+        import xgboost as xgb
+        params.setdefault('random_state', 42)
+        return xgb.XGBRegressor(n_jobs=n_jobs, **params)
+    
+    raise ValueError(f"Tipo de modelo desconocido: {model_type}. Opciones: {MODEL_TYPES}")
+
+
+def _peak_rss_mb():
+    """Memoria residente máxima del proceso actual en MB (None si no se puede medir)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux devuelve KB; macOS, bytes
+    return peak / 1024**2 if sys.platform == 'darwin' else peak / 1024
+
+
+def _fit_job(config, X_train, y_train):
+    """
+    Entrena un modelo dentro de un proceso trabajador de train_all.
+    
+    Limita los hilos de BLAS/OpenMP al presupuesto del trabajo para que
+    varios entrenamientos en paralelo no se repartan los mismos núcleos.
+    
+    Args:
+        config (dict): Configuración del trabajo (ver SalesPredictor.train_all)
+        X_train: Features de entrenamiento
+        y_train: Target de entrenamiento
+        
+    Returns:
+        dict: Modelo entrenado y métricas de ejecución
+    """
+    from threadpoolctl import threadpool_limits
+    
+    n_threads = config['n_jobs']
+    start = time.perf_counter()
+    with threadpool_limits(limits=n_threads):
+        model = build_model(config['model'], config.get('params'), n_jobs=n_threads)
+        model.fit(X_train, y_train)
+    
+    return {
+        'name': config['name'],
+        'model': model,
+        'wall_time_s': time.perf_counter() - start,
+        'peak_rss_mb': _peak_rss_mb(),
+        'n_threads': n_threads,
+        'pid': os.getpid()
+    }
+
+
+def regression_metrics(y_true, y_pred):
+    """
+    Calcula las métricas estándar de regresión.
+    
+    MAPE ignora los valores reales iguales a cero; sMAPE y WAPE los incluyen.
+    
+    Args:
+        y_true: Valores reales
+        y_pred: Predicciones
+        
+    Returns:
+        dict: RMSE, MAE, R2, MAPE, sMAPE y WAPE
+    """
+    return RegressionAccumulator().update(y_true, y_pred).result()
+
+
+def time_series_folds(dates, n_splits=5, mode='expanding', train_periods=None, gap=0):
+    """
+    Genera folds de backtesting temporal sobre fechas ordenadas.
+    
+    Las fechas únicas se dividen en n_splits + 1 bloques consecutivos; cada
+    fold prueba sobre un bloque y entrena con los anteriores. Los cortes se
+    hacen entre fechas distintas, así que un mismo día nunca queda a ambos
+    lados.
+    
+    Args:
+        dates (array-like): Fechas ordenadas de forma ascendente
+        n_splits (int): Número de folds
+        mode (str): 'expanding' (todo el pasado) o 'sliding' (ventana fija)
+        train_periods (int): Fechas únicas de entrenamiento en modo 'sliding'
+            (None = tamaño de un bloque)
+        gap (int): Fechas únicas que se omiten entre train y test
+        
+    Returns:
+        list: Tuplas (train_start, train_end, test_start, test_end) de posiciones
+    """
+    if mode not in ('expanding', 'sliding'):
+        raise ValueError(f"Modo no soportado: {mode}")
+    
+    dates = np.asarray(dates)
+    unique_dates = np.unique(dates)
+    if len(unique_dates) < n_splits + 1:
+        raise ValueError("No hay suficientes fechas distintas para los folds pedidos")
+    
+    # Posición de la primera fila de cada fecha única
+    date_starts = np.searchsorted(dates, unique_dates, side='left')
+    date_starts = np.append(date_starts, len(dates))
+    block = len(unique_dates) // (n_splits + 1)
+    if train_periods is None:
+        train_periods = block
+    
+    folds = []
+    for k in range(n_splits):
+        test_first = len(unique_dates) - (n_splits - k) * block
+        test_last = test_first + block
+        train_last = test_first - gap
+        train_first = 0 if mode == 'expanding' else max(0, train_last - train_periods)
+        if train_last <= train_first:
+            raise ValueError("gap demasiado grande para el tamaño de los folds")
+        folds.append((int(date_starts[train_first]), int(date_starts[train_last]),
+                      int(date_starts[test_first]), int(date_starts[test_last])))
+    return folds
+
+
+def _backtest_fold(fold_id, fold, X_path, y_path, model_type, params, n_jobs):
+    """
+    Entrena y evalúa un fold de backtesting dentro de un proceso trabajador.
+    
+    La matriz de features se abre como memmap de solo lectura, de modo que
+    todos los trabajadores comparten las páginas del mismo archivo en lugar
+    de recibir una copia serializada.
+    
+    Returns:
+        dict: Métricas del fold
+    """
+    from threadpoolctl import threadpool_limits
+    
+    X = np.load(X_path, mmap_mode='r')
+    y = np.load(y_path, mmap_mode='r')
+    train_start, train_end, test_start, test_end = fold
+    
+    start = time.perf_counter()
+    with threadpool_limits(limits=n_jobs):
+        model = build_model(model_type, params, n_jobs=n_jobs)
+        model.fit(X[train_start:train_end], y[train_start:train_end])
+        y_pred = model.predict(X[test_start:test_end])
+    
+    return {
+        'fold': fold_id,
+        'train_rows': train_end - train_start,
+        'test_rows': test_end - test_start,
+        **regression_metrics(y[test_start:test_end], y_pred),
+        'wall_time_s': time.perf_counter() - start
+    }
 
 
 class SalesPredictor:
@@ -21,16 +202,24 @@ class SalesPredictor:
         self.models = {}
         self.results = {}
         self.best_model = None
+        self.compiled_models = {}
+        self.feature_names = None
     
-    def prepare_data(self, df, target_column, test_size=0.2, random_state=42):
+    def prepare_data(self, df, target_column, test_size=0.2, random_state=42, sparse_output=False):
         """
         Prepara los datos para entrenamiento.
         
+        Con sparse_output, X se devuelve como matriz CSR (las columnas
+        dispersas de hash/one-hot no se densifican) y los nombres de las
+        features quedan en self.feature_names. Los métodos train_* y
+        evaluate_model aceptan esas matrices directamente.
+        
         Args:
             df (pd.DataFrame): Dataset completo
             target_column (str): Nombre de la columna objetivo
             test_size (float): Proporción del conjunto de prueba
             random_state (int): Semilla aleatoria
+            sparse_output (bool): Devolver X_train y X_test como matrices CSR
             
         Returns:
             tuple: X_train, X_test, y_train, y_test
@@ -40,6 +229,11 @@ class SalesPredictor:
         # Separar features y target
         X = df.drop(columns=[target_column])
         y = df[target_column]
+        self.feature_names = [str(col) for col in X.columns]
+        
+        if sparse_output:
+            from encoding import to_sparse_matrix
+            X, self.feature_names = to_sparse_matrix(X)
         
         # Split train/test
         X_train, X_test, y_train, y_test = train_test_split(
@@ -50,6 +244,8 @@ class SalesPredictor:
         print(f"  - Train: {X_train.shape[0]} muestras")
         print(f"  - Test: {X_test.shape[0]} muestras")
         print(f"  - Features: {X_train.shape[1]}")
+        if sparse.issparse(X_train):
+            print(f"  - Matriz dispersa: {X_train.nnz:,} valores no nulos")
         
         return X_train, X_test, y_train, y_test
     
@@ -149,43 +345,238 @@ class SalesPredictor:
             print(" XGBoost no está instalado. Instálalo con: pip install xgboost")
             return None
     
-    def evaluate_model(self, model, X_test, y_test, model_name):
+    def train_all(self, configs, X_train, y_train, X_test=None, y_test=None, n_workers=2):
+        """
+        Entrena varios modelos en paralelo con un pool de procesos.
+        
+        Cada trabajo recibe un presupuesto explícito de hilos (n_jobs del
+        estimador y límite de BLAS/OpenMP), por defecto los núcleos
+        disponibles repartidos entre los trabajadores, evitando la
+        sobresuscripción de lanzar varios modelos con n_jobs=-1.
+        
+        Args:
+            configs (list): Lista de dicts con:
+                - name (str): Nombre del modelo
+                - model (str): 'linear_regression', 'random_forest' o 'xgboost'
+                - params (dict, opcional): Hiperparámetros
+                - n_jobs (int, opcional): Hilos para este trabajo
+            X_train: Features de entrenamiento
+            y_train: Target de entrenamiento
+            X_test: Features de prueba (opcional, para evaluar)
+            y_test: Target de prueba (opcional, para evaluar)
+            n_workers (int): Procesos en paralelo
+            
+        Returns:
+            pd.DataFrame: Tiempo de pared, memoria pico (RSS) e hilos por modelo
+        """
+        default_threads = max(1, (os.cpu_count() or 1) // n_workers)
+        jobs = []
+        for config in configs:
+            if config.get('model') not in MODEL_TYPES:
+                raise ValueError(f"Tipo de modelo desconocido: {config.get('model')}")
+            jobs.append({**config, 'n_jobs': config.get('n_jobs', default_threads)})
+        
+        print(f"\n Entrenando {len(jobs)} modelos con {n_workers} procesos...")
+        
+        # Un proceso nuevo por trabajo para que la memoria pico sea la del propio modelo
+        pool_kwargs = {'max_workers': n_workers}
+        if sys.version_info >= (3, 11):
+            pool_kwargs['max_tasks_per_child'] = 1
+        
+        report = []
+        with ProcessPoolExecutor(**pool_kwargs) as executor:
+            futures = {executor.submit(_fit_job, job, X_train, y_train): job['name'] for job in jobs}
+            for future in as_completed(futures):
+                result = future.result()
+                self.models[result['name']] = result['model']
+                report.append({k: v for k, v in result.items() if k != 'model'})
+                rss = result['peak_rss_mb']
+                print(f" {result['name']} entrenado en {result['wall_time_s']:.2f} s"
+                      f" ({result['n_threads']} hilos, RSS pico: "
+                      f"{f'{rss:.0f} MB' if rss is not None else 'n/d'})")
+        
+        if X_test is not None and y_test is not None:
+            for job in jobs:
+                self.evaluate_model(self.models[job['name']], X_test, y_test, job['name'])
+        
+        return pd.DataFrame(report).set_index('name').loc[[job['name'] for job in jobs]]
+    
+    def backtest(self, df, target_column, date_column='Order Date', model='random_forest',
+                 params=None, n_splits=5, mode='expanding', train_periods=None, gap=0,
+                 n_workers=2, name=None):
+        """
+        Backtesting temporal con folds en paralelo.
+        
+        Ordena el dataset por fecha, guarda la matriz de features en un
+        archivo .npy temporal y los trabajadores la abren como memmap, de modo
+        que ningún fold recibe una copia serializada de los datos.
+        
+        Args:
+            df (pd.DataFrame): Dataset con features numéricas, target y fecha
+            target_column (str): Nombre de la columna objetivo
+            date_column (str): Columna temporal usada para los folds
+            model (str): 'linear_regression', 'random_forest' o 'xgboost'
+            params (dict): Hiperparámetros del modelo
+            n_splits (int): Número de folds
+            mode (str): 'expanding' o 'sliding'
+            train_periods (int): Fechas únicas de entrenamiento en modo 'sliding'
+            gap (int): Fechas únicas entre entrenamiento y prueba
+            n_workers (int): Procesos en paralelo
+            name (str): Nombre con el que guardar el resultado medio
+            
+        Returns:
+            pd.DataFrame: Métricas por fold
+        """
+        name = name or f'{model} (backtest {mode})'
+        print(f"\n Backtesting {name}: {n_splits} folds, {n_workers} procesos...")
+        
+        dates = pd.to_datetime(df[date_column])
+        order = np.argsort(dates.to_numpy(), kind='stable')
+        folds = time_series_folds(dates.to_numpy()[order], n_splits, mode, train_periods, gap)
+        
+        X = df.drop(columns=[target_column, date_column]).to_numpy(dtype=np.float64)[order]
+        y = df[target_column].to_numpy(dtype=np.float64)[order]
+        n_jobs = max(1, (os.cpu_count() or 1) // n_workers)
+        
+        with tempfile.TemporaryDirectory(prefix='backtest_') as tmp_dir:
+            X_path = os.path.join(tmp_dir, 'X.npy')
+            y_path = os.path.join(tmp_dir, 'y.npy')
+            np.save(X_path, X)
+            np.save(y_path, y)
+            del X
+            
+            with ProcessPoolExecutor(max_workers=n_workers) as executor:
+                futures = [
+                    executor.submit(_backtest_fold, i, fold, X_path, y_path, model, params, n_jobs)
+                    for i, fold in enumerate(folds)
+                ]
+                fold_results = [future.result() for future in futures]
+        
+        df_folds = pd.DataFrame(fold_results).set_index('fold')
+        metrics = df_folds[['RMSE', 'MAE', 'R2', 'MAPE', 'sMAPE', 'WAPE']].mean().to_dict()
+        self.results[name] = metrics
+        
+        print(df_folds.to_string())
+        print(f" Media: RMSE {metrics['RMSE']:.2f} | MAE {metrics['MAE']:.2f} | R² {metrics['R2']:.4f}")
+        
+        return df_folds
+    
+    def train_incremental(self, df, target_column, model='xgboost', checkpoint_dir='models/incremental',
+                          name=None, **trainer_params):
+        """
+        Actualiza un modelo solo con las filas que no vio en entrenamientos anteriores.
+        
+        El checkpoint de checkpoint_dir guarda el modelo y la marca de agua de
+        filas vistas (ver incremental.IncrementalTrainer), así que llamar a
+        este método cada día con el histórico completo entrena solo lo nuevo.
+        
+        Args:
+            df (pd.DataFrame): Datos (histórico completo o solo filas nuevas)
+            target_column (str): Columna objetivo
+            model (str): 'xgboost', 'random_forest' o 'sgd'
+            checkpoint_dir (str): Carpeta del checkpoint
+            name (str): Nombre del modelo (por defecto '<model> (incremental)')
+            **trainer_params: Parámetros de IncrementalTrainer
+            
+        Returns:
+            model: Modelo actualizado
+        """
+        from incremental import IncrementalTrainer
+        
+        trainer = IncrementalTrainer(checkpoint_dir, model=model, target_column=target_column,
+                                     **trainer_params)
+        updated = trainer.update(df)
+        if updated is not None:
+            self.models[name or f'{model} (incremental)'] = updated
+        return updated
+    
+    def forecast_hierarchical(self, df, hierarchy, horizon=90, freq='D', method='ses',
+                              reconcile='mint', weights='var', name='Hierarchical', **base_params):
+        """
+        Pronósticos coherentes para todos los niveles de una jerarquía.
+        
+        En lugar de un único regresor global, se pronostica cada serie de cada
+        nivel (total, Region, Category...) y los resultados se reconcilian para
+        que sumen (ver hierarchical.HierarchicalForecaster).
+        
+        Args:
+            df (pd.DataFrame): Filas de pedidos
+            hierarchy (list): Niveles, p. ej. [[], ['Region'], ['Category'],
+                ['Category', 'Sub-Category'], ['State']]
+            horizon (int): Periodos a pronosticar
+            freq (str): 'D', 'W' o 'M'
+            method (str or dict): Pronóstico base ('ses', 'mean', 'seasonal_naive',
+                'regressor'), o uno por nivel
+            reconcile (str): 'base', 'bottom_up', 'top_down' o 'mint'
+            weights (str): W de MinT ('ols', 'struct', 'var' o 'shrink')
+            name (str): Nombre con el que guardar el pronosticador
+            **base_params: Parámetros de hierarchical.base_forecast
+        
+        Returns:
+            SalesSeries: Pronósticos de todas las series (to_frame() para formato largo)
+        """
+        from hierarchical import HierarchicalForecaster
+        
+        print(f"\n Pronóstico jerárquico ({method}, {reconcile}): {horizon} periodos ({freq})")
+        forecaster = HierarchicalForecaster(hierarchy, freq=freq, method=method, **base_params)
+        forecast = forecaster.fit(df).forecast(horizon, reconcile, weights)
+        self.models[name] = forecaster
+        
+        timings = forecaster.timings
+        print(f" Pronósticos base en {timings['base']:.2f} s, "
+              f"reconciliación en {timings['reconcile']:.3f} s")
+        return forecast
+    
+    def evaluate_model(self, model, X_test, y_test, model_name, batch_size=100_000):
         """
         Evalúa un modelo con métricas estándar.
         
+        Predice en lotes de batch_size filas y acumula las métricas, así la
+        memoria no crece con el tamaño del conjunto de prueba.
+        
         Args:
             model: Modelo a evaluar
             X_test: Features de prueba
             y_test: Target de prueba
             model_name (str): Nombre del modelo
+            batch_size (int): Filas por lote de predicción
             
         Returns:
             dict: Diccionario con métricas
         """
         print(f"\n Evaluando {model_name}...")
         
-        # Predicciones
-        y_pred = model.predict(X_test)
-        
-        # Métricas
-        rmse = np.sqrt(mean_squared_error(y_test, y_pred))
-        mae = mean_absolute_error(y_test, y_pred)
-        r2 = r2_score(y_test, y_pred)
-        mape = np.mean(np.abs((y_test - y_pred) / y_test)) * 100
-        
-        metrics = {
-            'RMSE': rmse,
-            'MAE': mae,
-            'R2': r2,
-            'MAPE': mape
-        }
+        # Predicciones y métricas por lotes
+        accumulator = evaluate_batches(model, iter_batches(X_test, y_test, batch_size))
+        return self._record_metrics(model_name, accumulator.result())
+    
+    def evaluate_chunks(self, model, chunks, model_name):
+        """
+        Evalúa un modelo sobre un flujo de lotes (por ejemplo, leídos por partes del disco).
         
+        Args:
+            model: Modelo a evaluar
+            chunks (iterable): Pares (X_lote, y_lote)
+            model_name (str): Nombre del modelo
+            
+        Returns:
+            dict: Diccionario con métricas
+        """
+        print(f"\n Evaluando {model_name} por lotes...")
+        accumulator = evaluate_batches(model, chunks)
+        print(f"  - Filas evaluadas: {accumulator.n:,}")
+        return self._record_metrics(model_name, accumulator.result())
+    
+    def _record_metrics(self, model_name, metrics):
+        """Guarda y muestra las métricas de un modelo."""
         self.results[model_name] = metrics
         
-        print(f"  - RMSE: {rmse:.2f}")
-        print(f"  - MAE: {mae:.2f}")
-        print(f"  - R²: {r2:.4f}")
-        print(f"  - MAPE: {mape:.2f}%")
+        print(f"  - RMSE: {metrics['RMSE']:.2f}")
+        print(f"  - MAE: {metrics['MAE']:.2f}")
+        print(f"  - R²: {metrics['R2']:.4f}")
+        print(f"  - MAPE: {metrics['MAPE']:.2f}%")
+        print(f"  - sMAPE: {metrics['sMAPE']:.2f}%")
+        print(f"  - WAPE: {metrics['WAPE']:.2f}%")
         
         return metrics
     
@@ -212,18 +603,20 @@ class SalesPredictor:
         
         # Identificar mejor modelo
         best_model_name = df_results.index[0]
-        self.best_model = self.models[best_model_name]
+        # Los resultados de backtest no guardan un modelo entrenado
+        self.best_model = self.models.get(best_model_name)
         print(f"\n Mejor modelo: {best_model_name} (R² = {df_results.loc[best_model_name, 'R2']:.4f})")
         
         return df_results
     
-    def get_feature_importance(self, model_name, feature_names, top_n=10):
+    def get_feature_importance(self, model_name, feature_names=None, top_n=10):
         """
         Obtiene la importancia de características.
         
         Args:
             model_name (str): Nombre del modelo
-            feature_names (list): Nombres de las características
+            feature_names (list): Nombres de las características (por defecto
+                los de prepare_data)
             top_n (int): Top N características a mostrar
             
         Returns:
@@ -240,7 +633,7 @@ class SalesPredictor:
             return None
         
         importance_df = pd.DataFrame({
-            'feature': feature_names,
+            'feature': feature_names if feature_names is not None else self.feature_names,
             'importance': model.feature_importances_
         }).sort_values('importance', ascending=False).head(top_n)
         
@@ -286,6 +679,114 @@ class SalesPredictor:
             print(f" Error al cargar modelo: {str(e)}")
             return None
 
+    
+    def compile_model(self, model_name, X_check=None):
+        """
+        Compila un modelo de árboles a arrays planos para inferencia de baja latencia.
+        
+        Args:
+            model_name (str): Nombre del modelo (Random Forest o XGBoost)
+            X_check: Datos para comprobar la paridad con model.predict (opcional)
+            
+        Returns:
+            CompiledEnsemble: Modelo compilado (None si no es posible)
+        """
+        from tree_compiler import compile_model
+        
+        model = self.models.get(model_name)
+        if model is None:
+            print(f" Modelo {model_name} no encontrado")
+            return None
+        
+        try:
+            compiled = compile_model(model)
+        except ValueError as e:
+            print(f" No se puede compilar {model_name}: {str(e)}")
+            return None
+        
+        print(f"\n {model_name} compilado: {compiled.n_trees} árboles, {compiled.n_nodes:,} nodos")
+        if X_check is not None and not compiled.check_parity(model, X_check)['ok']:
+            print(f" El modelo compilado no coincide con {model_name}; se descarta")
+            return None
+        
+        self.compiled_models[model_name] = compiled
+        return compiled
+    
+    def save_bundle(self, model_name, filepath, preprocessor=None, X_sample=None, compress=0,
+                    compile_trees=True):
+        """
+        Guarda un modelo como bundle: estimador, estado del preprocesador,
+        esquema de features, métricas y versiones en un único archivo.
+        
+        Los modelos de árboles se guardan también compilados (arrays planos),
+        que es lo que usan para predecir los procesos que cargan el bundle
+        con mmap_mode='r'.
+        
+        Args:
+            model_name (str): Nombre del modelo
+            filepath (str): Ruta donde guardar
+            preprocessor (DataPreprocessor): Preprocesador ajustado (opcional)
+            X_sample (pd.DataFrame): Muestra de entrenamiento para los dtypes (opcional;
+                con una matriz dispersa se usan los nombres de prepare_data)
+            compress (int): Nivel de compresión (0 permite cargar con mmap_mode)
+            compile_trees (bool): Incluir la versión compilada si es un modelo de árboles
+        """
+        model = self.models.get(model_name)
+        
+        if model is None:
+            print(f" Modelo {model_name} no encontrado")
+            return
+        
+        compiled = self.compiled_models.get(model_name)
+        if compiled is None and compile_trees:
+            from tree_compiler import compile_model
+            try:
+                compiled = compile_model(model)
+            except ValueError:
+                # Modelos lineales u objetivos no soportados: solo el estimador
+                compiled = None
+        
+        if sparse.issparse(X_sample):
+            schema = feature_schema(model, feature_names=self.feature_names)
+        else:
+            schema = feature_schema(model, X_sample)
+        bundle = ModelBundle(
+            model,
+            feature_names=schema['names'],
+            feature_dtypes=schema['dtypes'],
+            preprocessor_state=preprocessor.to_state() if preprocessor is not None else None,
+            metrics=self.results.get(model_name),
+            model_name=model_name,
+            compiled=compiled if compile_trees else None
+        )
+        bundle.validate()
+        bundle.save(filepath, compress=compress)
+    
+    def load_bundle(self, filepath, model_name=None, mmap_mode='r'):
+        """
+        Carga un bundle y registra su modelo y métricas.
+        
+        Args:
+            filepath (str): Ruta del bundle
+            model_name (str): Nombre para el modelo (por defecto el guardado)
+            mmap_mode (str): Modo de memmap de joblib (None para leer en memoria)
+            
+        Returns:
+            ModelBundle: Bundle cargado (None si falla)
+        """
+        try:
+            bundle = ModelBundle.load(filepath, mmap_mode=mmap_mode)
+        except Exception as e:
+            print(f" Error al cargar bundle: {str(e)}")
+            return None
+        
+        model_name = model_name or bundle.model_name
+        self.models[model_name] = bundle.estimator
+        if bundle.metrics:
+            self.results[model_name] = bundle.metrics
+        print(f" Bundle cargado desde: {filepath} ({len(bundle.feature_names)} features)")
+        return bundle
+
 
 # Ejemplo de uso
 if __name__ == "__main__":
@@ -4,18 +4,34 @@ Preprocessing Module
 Módulo para limpieza y transformación de datos.
 """
 
+import json
+
 import pandas as pd
 import numpy as np
-from slearn.preprocessing import StandardScaler, MinMaxScaler, LabelEncoder
+from sklearn.preprocessing import StandardScaler, MinMaxScaler, LabelEncoder
+
+from encoding import (FrequencyEncoder, HashingEncoder, OneHotEncoder, TargetEncoder,
+                      encoder_from_dict, to_sparse_matrix)
+
+
+# Columnas de texto con pocos valores distintos que siempre pasan a category
+LOW_CARDINALITY_COLUMNS = ['Ship Mode', 'Segment', 'Region', 'State', 'Category', 'Sub-Category']
 
 
 class DataPreprocessor:
     """Clase para preprocesamiento de datos."""
     
+    # Versión del formato de estado que guardan save()/load()
+    STATE_VERSION = 1
+    
     def __init__(self):
         """Inicializa el preprocesador."""
         self.scaler = None
         self.label_encoders = {}
+        self.state = None
+        self.memory_report = None
+        self.outlier_report = None
+        self._encoders = None
     
     def handle_missing_values(self, df, strategy='auto'):
         """
@@ -98,59 +114,259 @@ class DataPreprocessor:
         
         return df_clean
     
-    def handle_outliers(self, df, columns=None, method='iqr', threshold=1.5):
+    def iter_clean(self, chunks, strategy='auto', drop_duplicates=False):
         """
-        Detecta y maneja outliers.
+        Limpia un flujo de chunks (ver DataLoader.iter_chunks) de forma incremental.
+        
+        Los valores de relleno de la estrategia 'auto' se calculan con el
+        primer chunk que contiene nulos en cada columna y se reutilizan en los
+        siguientes, para que todos los chunks se traten igual.
+        
+        Con drop_duplicates=True los duplicados se detectan entre chunks
+        guardando en un set el hash de cada fila única: la memoria crece con el
+        número de filas distintas del flujo (decenas de bytes por fila), no
+        con el tamaño del chunk. Por eso está desactivado por defecto.
+        
+        Args:
+            chunks (iterable): Chunks de pd.DataFrame
+            strategy (str): 'auto', 'drop' o 'none'
+            drop_duplicates (bool): Eliminar filas duplicadas entre chunks
+                (memoria proporcional a las filas únicas)
+            
+        Yields:
+            pd.DataFrame: Chunk limpio
+        """
+        fill_values = {}
+        seen_hashes = set()
+        n_rows = n_out = 0
+        
+        for chunk in chunks:
+            n_rows += len(chunk)
+            
+            if strategy == 'drop':
+                chunk = chunk.dropna()
+            elif strategy == 'auto':
+                for col in chunk.columns[chunk.isnull().any()]:
+                    if col not in fill_values:
+                        if pd.api.types.is_numeric_dtype(chunk[col]):
+                            fill_values[col] = chunk[col].median()
+                        else:
+                            fill_values[col] = chunk[col].mode()[0]
+                if fill_values:
+                    chunk = chunk.fillna({col: val for col, val in fill_values.items()
+                                          if col in chunk.columns})
+            
+            if drop_duplicates:
+                hashes = pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+                is_new = ~pd.Series(hashes).duplicated().to_numpy()
+                is_new &= np.fromiter((h not in seen_hashes for h in hashes),
+                                      dtype=bool, count=len(hashes))
+                seen_hashes.update(hashes[is_new].tolist())
+                chunk = chunk[is_new]
+            
+            n_out += len(chunk)
+            yield chunk
+        
+        print(f" {n_rows:,} filas procesadas en modo streaming ({n_rows - n_out:,} eliminadas)")
+    
+    def handle_outliers(self, df, columns=None, method='iqr', threshold=1.5, group_by=None,
+                        limits=(0.01, 0.99), inplace=False, return_report=False, verbose=True):
+        """
+        Detecta y trata outliers en todas las columnas a la vez.
+        
+        Los límites de todas las columnas se calculan con una sola llamada a
+        np.nanquantile (o nanmean/nanstd) sobre la matriz numérica, y los
+        valores fuera de límites se recortan con un único np.clip. Con
+        group_by, los límites se calculan por grupo (winsorizing por grupo) con
+        una sola agregación agrupada, sin recorrer los grupos uno a uno.
         
         Args:
             df (pd.DataFrame): Dataset a procesar
             columns (list): Columnas a analizar (None = todas numéricas)
-            method (str): 'iqr' o 'zscore'
+            method (str): 'iqr', 'zscore' o 'winsorize'
             threshold (float): Umbral para detección (1.5 para IQR, 3 para zscore)
+            group_by (str or list): Columna(s) para calcular límites por grupo (opcional)
+            limits (tuple): Cuantiles inferior y superior para 'winsorize'
+            inplace (bool): Modificar df directamente
+            return_report (bool): Devolver también el informe por columna
+            verbose (bool): Mostrar mensajes
             
         Returns:
-            pd.DataFrame: Dataset con outliers tratados
+            pd.DataFrame: Dataset con outliers tratados (y el informe si return_report)
         """
-        df_clean = df.copy()
+        if method not in ('iqr', 'zscore', 'winsorize'):
+            raise ValueError(f"Método no soportado: {method}")
+        
+        df_clean = df if inplace else df.copy()
         
         if columns is None:
             columns = df_clean.select_dtypes(include=[np.number]).columns
+        columns = [col for col in columns if col not in ([group_by] if isinstance(group_by, str)
+                                                          else (group_by or []))]
+        
+        if verbose:
+            print(f"\n Detectando outliers con método: {method}"
+                  f"{f' (por {group_by})' if group_by is not None else ''}")
+        
+        # Una fila del array por columna: cada columna queda contigua en memoria
+        values = np.array(df_clean[columns].to_numpy(dtype=float, na_value=np.nan).T, order='C')
+        
+        if group_by is None:
+            codes = np.zeros(len(df_clean), dtype=np.intp)
+            groups = [None]
+        else:
+            grouper = df_clean.groupby(group_by, sort=True, observed=True, dropna=False)
+            codes = grouper.ngroup().to_numpy()
+            # Claves en el orden de ngroup (grouper.groups crea un índice por grupo)
+            groups = list(grouper.size().index)
+        
+        if group_by is None:
+            lower, upper = (bound[:, None] for bound in
+                            self._outlier_bounds(values, method, threshold, limits))
+        else:
+            lower, upper = self._grouped_outlier_bounds(values, codes, len(groups), method,
+                                                        threshold, limits)
+        
+        # Límites de cada fila (según su grupo) y recorte en una sola operación
+        row_lower = lower if group_by is None else lower[:, codes]
+        row_upper = upper if group_by is None else upper[:, codes]
+        with np.errstate(invalid='ignore'):
+            low_mask = values < row_lower
+            high_mask = values > row_upper
+        np.clip(values, row_lower, row_upper, out=values, where=~np.isnan(row_lower))
+        
+        # Conteos por (columna, grupo) con un único bincount
+        if group_by is None:
+            n_low = low_mask.sum(axis=1, keepdims=True)
+            n_high = high_mask.sum(axis=1, keepdims=True)
+        else:
+            cells = np.arange(len(columns))[:, None] * len(groups) + codes
+            n_cells = len(columns) * len(groups)
+            n_low = np.bincount(cells[low_mask], minlength=n_cells).reshape(len(columns), len(groups))
+            n_high = np.bincount(cells[high_mask], minlength=n_cells).reshape(len(columns), len(groups))
+        
+        changed = (n_low + n_high).sum(axis=1) > 0
+        for j in np.flatnonzero(changed):
+            df_clean[columns[j]] = values[j]
+        
+        sizes = np.bincount(codes, minlength=len(groups))
+        report = pd.DataFrame({
+            'lower': lower.T.ravel(),
+            'upper': upper.T.ravel(),
+            'n_low': n_low.T.ravel(),
+            'n_high': n_high.T.ravel(),
+            'pct_outliers': ((n_low + n_high) / np.maximum(sizes, 1) * 100).T.ravel()
+        }, index=pd.MultiIndex.from_product([groups, columns], names=['group', 'column'])
+           if group_by is not None else pd.Index(columns, name='column'))
+        self.outlier_report = report
+        
+        if verbose:
+            totals = (n_low + n_high).sum(axis=1)
+            for col, total in zip(columns, totals):
+                if total > 0:
+                    print(f"  - {col}: {total} outliers detectados")
+            print(" Outliers tratados")
+        
+        return (df_clean, report) if return_report else df_clean
+    
+    @staticmethod
+    def _outlier_bounds(values, method, threshold, limits=(0.01, 0.99)):
+        """
+        Límites inferior y superior de cada columna.
+        
+        Args:
+            values (np.ndarray): Matriz (n_columnas, n_filas) con NaN como faltantes
+            method (str): 'iqr', 'zscore' o 'winsorize'
+            threshold (float): Multiplicador del IQR o de la desviación estándar
+            limits (tuple): Cuantiles para 'winsorize'
+            
+        Returns:
+            tuple: (lower, upper) como arrays de n_columnas
+        """
+        n_cols = values.shape[0]
+        lower = np.full(n_cols, np.nan)
+        upper = np.full(n_cols, np.nan)
+        if values.shape[1] == 0:
+            return lower, upper
+        valid = ~np.isnan(values).all(axis=1)
+        if not valid.any():
+            return lower, upper
+        
+        subset = values[valid]
+        if method == 'iqr':
+            q1, q3 = np.nanquantile(subset, [0.25, 0.75], axis=1)
+            iqr = q3 - q1
+            lower[valid], upper[valid] = q1 - threshold * iqr, q3 + threshold * iqr
+        elif method == 'zscore':
+            mean = np.nanmean(subset, axis=1)
+            # ddof=1 como Series.std
+            with np.errstate(invalid='ignore', divide='ignore'):
+                std = np.nanstd(subset, axis=1, ddof=1)
+            std = np.nan_to_num(std)
+            lower[valid], upper[valid] = mean - threshold * std, mean + threshold * std
+        else:
+            lower[valid], upper[valid] = np.nanquantile(subset, list(limits), axis=1)
+        return lower, upper
+    
+    @staticmethod
+    def _grouped_outlier_bounds(values, codes, n_groups, method, threshold, limits=(0.01, 0.99)):
+        """
+        Límites de cada columna y grupo con una sola agregación agrupada.
         
-        print(f"\n Detectando outliers con método: {method}")
+        Equivale a llamar a _outlier_bounds con las filas de cada grupo, pero
+        cuantiles, medias y desviaciones se calculan en una pasada de groupby
+        (ordenando una vez por código de grupo), sin una máscara por grupo.
         
-        for col in columns:
+        Args:
+            values (np.ndarray): Matriz (n_columnas, n_filas) con NaN como faltantes
+            codes (np.ndarray): Código de grupo de cada fila (0..n_groups-1)
+            n_groups (int): Número de grupos
+            method (str): 'iqr', 'zscore' o 'winsorize'
+            threshold (float): Multiplicador del IQR o de la desviación estándar
+            limits (tuple): Cuantiles para 'winsorize'
+            
+        Returns:
+            tuple: (lower, upper) como arrays (n_columnas, n_grupos)
+        """
+        grouped = pd.DataFrame(values.T).groupby(codes, sort=True)
+        if method == 'zscore':
+            mean = grouped.mean()
+            # ddof=1 como Series.std; un grupo de una fila no tiene dispersión
+            std = grouped.std(ddof=1).fillna(0.0)
+            lower, upper = mean - threshold * std, mean + threshold * std
+        else:
+            q = [0.25, 0.75] if method == 'iqr' else list(limits)
+            quantiles = grouped.quantile(q)
+            lower = quantiles.xs(q[0], level=-1)
+            upper = quantiles.xs(q[1], level=-1)
             if method == 'iqr':
-                Q1 = df_clean[col].quantile(0.25)
-                Q3 = df_clean[col].quantile(0.75)
-                IQR = Q3 - Q1
-                lower_bound = Q1 - threshold * IQR
-                upper_bound = Q3 + threshold * IQR
-                
-                outliers = df_clean[(df_clean[col] < lower_bound) | (df_clean[col] > upper_bound)]
-                
-                if len(outliers) > 0:
-                    print(f"  - {col}: {len(outliers)} outliers detectados")
-                    # Reemplazar outliers con límites
-                    df_clean[col] = df_clean[col].clip(lower_bound, upper_bound)
-            
-            elif method == 'zscore':
-                z_scores = np.abs((df_clean[col] - df_clean[col].mean()) / df_clean[col].std())
-                outliers = df_clean[z_scores > threshold]
-                
-                if len(outliers) > 0:
-                    print(f"  - {col}: {len(outliers)} outliers detectados")
-        
-        print(" Outliers tratados")
-        return df_clean
+                iqr = upper - lower
+                lower, upper = lower - threshold * iqr, upper + threshold * iqr
+        index = pd.RangeIndex(n_groups)
+        return (lower.reindex(index).to_numpy(dtype=float).T,
+                upper.reindex(index).to_numpy(dtype=float).T)
     
-    def encode_categorical(self, df, columns=None, method='label'):
+    def encode_categorical(self, df, columns=None, method='label', target=None,
+                           n_features=1024, smoothing=10.0, n_folds=5, sparse_output=False):
         """
         Codifica variables categóricas.
         
+        Los métodos 'hash', 'frequency' y 'target' están pensados para columnas
+        de alta cardinalidad (Product ID, Customer ID, City...): el ancho de la
+        salida no depende del número de categorías. Sus mapas se guardan en el
+        estado (self.state['encoders']), de modo que save()/load() y
+        transform() los reutilizan en inferencia.
+        
         Args:
             df (pd.DataFrame): Dataset a procesar
             columns (list): Columnas a codificar (None = todas categóricas)
-            method (str): 'label' o 'onehot'
+            method (str): 'label', 'onehot', 'hash', 'frequency' o 'target'
+            target (str or array-like): Target para 'target' (nombre de columna o valores)
+            n_features (int): Ancho de la matriz dispersa para 'hash'
+            smoothing (float): Suavizado hacia la media global para 'target'
+            n_folds (int): Folds out-of-fold para 'target'
+            sparse_output (bool): Con 'onehot', generar columnas dispersas
+                (sin densificar) y guardar las categorías en el estado
             
         Returns:
             pd.DataFrame: Dataset con variables codificadas
@@ -159,6 +375,7 @@ class DataPreprocessor:
         
         if columns is None:
             columns = df_encoded.select_dtypes(include=['object']).columns
+        columns = list(columns)
         
         print(f"\n Codificando variables categóricas con método: {method}")
         
@@ -169,13 +386,67 @@ class DataPreprocessor:
                 self.label_encoders[col] = le
                 print(f"  - {col}: {len(le.classes_)} categorías")
         
+        elif method == 'onehot' and sparse_output:
+            encoder = OneHotEncoder(columns).fit(df_encoded)
+            self._register_encoder(encoder)
+            df_encoded = self._append_sparse(df_encoded, encoder)
+            print(f"  - {len(columns)} columnas en {len(encoder.feature_names)} indicadoras (dispersas)")
+        
         elif method == 'onehot':
             df_encoded = pd.get_dummies(df_encoded, columns=columns, drop_first=True)
             print(f"  - {len(columns)} columnas codificadas con One-Hot Encoding")
         
+        elif method == 'hash':
+            encoder = HashingEncoder(columns, n_features=n_features)
+            self._register_encoder(encoder)
+            df_encoded = self._append_sparse(df_encoded, encoder)
+            print(f"  - {len(columns)} columnas en {n_features} columnas hash (dispersas)")
+        
+        elif method in ('frequency', 'target'):
+            if method == 'target':
+                if target is None:
+                    raise ValueError("El método 'target' necesita el target")
+                y = df_encoded[target] if isinstance(target, str) else target
+                encoder = TargetEncoder(columns, smoothing=smoothing, n_folds=n_folds).fit(df_encoded, y)
+                # Valores out-of-fold para entrenar sin filtrar el target
+                encoded = encoder.oof_
+            else:
+                encoder = FrequencyEncoder(columns).fit(df_encoded)
+                encoded = encoder.transform_columns({col: df_encoded[col].to_numpy(dtype=object)
+                                                     for col in columns})
+            self._register_encoder(encoder)
+            for col in columns:
+                df_encoded[col] = encoded[col]
+                print(f"  - {col}: {len(encoder.maps[col]['keys'])} categorías")
+        
+        else:
+            raise ValueError(f"Método de codificación no soportado: {method}")
+        
         print(" Variables categóricas codificadas")
         return df_encoded
     
+    def _register_encoder(self, encoder):
+        """Añade un codificador ajustado al estado para reutilizarlo en transform()."""
+        if self.state is None:
+            self.state = {'impute': {}, 'clip': {}, 'labels': {}, 'scale': {}}
+        self.state.setdefault('encoders', []).append(encoder.to_dict())
+        self._encoder_objects().append(encoder)
+    
+    def _encoder_objects(self):
+        """Codificadores del estado, reconstruidos una sola vez."""
+        specs = (self.state or {}).get('encoders', [])
+        if self._encoders is None or len(self._encoders) > len(specs):
+            self._encoders = [encoder_from_dict(spec) for spec in specs]
+        return self._encoders
+    
+    @staticmethod
+    def _append_sparse(df, encoder):
+        """Sustituye las columnas de un codificador hash/one-hot por sus columnas dispersas."""
+        hashed = pd.DataFrame.sparse.from_spmatrix(
+            encoder.transform_sparse(df), index=df.index, columns=encoder.feature_names
+        )
+        return pd.concat([df.drop(columns=encoder.columns), hashed], axis=1)
+    
     def scale_features(self, df, columns=None, method='standard'):
         """
         Escala variables numéricas.
@@ -206,6 +477,489 @@ class DataPreprocessor:
         
         return df_scaled
     
+    def fit(self, df, impute_strategy='auto', clip_columns=None, clip_threshold=1.5,
+            categorical_columns=None, scale_columns=None, scale_method='standard',
+            hash_columns=None, hash_features=1024, onehot_columns=None, frequency_columns=None,
+            target_columns=None, target=None, target_smoothing=10.0):
+        """
+        Aprende el estado de preprocesamiento para reutilizarlo en inferencia.
+        
+        Cada etapa se ajusta sobre la salida de la anterior (imputación ->
+        recorte IQR -> codificadores de alta cardinalidad -> codificación ->
+        escalado). El estado resultante
+        (self.state) contiene solo listas y números, por lo que se guarda
+        como un único JSON con save() y se aplica sin reajustar con
+        transform() o transform_columns().
+        
+        Args:
+            df (pd.DataFrame): Dataset de entrenamiento
+            impute_strategy (str): 'auto' (mediana/moda) o None para no imputar
+            clip_columns (list): Columnas a recortar por IQR (None = todas numéricas, [] = ninguna)
+            clip_threshold (float): Multiplicador del IQR
+            categorical_columns (list): Columnas a codificar (None = todas categóricas)
+            scale_columns (list): Columnas a escalar (None = todas numéricas, [] = ninguna)
+            scale_method (str): 'standard' o 'minmax'
+            hash_columns (list): Columnas para feature hashing (matriz dispersa)
+            hash_features (int): Ancho de la matriz hash
+            onehot_columns (list): Columnas a codificar con one-hot disperso
+            frequency_columns (list): Columnas a codificar por frecuencia
+            target_columns (list): Columnas a codificar por media del target
+            target (str or array-like): Target para target_columns
+            target_smoothing (float): Suavizado del target encoding
+            
+        Returns:
+            DataPreprocessor: self
+        """
+        numeric = list(df.select_dtypes(include=[np.number]).columns)
+        categorical = list(df.select_dtypes(include=['object', 'category', 'string']).columns)
+        state = {'impute': {}, 'clip': {}, 'labels': {}, 'scale': {}}
+        self.state = state
+        self._encoders = None
+        
+        if isinstance(target, str):
+            target_name, target = target, df[target]
+            numeric = [col for col in numeric if col != target_name]
+        encoded = set(hash_columns or []) | set(onehot_columns or [])
+        encoded |= set(frequency_columns or []) | set(target_columns or [])
+        if categorical_columns is None:
+            categorical = [col for col in categorical if col not in encoded]
+        
+        print("\n Ajustando preprocesador...")
+        
+        if impute_strategy == 'auto':
+            for col in numeric:
+                median = df[col].median()
+                state['impute'][col] = float(median) if pd.notna(median) else 0.0
+            for col in categorical:
+                mode = df[col].mode()
+                state['impute'][col] = str(mode.iloc[0]) if len(mode) else 'Unknown'
+        elif impute_strategy is not None:
+            raise ValueError(f"Estrategia de imputación no soportada: {impute_strategy}")
+        df_fit = self.transform(df, verbose=False)
+        
+        clip_columns = list(numeric if clip_columns is None else clip_columns)
+        if clip_columns:
+            lower, upper = self._outlier_bounds(
+                df_fit[clip_columns].to_numpy(dtype=float, na_value=np.nan).T, 'iqr', clip_threshold
+            )
+            for col, lo, hi in zip(clip_columns, lower, upper):
+                if not np.isnan(lo):
+                    state['clip'][col] = [float(lo), float(hi)]
+        df_fit = self.transform(df_fit, verbose=False)
+        
+        # Se registran al final: las etapas siguientes ya reciben las columnas codificadas
+        encoders = []
+        if hash_columns:
+            encoders.append(HashingEncoder(hash_columns, n_features=hash_features))
+        if onehot_columns:
+            encoders.append(OneHotEncoder(onehot_columns).fit(df_fit))
+        if frequency_columns:
+            encoders.append(FrequencyEncoder(frequency_columns).fit(df_fit))
+        if target_columns:
+            if target is None:
+                raise ValueError("target_columns necesita el target")
+            encoders.append(TargetEncoder(target_columns, smoothing=target_smoothing)
+                            .fit(df_fit, target))
+        for encoder in encoders:
+            if hasattr(encoder, 'transform_sparse'):
+                df_fit = self._append_sparse(df_fit, encoder)
+            else:
+                df_fit = df_fit.assign(**encoder.transform_columns(
+                    {col: df_fit[col].to_numpy(dtype=object) for col in encoder.columns}))
+        
+        for col in (categorical if categorical_columns is None else categorical_columns):
+            state['labels'][col] = sorted(df_fit[col].dropna().astype(str).unique().tolist())
+        df_fit = self.transform(df_fit, verbose=False)
+        
+        columns = numeric if scale_columns is None else list(scale_columns)
+        if columns:
+            values = df_fit[columns].to_numpy(dtype=float, na_value=np.nan)
+            if scale_method == 'standard':
+                center = np.nanmean(values, axis=0)
+                scale = np.nanstd(values, axis=0)
+            elif scale_method == 'minmax':
+                center = np.nanmin(values, axis=0)
+                scale = np.nanmax(values, axis=0) - center
+            else:
+                raise ValueError(f"Método de escalado no soportado: {scale_method}")
+            scale = np.where(scale == 0, 1.0, scale)
+            state['scale'] = {
+                'method': scale_method,
+                'columns': columns,
+                'center': center.tolist(),
+                'scale': scale.tolist()
+            }
+        
+        for encoder in encoders:
+            self._register_encoder(encoder)
+        
+        print(f"  - Imputación: {len(state['impute'])} columnas")
+        print(f"  - Recorte IQR: {len(state['clip'])} columnas")
+        print(f"  - Codificación: {len(state['labels'])} columnas")
+        if encoded:
+            print(f"  - Hash/one-hot/frecuencia/target: {len(encoded)} columnas")
+        print(f"  - Escalado: {len(state['scale'].get('columns', []))} columnas")
+        print(" Preprocesador ajustado")
+        return self
+    
+    def transform_columns(self, columns):
+        """
+        Aplica el estado aprendido a columnas NumPy, sin pandas.
+        
+        Pensado para inferencia: recibe un lote como diccionario de arrays
+        (o listas) y aplica imputación, recorte, codificación y escalado de
+        forma vectorizada. Las categorías no vistas en fit se codifican como -1.
+        
+        Args:
+            columns (dict): Nombre de columna -> array o lista de valores
+            
+        Returns:
+            dict: Columnas transformadas (las no afectadas se devuelven igual)
+        """
+        if self.state is None:
+            raise ValueError("El preprocesador no está ajustado; llama a fit() o load()")
+        
+        state = self.state
+        out = dict(columns)
+        
+        for col, value in state['impute'].items():
+            if col not in out:
+                continue
+            values = np.asarray(out[col])
+            if isinstance(value, str):
+                values = values.astype(object)
+                missing = np.array([v is None or v != v for v in values], dtype=bool)
+            else:
+                values = values.astype(float)
+                missing = np.isnan(values)
+            if missing.any():
+                values = values.copy()
+                values[missing] = value
+            out[col] = values
+        
+        for col, (lower, upper) in state['clip'].items():
+            if col in out:
+                out[col] = np.clip(np.asarray(out[col], dtype=float), lower, upper)
+        
+        for encoder in self._encoder_objects():
+            if not all(col in out for col in encoder.columns):
+                continue
+            out.update(encoder.transform_columns(out))
+            if hasattr(encoder, 'transform_sparse'):
+                for col in encoder.columns:
+                    del out[col]
+        
+        for col, classes in state['labels'].items():
+            if col not in out:
+                continue
+            labels = np.asarray(out[col]).astype(str)
+            classes = np.asarray(classes, dtype=str)
+            if len(classes) == 0:
+                out[col] = np.full(len(labels), -1, dtype=np.int64)
+                continue
+            idx = np.minimum(np.searchsorted(classes, labels), len(classes) - 1)
+            out[col] = np.where(classes[idx] == labels, idx, -1)
+        
+        scale = state['scale']
+        for col, center, factor in zip(scale.get('columns', []), scale.get('center', []),
+                                       scale.get('scale', [])):
+            if col in out:
+                out[col] = (np.asarray(out[col], dtype=float) - center) / factor
+        
+        return out
+    
+    def input_columns(self, feature_names):
+        """
+        Columnas de entrada necesarias para obtener feature_names con transform_columns.
+        
+        Las columnas que generan los codificadores hash y one-hot (por ejemplo
+        'Ciudad_hash_3') no llegan en los datos crudos: se sustituyen por las
+        columnas originales de las que salen.
+        
+        Args:
+            feature_names (list): Features en el orden que espera el modelo
+            
+        Returns:
+            list: Columnas crudas a leer de cada fila
+        """
+        wanted = set(feature_names)
+        produced, sources = set(), []
+        for encoder in self._encoder_objects():
+            if hasattr(encoder, 'transform_sparse') and wanted.intersection(encoder.feature_names):
+                produced.update(encoder.feature_names)
+                sources.extend(col for col in encoder.columns if col not in sources)
+        columns = [f for f in feature_names if f not in produced]
+        return columns + [col for col in sources if col not in columns]
+    
+    def transform(self, df, verbose=True):
+        """
+        Aplica el estado aprendido en fit() a un DataFrame.
+        
+        Usa transform_columns, de modo que entrenamiento e inferencia
+        comparten exactamente la misma transformación.
+        
+        Args:
+            df (pd.DataFrame): Dataset a transformar
+            verbose (bool): Mostrar mensajes
+            
+        Returns:
+            pd.DataFrame: Dataset transformado
+        """
+        if self.state is None:
+            raise ValueError("El preprocesador no está ajustado; llama a fit() o load()")
+        
+        encoders = self._encoder_objects()
+        used = set(self.state['impute']) | set(self.state['clip']) | set(self.state['labels'])
+        used |= set(self.state['scale'].get('columns', []))
+        used |= {col for encoder in encoders for col in encoder.columns}
+        used = [col for col in df.columns if col in used]
+        
+        columns = {}
+        for col in used:
+            if pd.api.types.is_numeric_dtype(df[col]):
+                columns[col] = df[col].to_numpy(dtype=float, na_value=np.nan)
+            else:
+                columns[col] = df[col].to_numpy(dtype=object)
+        
+        # Hash y one-hot se aplican aparte, como columnas dispersas
+        sparse_encoders = [e for e in encoders if hasattr(e, 'transform_sparse')
+                           and all(c in columns for c in e.columns)]
+        self._encoders = [e for e in encoders if e not in sparse_encoders]
+        try:
+            transformed = self.transform_columns(columns)
+        finally:
+            self._encoders = encoders
+        
+        df_transformed = df.copy()
+        for col, values in transformed.items():
+            df_transformed[col] = values
+        for encoder in sparse_encoders:
+            encoder_input = {col: transformed[col] for col in encoder.columns}
+            df_transformed = self._append_sparse(df_transformed.assign(**encoder_input), encoder)
+        
+        if verbose:
+            print(f" {len(used)} columnas transformadas con el estado ajustado")
+        return df_transformed
+    
+    def fit_transform(self, df, **fit_params):
+        """
+        Ajusta el preprocesador y transforma el mismo dataset.
+        
+        Args:
+            df (pd.DataFrame): Dataset de entrenamiento
+            **fit_params: Parámetros de fit()
+            
+        Returns:
+            pd.DataFrame: Dataset transformado
+        """
+        df_transformed = self.fit(df, **fit_params).transform(df)
+        
+        # El target encoding de entrenamiento usa los valores out-of-fold
+        for encoder in self._encoder_objects():
+            for col, values in getattr(encoder, 'oof_', {}).items():
+                if col in df_transformed.columns:
+                    df_transformed[col] = values
+        return df_transformed
+    
+    def transform_sparse(self, df, exclude=None, verbose=True):
+        """
+        Aplica el estado aprendido y devuelve una matriz CSR con su índice de features.
+        
+        Las columnas de los codificadores hash y one-hot se pasan a la matriz
+        sin densificarse, de modo que miles de indicadoras no ocupan n_filas x
+        n_columnas en memoria. Se incluyen las columnas numéricas, booleanas y
+        dispersas; el resto (fechas, texto sin codificar) se omite.
+        
+        Args:
+            df (pd.DataFrame): Dataset a transformar
+            exclude (list): Columnas a dejar fuera (por ejemplo, el target)
+            verbose (bool): Mostrar mensajes
+        
+        Returns:
+            tuple: (scipy.sparse.csr_matrix, lista de nombres de features)
+        """
+        df_transformed = self.transform(df, verbose=verbose)
+        exclude = set(exclude or [])
+        columns = [
+            col for col in df_transformed.columns
+            if col not in exclude and (
+                pd.api.types.is_numeric_dtype(df_transformed[col])
+                or pd.api.types.is_bool_dtype(df_transformed[col])
+            )
+        ]
+        X, feature_names = to_sparse_matrix(df_transformed, columns)
+        
+        if verbose:
+            print(f" Matriz dispersa: {X.shape[0]} x {X.shape[1]} "
+                  f"({X.nnz:,} valores no nulos, densidad {X.nnz / max(1, X.shape[0] * X.shape[1]):.2%})")
+        return X, feature_names
+
+    def save(self, filepath):
+        """
+        Guarda el estado ajustado como un único archivo JSON.
+        
+        Args:
+            filepath (str): Ruta donde guardar
+        """
+        if self.state is None:
+            print(" El preprocesador no está ajustado")
+            return
+        
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump(self.to_state(), f)
+        print(f" Preprocesador guardado en: {filepath}")
+    
+    @classmethod
+    def load(cls, filepath):
+        """
+        Carga un preprocesador guardado con save().
+        
+        Args:
+            filepath (str): Ruta del archivo
+            
+        Returns:
+            DataPreprocessor: Preprocesador listo para transform()
+        """
+        with open(filepath, 'r', encoding='utf-8') as f:
+            return cls.from_state(json.load(f))
+    
+    def to_state(self):
+        """
+        Devuelve el estado ajustado con su versión (el contenido de save()).
+        
+        Returns:
+            dict: Estado serializable en JSON
+        """
+        if self.state is None:
+            raise ValueError("El preprocesador no está ajustado")
+        return {'version': self.STATE_VERSION, **self.state}
+    
+    @classmethod
+    def from_state(cls, state):
+        """
+        Reconstruye un preprocesador a partir de to_state().
+        
+        Args:
+            state (dict): Estado con su versión
+            
+        Returns:
+            DataPreprocessor: Preprocesador listo para transform()
+        """
+        state = dict(state)
+        version = state.pop('version', None)
+        if version != cls.STATE_VERSION:
+            raise ValueError(f"Versión de estado no soportada: {version}")
+        
+        preprocessor = cls()
+        preprocessor.state = state
+        return preprocessor
+    
+    def optimize_memory(self, df, categorical_columns=None, max_category_ratio=0.5,
+                        float_rtol=1e-6, inplace=False, verbose=True):
+        """
+        Reduce la memoria del dataset cambiando cada columna al tipo más pequeño seguro.
+        
+        - Enteros: al menor int/uint (o Int nullable) que contiene su rango.
+        - Reales: a float32 si el error relativo de la conversión no supera
+          float_rtol; si todos los valores son enteros (sin nulos), a entero.
+        - Texto: a category si la columna está en categorical_columns o si la
+          proporción de valores distintos no supera max_category_ratio.
+        
+        El informe por columna queda en self.memory_report.
+        
+        Args:
+            df (pd.DataFrame): Dataset a optimizar
+            categorical_columns (list): Columnas de texto a convertir siempre
+                (por defecto LOW_CARDINALITY_COLUMNS)
+            max_category_ratio (float): Máximo de valores únicos / filas para category
+            float_rtol (float): Error relativo máximo al pasar a float32 (0 = sin pérdida)
+            inplace (bool): Modificar df directamente
+            verbose (bool): Mostrar el resumen
+            
+        Returns:
+            pd.DataFrame: Dataset optimizado
+        """
+        if categorical_columns is None:
+            categorical_columns = LOW_CARDINALITY_COLUMNS
+        categorical_columns = set(categorical_columns)
+        
+        df_opt = df if inplace else df.copy()
+        before = df_opt.memory_usage(deep=True, index=False)
+        dtypes_before = df_opt.dtypes.astype(str)
+        
+        for col in df_opt.columns:
+            series = df_opt[col]
+            dtype = series.dtype
+            
+            if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_datetime64_any_dtype(dtype) \
+                    or isinstance(dtype, pd.CategoricalDtype):
+                continue
+            
+            if pd.api.types.is_integer_dtype(dtype):
+                df_opt[col] = self._downcast_integer(series)
+            elif pd.api.types.is_float_dtype(dtype):
+                df_opt[col] = self._downcast_float(series, float_rtol)
+            elif pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype):
+                n_unique = series.nunique(dropna=True)
+                if col in categorical_columns or n_unique <= max_category_ratio * max(len(series), 1):
+                    df_opt[col] = series.astype('category')
+        
+        after = df_opt.memory_usage(deep=True, index=False)
+        report = pd.DataFrame({
+            'dtype_before': dtypes_before,
+            'dtype_after': df_opt.dtypes.astype(str),
+            'bytes_before': before,
+            'bytes_after': after
+        })
+        report['saved_pct'] = (1 - report['bytes_after'] / report['bytes_before'].where(report['bytes_before'] > 0)) * 100
+        self.memory_report = report
+        
+        if verbose:
+            total_before, total_after = before.sum(), after.sum()
+            changed = (report['dtype_before'] != report['dtype_after']).sum()
+            print("\n Optimizando memoria...")
+            print(f"  - Columnas convertidas: {changed} de {len(report)}")
+            print(f"  - Memoria: {total_before / 1024**2:.2f} MB -> {total_after / 1024**2:.2f} MB "
+                  f"({(1 - total_after / max(total_before, 1)) * 100:.1f}% menos)")
+        
+        return df_opt
+    
+    @staticmethod
+    def _downcast_integer(series):
+        """Menor tipo entero (con signo o sin signo) que contiene el rango de la columna."""
+        nullable = pd.api.types.is_extension_array_dtype(series.dtype)
+        if series.isna().all():
+            return series
+        lo, hi = series.min(), series.max()
+        candidates = ('uint8', 'uint16', 'uint32', 'uint64') if lo >= 0 else ('int8', 'int16', 'int32', 'int64')
+        for name in candidates:
+            info = np.iinfo(name)
+            if info.min <= lo and hi <= info.max:
+                # Los enteros nullable conservan NA con su variante (UInt8, Int16...)
+                if nullable:
+                    target = 'UInt' + name[4:] if name.startswith('u') else 'Int' + name[3:]
+                else:
+                    target = name
+                return series.astype(target) if str(series.dtype) != target else series
+        return series
+    
+    def _downcast_float(self, series, float_rtol):
+        """float32 si la pérdida de precisión es aceptable; entero si todos son enteros."""
+        values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+        finite = np.isfinite(values)
+        if (finite.all() and len(values) and np.abs(values).max() < 2**53
+                and np.array_equal(values, np.round(values))):
+            return self._downcast_integer(series.astype(np.int64))
+        
+        if series.dtype == np.float32:
+            return series
+        converted = values.astype(np.float32)
+        error = np.abs(converted[finite].astype(np.float64) - values[finite])
+        tolerance = float_rtol * np.abs(values[finite])
+        if np.all(error <= tolerance):
+            return series.astype(np.float32)
+        return series
+    
     def get_preprocessing_summary(self, df_original, df_processed):
         """
         Muestra un resumen del preprocesamiento.
@@ -0,0 +1,350 @@
+"""
+Rolling Module
+==============
+Motor de ventanas móviles que calcula varias estadísticas y varios tamaños
+de ventana en una sola pasada.
+
+Con Numba instalado, un único recorrido de la serie calcula las cuatro
+estadísticas de todas las ventanas (sumas móviles compensadas y deques
+monótonos para max/min). Sin Numba se usa NumPy puro, con una serie de
+operaciones vectorizadas por ventana:
+
+- mean/std: sumas de valores y de cuadrados por bloques del tamaño de la
+  ventana, de modo que el error numérico depende del tamaño de la ventana y
+  no de la longitud de la serie.
+- max/min: algoritmo de van Herk/Gil-Werman (O(n) por ventana).
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+ROLLING_STATS = ('mean', 'std', 'max', 'min')
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _kahan_add(total, compensation, value):
+        """Suma compensada (Kahan) para las sumas móviles."""
+        y = value - compensation
+        t = total + y
+        return t, (t - total) - y
+
+    @njit(cache=True)
+    def _rolling_windows_numba(values, windows, block=4096):
+        """
+        Media, desviación estándar, máximo y mínimo de todas las ventanas en un recorrido.
+
+        La serie se recorre una sola vez, por bloques que caben en caché; en
+        cada bloque avanzan todas las ventanas, cada una con su estado: sumas
+        móviles con compensación de Kahan al añadir y quitar valores, y deques
+        monótonos (buffers circulares del tamaño de la ventana) para máximo y
+        mínimo. values son valores centrados sin NaN.
+
+        Returns:
+            np.ndarray: (4, n_ventanas, n) con mean, std, max y min
+        """
+        n = len(values)
+        k = len(windows)
+        out = np.full((4, k, n), np.nan)
+        # Capacidad potencia de 2: la posición en el buffer es contador & mask
+        capacity = 1
+        while capacity < windows.max() + 1:
+            capacity *= 2
+        mask = capacity - 1
+        dq_max = np.empty((k, capacity), dtype=np.int64)
+        dq_min = np.empty((k, capacity), dtype=np.int64)
+        # Contadores absolutos de cabeza y cola de cada deque
+        head_max = np.zeros(k, dtype=np.int64)
+        tail_max = np.zeros(k, dtype=np.int64)
+        head_min = np.zeros(k, dtype=np.int64)
+        tail_min = np.zeros(k, dtype=np.int64)
+        total = np.zeros(k)
+        comp = np.zeros(k)
+        total_sq = np.zeros(k)
+        comp_sq = np.zeros(k)
+
+        # Bloques que caben en caché: cada bloque se lee de memoria una vez y
+        # todas las ventanas avanzan sobre él antes de pasar al siguiente
+        for start in range(0, n, block):
+            stop = min(start + block, n)
+            for j in range(k):
+                window = windows[j]
+                # Vistas 1D de la ventana: el bucle interno no indexa por j
+                q_max, q_min = dq_max[j], dq_min[j]
+                o_mean, o_std, o_max, o_min = out[0, j], out[1, j], out[2, j], out[3, j]
+                t, c = total[j], comp[j]
+                t_sq, c_sq = total_sq[j], comp_sq[j]
+                h_max, e_max = head_max[j], tail_max[j]
+                h_min, e_min = head_min[j], tail_min[j]
+                for i in range(start, stop):
+                    x = values[i]
+                    t, c = _kahan_add(t, c, x)
+                    t_sq, c_sq = _kahan_add(t_sq, c_sq, x * x)
+                    if i >= window:
+                        old = values[i - window]
+                        t, c = _kahan_add(t, c, -old)
+                        t_sq, c_sq = _kahan_add(t_sq, c_sq, -old * old)
+
+                    while e_max > h_max and values[q_max[(e_max - 1) & mask]] <= x:
+                        e_max -= 1
+                    q_max[e_max & mask] = i
+                    e_max += 1
+                    if q_max[h_max & mask] <= i - window:
+                        h_max += 1
+                    while e_min > h_min and values[q_min[(e_min - 1) & mask]] >= x:
+                        e_min -= 1
+                    q_min[e_min & mask] = i
+                    e_min += 1
+                    if q_min[h_min & mask] <= i - window:
+                        h_min += 1
+
+                    if i >= window - 1:
+                        o_mean[i] = t / window
+                        if window > 1:
+                            var = (t_sq - t * t / window) / (window - 1)
+                            o_std[i] = np.sqrt(var) if var > 0.0 else 0.0
+                        o_max[i] = values[q_max[h_max & mask]]
+                        o_min[i] = values[q_min[h_min & mask]]
+                total[j], comp[j] = t, c
+                total_sq[j], comp_sq[j] = t_sq, c_sq
+                head_max[j], tail_max[j] = h_max, e_max
+                head_min[j], tail_min[j] = h_min, e_min
+
+        return out
+
+
+def _sliding_sum(values, window):
+    """
+    Suma móvil en O(n) con sumas acumuladas por bloques del tamaño de la ventana.
+
+    Con bloques de tamaño window, la fila i - window cae siempre en el bloque
+    anterior al de i, así que la suma de la ventana es el acumulado de i en
+    su bloque más lo que resta del bloque anterior. Los acumulados nunca
+    superan un bloque, por lo que el error no crece con la longitud de la serie.
+
+    Args:
+        values (np.ndarray): Valores float64 sin NaN, 1D o 2D (filas = series)
+        window (int): Tamaño de la ventana
+
+    Returns:
+        np.ndarray: Suma de la ventana que termina en cada posición (NaN si incompleta)
+    """
+    values = np.atleast_2d(values)
+    k, n = values.shape
+    out = np.full((k, n), np.nan)
+    if n < window:
+        return out
+
+    pad = (-n) % window
+    if pad:
+        values = np.concatenate([values, np.zeros((k, pad))], axis=1)
+    local = np.cumsum(values.reshape(k, -1, window), axis=2)
+    # Lo que resta de cada bloque tras la posición: total del bloque - acumulado
+    remaining = np.subtract(local[:, :, -1:], local).reshape(k, -1)
+    local = local.reshape(k, -1)
+
+    out[:, window - 1] = local[:, window - 1]
+    np.add(local[:, window:n], remaining[:, :n - window], out=out[:, window:])
+    return out
+
+
+def _sliding_reduce(values, window, ufunc, fill):
+    """
+    Máximo o mínimo móvil en O(n) con NumPy puro.
+
+    Divide el array en bloques del tamaño de la ventana y combina el
+    acumulado hacia delante y hacia atrás de cada bloque (van Herk/Gil-Werman).
+
+    Args:
+        values (np.ndarray): Valores float64 sin NaN
+        window (int): Tamaño de la ventana
+        ufunc (np.ufunc): np.maximum o np.minimum
+        fill (float): Valor neutro para rellenar el último bloque
+
+    Returns:
+        np.ndarray: Resultado para la ventana que termina en cada fila
+    """
+    n = len(values)
+    out = np.full(n, np.nan)
+    if n < window:
+        return out
+
+    pad = (-n) % window
+    padded = np.concatenate([values, np.full(pad, fill)])
+    prefix = ufunc.accumulate(padded.reshape(-1, window), axis=1).ravel()
+    # Acumulado hacia atrás: invertir una sola vez en memoria contigua
+    suffix = ufunc.accumulate(padded[::-1].reshape(-1, window), axis=1).ravel()[::-1]
+    out[window - 1:] = ufunc(suffix[:n - window + 1], prefix[window - 1:n])
+    return out
+
+
+def _rolling_window_numpy(values, window, stats):
+    """
+    Estadísticas de una ventana con NumPy puro (valores centrados sin NaN).
+
+    Returns:
+        dict: estadística -> np.ndarray
+    """
+    n = len(values)
+    results = {}
+
+    if 'mean' in stats or 'std' in stats:
+        if 'std' in stats:
+            # Sumas de valores y de cuadrados en una sola pasada
+            window_sum, window_sq = _sliding_sum(np.vstack([values, values * values]), window)
+        else:
+            window_sum = _sliding_sum(values, window)[0]
+        if 'mean' in stats:
+            results['mean'] = window_sum / window
+        if 'std' in stats:
+            if window > 1:
+                # var = (sum(x²) - sum(x)² / n) / (n - 1), calculado en el lugar
+                window_sum *= window_sum
+                window_sum /= window
+                np.subtract(window_sq, window_sum, out=window_sq)
+                np.maximum(window_sq, 0.0, out=window_sq)
+                window_sq /= window - 1
+                results['std'] = np.sqrt(window_sq, out=window_sq)
+            else:
+                results['std'] = np.full(n, np.nan)
+
+    if 'max' in stats:
+        results['max'] = _sliding_reduce(values, window, np.maximum, -np.inf)
+    if 'min' in stats:
+        results['min'] = _sliding_reduce(values, window, np.minimum, np.inf)
+
+    return results
+
+
+def rolling_stats(values, windows, stats=ROLLING_STATS, positions=None, use_numba=True):
+    """
+    Calcula estadísticas móviles para todas las ventanas en una pasada
+    (con Numba; con NumPy, una serie de operaciones vectorizadas por ventana).
+
+    Igual que pandas con min_periods=window: una ventana incompleta o que
+    contiene algún NaN produce NaN. La desviación estándar usa ddof=1.
+
+    Args:
+        values (array-like): Serie de valores
+        windows (list): Tamaños de ventana en filas
+        stats (tuple): Subconjunto de 'mean', 'std', 'max', 'min'
+        positions (np.ndarray): Posición de cada fila dentro de su serie; las
+            ventanas que empiezan en otra serie quedan a NaN (None = una serie)
+        use_numba (bool): Usar el kernel Numba si está disponible
+
+    Returns:
+        dict: (estadística, ventana) -> np.ndarray
+    """
+    unknown = set(stats) - set(ROLLING_STATS)
+    if unknown:
+        raise ValueError(f"Estadísticas no soportadas: {sorted(unknown)}")
+
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    missing = np.isnan(values)
+    has_missing = missing.any()
+    clean = np.where(missing, 0.0, values) if has_missing else values
+
+    # Valores centrados para reducir la cancelación numérica de la varianza
+    shift = clean.mean() if n else 0.0
+    centered = np.where(missing, 0.0, clean - shift) if has_missing else clean - shift
+    if has_missing:
+        cmissing = np.concatenate([[0], np.cumsum(missing)])
+
+    kernel = None
+    if use_numba and NUMBA_AVAILABLE and len(windows):
+        # Un solo recorrido de la serie para todas las ventanas
+        kernel = _rolling_windows_numba(centered, np.asarray(windows, dtype=np.int64))
+
+    results = {}
+    for j, window in enumerate(windows):
+        # Ventanas incompletas ya salen a NaN; solo se enmascaran NaN y cambios de serie
+        invalid = None
+        if has_missing:
+            end = np.arange(window, n + 1)
+            invalid = np.zeros(n, dtype=bool)
+            invalid[window - 1:] = (cmissing[end] - cmissing[end - window]) > 0
+        if positions is not None:
+            crossing = positions < window - 1
+            invalid = crossing if invalid is None else invalid | crossing
+
+        if kernel is not None:
+            window_stats = dict(zip(ROLLING_STATS, kernel[:, j]))
+        else:
+            window_stats = _rolling_window_numpy(centered, window, stats)
+
+        for stat in stats:
+            result = window_stats[stat]
+            if stat != 'std':
+                result += shift
+            results[(stat, window)] = result
+
+        if invalid is not None:
+            for stat in stats:
+                results[(stat, window)][invalid] = np.nan
+
+    return results
+
+
+def benchmark_rolling(n_rows=10_000_000, windows=(7, 30), seed=42):
+    """
+    Compara el motor de una pasada con pandas (cuatro .rolling por ventana).
+
+    Args:
+        n_rows (int): Tamaño de la serie sintética
+        windows (tuple): Tamaños de ventana
+        seed (int): Semilla aleatoria
+
+    Returns:
+        dict: Tiempos en segundos y aceleración
+    """
+    rng = np.random.default_rng(seed)
+    values = rng.gamma(2.0, 100.0, n_rows)
+    series = pd.Series(values)
+
+    print(f"\n Benchmark rolling: {n_rows:,} filas, ventanas {list(windows)}")
+
+    start = time.perf_counter()
+    expected = {}
+    for window in windows:
+        rolling = series.rolling(window=window)
+        for stat in ROLLING_STATS:
+            expected[(stat, window)] = getattr(rolling, stat)().to_numpy()
+    pandas_time = time.perf_counter() - start
+
+    # Primera llamada fuera del cronómetro para compilar el kernel Numba
+    rolling_stats(values[:1000], windows)
+    start = time.perf_counter()
+    results = rolling_stats(values, windows)
+    engine_time = time.perf_counter() - start
+
+    max_error = max(
+        np.nanmax(np.abs(results[key] - expected[key]) / np.maximum(np.abs(expected[key]), 1.0))
+        for key in expected
+    )
+
+    print(f"  - pandas: {pandas_time:.3f} s")
+    print(f"  - rolling_stats ({'numba' if NUMBA_AVAILABLE else 'numpy'}): {engine_time:.3f} s")
+    print(f"  - Aceleración: {pandas_time / engine_time:.1f}x")
+    print(f"  - Error relativo máximo: {max_error:.2e}")
+
+    return {
+        'pandas_s': pandas_time,
+        'engine_s': engine_time,
+        'speedup': pandas_time / engine_time,
+        'max_rel_error': max_error
+    }
+
+
+# Ejemplo de uso
+if __name__ == "__main__":
+    benchmark_rolling()
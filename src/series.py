@@ -0,0 +1,385 @@
+"""
+Series Module
+=============
+Materializa series temporales densas a partir de las filas de pedidos.
+
+train.csv tiene una fila por línea de pedido, con días sin ventas para
+muchas combinaciones de Category/Region/Segment. materialize_series() las
+convierte, con una sola pasada vectorizada (códigos de serie y de periodo +
+np.bincount), en una matriz (n_series x n_periodos) sin huecos, diaria,
+semanal o mensual, que puede escribirse como .npy y abrirse como memmap.
+
+Sobre esa matriz compacta se agregan niveles más gruesos de la jerarquía
+(aggregate), se cambia la frecuencia (resample) y se calculan ventanas
+móviles de todas las series a la vez (rolling_features).
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from data_loader import DATE_FORMAT
+from rolling import ROLLING_STATS, rolling_stats
+
+
+# Frecuencia -> frecuencia de pandas Period ('W' = semanas que terminan en domingo)
+FREQUENCIES = {'D': 'D', 'W': 'W', 'M': 'M'}
+AGGREGATIONS = ('sum', 'count', 'mean')
+TOTAL_LABEL = 'Total'
+
+
+class SalesSeries:
+    """Matriz densa de series (filas) por periodos (columnas) con sus etiquetas."""
+
+    def __init__(self, values, keys, start, freq='D', value_column='Sales', agg='sum'):
+        """
+        Inicializa las series.
+
+        Args:
+            values (np.ndarray): Matriz (n_series, n_periodos); puede ser un memmap
+            keys (pd.DataFrame): Una fila por serie con sus valores de cada nivel
+            start (pd.Period or str): Primer periodo
+            freq (str): 'D', 'W' o 'M'
+            value_column (str): Columna agregada
+            agg (str): Agregación usada ('sum', 'count' o 'mean')
+        """
+        if freq not in FREQUENCIES:
+            raise ValueError(f"Frecuencia no soportada: {freq}. Opciones: {list(FREQUENCIES)}")
+        if values.shape[0] != len(keys):
+            raise ValueError(f"{values.shape[0]} series y {len(keys)} etiquetas")
+
+        self.values = values
+        self.keys = keys.reset_index(drop=True)
+        self.freq = freq
+        self.start = pd.Period(start, freq=FREQUENCIES[freq])
+        self.value_column = value_column
+        self.agg = agg
+
+    @property
+    def levels(self):
+        return list(self.keys.columns)
+
+    @property
+    def periods(self):
+        return pd.period_range(self.start, periods=self.values.shape[1], freq=FREQUENCIES[self.freq])
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def labels(self):
+        """Etiqueta de texto de cada serie ('Furniture / West', o 'Total')."""
+        if not self.levels:
+            return [TOTAL_LABEL] * len(self.keys)
+        return self.keys.astype(str).agg(' / '.join, axis=1).tolist()
+
+    def series(self, **key_values):
+        """
+        Devuelve una serie concreta como pd.Series indexada por fecha.
+
+        Args:
+            **key_values: Valor de cada nivel, p. ej. series(Category='Furniture')
+                (los nombres con espacios o guiones se pasan con **{'Sub-Category': ...})
+
+        Returns:
+            pd.Series: Valores de la serie
+        """
+        mask = np.ones(len(self.keys), dtype=bool)
+        for level, value in key_values.items():
+            if level not in self.keys.columns:
+                raise ValueError(f"Nivel desconocido: {level}. Niveles: {self.levels}")
+            mask &= (self.keys[level] == value).to_numpy()
+        rows = np.flatnonzero(mask)
+        if len(rows) != 1:
+            raise ValueError(f"{len(rows)} series coinciden con {key_values}")
+        return pd.Series(np.asarray(self.values[rows[0]]), index=self.periods.to_timestamp(),
+                         name=self.labels()[rows[0]])
+
+    def to_frame(self):
+        """
+        Formato largo: una fila por (serie, periodo), útil para gráficos.
+
+        Returns:
+            pd.DataFrame: Niveles, 'date' (inicio del periodo) y la columna de valores
+        """
+        n_series, n_periods = self.values.shape
+        frame = self.keys.iloc[np.repeat(np.arange(n_series), n_periods)].reset_index(drop=True)
+        frame['date'] = np.tile(self.periods.to_timestamp().to_numpy(), n_series)
+        frame[self.value_column] = np.asarray(self.values).ravel()
+        return frame
+
+    def aggregate(self, levels=()):
+        """
+        Suma las series a un nivel más grueso de la jerarquía.
+
+        Args:
+            levels (list): Subconjunto de self.levels ([] = serie total)
+
+        Returns:
+            SalesSeries: Series agregadas
+        """
+        if self.agg == 'mean':
+            raise ValueError("Las medias no se pueden agregar sumando; materializa con 'sum'")
+        levels = [levels] if isinstance(levels, str) else list(levels)
+        unknown = [level for level in levels if level not in self.levels]
+        if unknown:
+            raise ValueError(f"Niveles desconocidos: {unknown}. Niveles: {self.levels}")
+
+        if levels:
+            grouped = self.keys.groupby(levels, sort=True, observed=True)
+            codes = grouped.ngroup().to_numpy()
+            keys = grouped.size().reset_index()[levels]
+        else:
+            codes = np.zeros(len(self.keys), dtype=np.int64)
+            keys = pd.DataFrame(index=range(1))
+
+        # Matriz de suma (n_grupos x n_series) dispersa: un producto para todos los periodos
+        n_series = len(self.keys)
+        summing = sparse.csr_matrix(
+            (np.ones(n_series), (codes, np.arange(n_series))), shape=(len(keys), n_series)
+        )
+        values = np.asarray(summing @ np.asarray(self.values), dtype=self.values.dtype)
+        return SalesSeries(values, keys, self.start, self.freq, self.value_column, self.agg)
+
+    def resample(self, freq):
+        """
+        Cambia a una frecuencia más gruesa sumando los periodos.
+
+        Cada periodo de origen debe caer entero dentro de un periodo de
+        destino: D -> W, D -> M y W -> W son válidos, pero W -> M no, porque
+        una semana que cruza un cambio de mes no se puede asignar a uno solo.
+        Para series mensuales, materializa desde los datos diarios.
+
+        Args:
+            freq (str): 'W' o 'M'
+
+        Returns:
+            SalesSeries: Series con la nueva frecuencia
+        """
+        if self.agg == 'mean':
+            raise ValueError("Las medias no se pueden reagrupar sumando; materializa con 'sum'")
+        if freq not in FREQUENCIES:
+            raise ValueError(f"Frecuencia no soportada: {freq}. Opciones: {list(FREQUENCIES)}")
+
+        target = self.periods.start_time.to_period(FREQUENCIES[freq]).asi8
+        target_end = self.periods.end_time.to_period(FREQUENCIES[freq]).asi8
+        if np.any(target != target_end):
+            raise ValueError(f"Los periodos {self.freq} no encajan en periodos {freq}; "
+                             f"materializa la serie desde datos diarios")
+        starts = np.flatnonzero(np.r_[True, target[1:] != target[:-1]])
+        if len(starts) > 1 and np.any(np.diff(target[starts]) != 1):
+            raise ValueError(f"No se puede pasar de {self.freq} a {freq}")
+        values = np.add.reduceat(np.asarray(self.values), starts, axis=1)
+        start = pd.Period(ordinal=int(target[0]), freq=FREQUENCIES[freq])
+        return SalesSeries(values, self.keys, start, freq, self.value_column, self.agg)
+
+    def rolling_features(self, windows=(7, 30), stats=ROLLING_STATS):
+        """
+        Ventanas móviles de todas las series en una sola llamada.
+
+        La matriz se recorre fila a fila como un único vector; las ventanas
+        que cruzan de una serie a otra quedan a NaN (ver rolling.rolling_stats).
+
+        Args:
+            windows (list): Tamaños de ventana en periodos
+            stats (tuple): Subconjunto de 'mean', 'std', 'max', 'min'
+
+        Returns:
+            dict: (estadística, ventana) -> matriz (n_series, n_periodos)
+        """
+        n_series, n_periods = self.values.shape
+        positions = np.tile(np.arange(n_periods), n_series)
+        results = rolling_stats(np.asarray(self.values, dtype=np.float64).ravel(), windows,
+                                stats=stats, positions=positions)
+        return {key: values.reshape(n_series, n_periods) for key, values in results.items()}
+
+    def save(self, directory):
+        """
+        Guarda la matriz como values.npy y las etiquetas en series.json.
+
+        Args:
+            directory (str): Carpeta de destino
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        values_file = directory / 'values.npy'
+        if isinstance(self.values, np.memmap) and Path(self.values.filename) == values_file.resolve():
+            # Ya es el memmap de esta carpeta
+            self.values.flush()
+        else:
+            np.save(values_file, np.asarray(self.values))
+        _write_metadata(directory, self.keys, self.start, self.freq, self.value_column, self.agg)
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        """
+        Carga series guardadas con save() o materialize_series(path=...).
+
+        Args:
+            directory (str): Carpeta de las series
+            mmap_mode (str): Modo de np.load ('r' = memmap de solo lectura, None = en memoria)
+
+        Returns:
+            SalesSeries: Series cargadas
+        """
+        directory = Path(directory)
+        with open(directory / 'series.json', 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        keys = pd.DataFrame(meta['keys'], columns=meta['levels'])
+        if not meta['levels']:
+            keys = pd.DataFrame(index=range(meta['n_series']))
+        values = np.load(directory / 'values.npy', mmap_mode=mmap_mode)
+        return cls(values, keys, meta['start'], meta['freq'], meta['value_column'], meta['agg'])
+
+
+def _write_metadata(directory, keys, start, freq, value_column, agg):
+    """Escribe series.json con las etiquetas y el eje temporal."""
+    meta = {
+        'levels': list(keys.columns),
+        'keys': keys.astype(object).where(keys.notna(), None).to_dict(orient='list'),
+        'n_series': len(keys),
+        'start': str(start),
+        'freq': freq,
+        'value_column': value_column,
+        'agg': agg
+    }
+    with open(Path(directory) / 'series.json', 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2, default=str)
+
+
+def materialize_series(df, levels=('Category',), value_column='Sales', date_column='Order Date',
+                       freq='D', agg='sum', start=None, end=None, dtype=np.float64, path=None,
+                       block_series=256):
+    """
+    Convierte filas de pedidos en series densas (n_series x n_periodos) sin huecos.
+
+    Cada fila recibe un código de serie (un único groupby().ngroup sobre los
+    niveles) y un código de periodo (ordinal del Period menos el primero);
+    la matriz se llena con np.bincount sobre código_serie * n_periodos +
+    código_periodo. Los periodos sin ventas valen 0 con 'sum'/'count' y NaN
+    con 'mean'. Las filas con fecha o nivel nulo se descartan.
+
+    Con path, la matriz se escribe directamente en path/values.npy por
+    bloques de block_series series y se devuelve abierta como memmap, así la
+    memoria pico no depende del número de series.
+
+    Args:
+        df (pd.DataFrame): Filas de pedidos
+        levels (list): Columnas que definen cada serie ([] = serie total)
+        value_column (str): Columna a agregar
+        date_column (str): Columna de fecha
+        freq (str): 'D', 'W' o 'M'
+        agg (str): 'sum', 'count' o 'mean'
+        start (str): Primer periodo (por defecto, la primera fecha)
+        end (str): Último periodo (por defecto, la última fecha)
+        dtype: Tipo de la matriz
+        path (str): Carpeta donde guardar la matriz como memmap (opcional)
+        block_series (int): Series por bloque al escribir en path
+
+    Returns:
+        SalesSeries: Series materializadas
+    """
+    if freq not in FREQUENCIES:
+        raise ValueError(f"Frecuencia no soportada: {freq}. Opciones: {list(FREQUENCIES)}")
+    if agg not in AGGREGATIONS:
+        raise ValueError(f"Agregación no soportada: {agg}. Opciones: {AGGREGATIONS}")
+    levels = [levels] if isinstance(levels, str) else list(levels)
+    period_freq = FREQUENCIES[freq]
+
+    dates = df[date_column]
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates, format=DATE_FORMAT, errors='coerce')
+    ordinals = dates.dt.to_period(period_freq).array.asi8
+    valid = dates.notna().to_numpy(copy=True)
+
+    if levels:
+        grouped = df.groupby(levels, sort=True, observed=True)
+        series_codes = grouped.ngroup().to_numpy()
+        keys = grouped.size().reset_index()[levels]
+        valid &= series_codes >= 0
+    else:
+        series_codes = np.zeros(len(df), dtype=np.int64)
+        keys = pd.DataFrame(index=range(1))
+
+    first = pd.Period(start, freq=period_freq).ordinal if start is not None else ordinals[valid].min()
+    last = pd.Period(end, freq=period_freq).ordinal if end is not None else ordinals[valid].max()
+    valid &= (ordinals >= first) & (ordinals <= last)
+    n_series, n_periods = len(keys), int(last - first) + 1
+
+    values = df[value_column].to_numpy(dtype=np.float64, na_value=np.nan)
+    present = valid & ~np.isnan(values)
+    # Ordenar por serie permite llenar la matriz por bloques de series
+    order = np.argsort(series_codes[present], kind='stable')
+    codes = series_codes[present][order]
+    cells = codes * n_periods + (ordinals[present][order] - first)
+    weights = values[present][order]
+
+    if path is not None:
+        directory = Path(path)
+        directory.mkdir(parents=True, exist_ok=True)
+        matrix = np.lib.format.open_memmap(directory / 'values.npy', mode='w+', dtype=dtype,
+                                           shape=(n_series, n_periods))
+    else:
+        matrix = np.empty((n_series, n_periods), dtype=dtype)
+
+    bounds = np.searchsorted(codes, np.arange(0, n_series + block_series, block_series))
+    for block, lo in enumerate(range(0, n_series, block_series)):
+        hi = min(lo + block_series, n_series)
+        rows = slice(bounds[block], bounds[block + 1])
+        local = cells[rows] - lo * n_periods
+        size = (hi - lo) * n_periods
+        counts = np.bincount(local, minlength=size)
+        if agg == 'count':
+            block_values = counts.astype(np.float64)
+        else:
+            block_values = np.bincount(local, weights=weights[rows], minlength=size)
+            if agg == 'mean':
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    block_values = np.where(counts > 0, block_values / counts, np.nan)
+        matrix[lo:hi] = block_values.reshape(hi - lo, n_periods)
+
+    result = SalesSeries(matrix, keys, pd.Period(ordinal=int(first), freq=period_freq),
+                         freq, value_column, agg)
+    if path is not None:
+        matrix.flush()
+        _write_metadata(path, result.keys, result.start, freq, value_column, agg)
+        del matrix
+        result = SalesSeries.load(path)
+
+    print(f" Series materializadas: {n_series} series x {n_periods} periodos ({freq}, {agg})"
+          f"{f' en {path}' if path is not None else ''}")
+    return result
+
+
+def materialize_hierarchy(df, hierarchy, value_column='Sales', date_column='Order Date',
+                          freq='D', path=None):
+    """
+    Series de varios niveles de una jerarquía a partir de un único pivot.
+
+    Se materializa solo el nivel más detallado (la unión de columnas de todos
+    los niveles) y el resto se obtiene sumando sus filas con
+    SalesSeries.aggregate, sin volver a recorrer los pedidos.
+
+    Args:
+        df (pd.DataFrame): Filas de pedidos
+        hierarchy (list): Niveles, p. ej. [[], ['Category'], ['Category', 'Region']]
+        value_column (str): Columna a sumar
+        date_column (str): Columna de fecha
+        freq (str): 'D', 'W' o 'M'
+        path (str): Carpeta para el nivel más detallado como memmap (opcional)
+
+    Returns:
+        dict: tupla de niveles -> SalesSeries
+    """
+    hierarchy = [[level] if isinstance(level, str) else list(level) for level in hierarchy]
+    bottom = list(dict.fromkeys(col for level in hierarchy for col in level))
+    base = materialize_series(df, bottom, value_column, date_column, freq, agg='sum', path=path)
+    return {tuple(level): base if level == bottom else base.aggregate(level) for level in hierarchy}
+
+
+# Ejemplo de uso
+if __name__ == "__main__":
+    print(" Módulo series.py listo para usar")
@@ -0,0 +1,363 @@
+"""
+Tuning Module
+=============
+Búsqueda de hiperparámetros con poda temprana para los modelos de models.py.
+
+- Búsqueda aleatoria sobre un espacio de parámetros (listas o distribuciones
+  de scipy.stats con .rvs, igual que RandomizedSearchCV).
+- Successive halving e Hyperband sobre n_estimators o sobre la fracción de
+  datos de entrenamiento: las configuraciones malas se descartan con poco
+  presupuesto y solo las mejores llegan al presupuesto completo.
+- Los trials se ejecutan en un pool de procesos que comparte los datos como
+  memmap y se guardan en disco (JSON lines), así que una búsqueda
+  interrumpida se reanuda sin repetir lo ya evaluado.
+"""
+
+import hashlib
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from models import MODEL_TYPES, build_model, regression_metrics
+
+
+def sample_params(param_space, n_samples, random_state=42):
+    """
+    Muestrea configuraciones de un espacio de parámetros.
+
+    Args:
+        param_space (dict): Nombre -> lista de valores o distribución con .rvs
+        n_samples (int): Configuraciones a generar
+        random_state (int): Semilla aleatoria
+
+    Returns:
+        list: Lista de diccionarios de parámetros
+    """
+    rng = np.random.default_rng(random_state)
+    samples = []
+    for _ in range(n_samples):
+        params = {}
+        for name, space in sorted(param_space.items()):
+            if hasattr(space, 'rvs'):
+                value = space.rvs(random_state=int(rng.integers(2**31 - 1)))
+            else:
+                value = space[int(rng.integers(len(space)))]
+            # Tipos nativos para que la configuración sea serializable en JSON
+            params[name] = value.item() if isinstance(value, np.generic) else value
+        samples.append(params)
+    return samples
+
+
+def _run_trial(model_type, params, resource, resource_value, data_paths, n_jobs, random_state):
+    """
+    Entrena y puntúa una configuración con un presupuesto dado.
+
+    Se ejecuta en un proceso trabajador; los datos se abren como memmap de
+    solo lectura. En XGBoost se usa early stopping sobre el conjunto de
+    validación y se guarda cuántos árboles usó el modelo puntuado.
+
+    Returns:
+        dict: RMSE de validación, métricas, tiempo y árboles usados (XGBoost)
+    """
+    from threadpoolctl import threadpool_limits
+
+    X_train, y_train, X_val, y_val = (np.load(path, mmap_mode='r') for path in data_paths)
+    params = dict(params)
+
+    if resource == 'n_estimators':
+        params['n_estimators'] = int(resource_value)
+    elif resource == 'data_fraction':
+        n_rows = max(1, int(len(X_train) * resource_value))
+        rows = np.sort(np.random.default_rng(random_state).permutation(len(X_train))[:n_rows])
+        X_train, y_train = X_train[rows], y_train[rows]
+
+    fit_params = {}
+    if model_type == 'xgboost':
+        params.setdefault('early_stopping_rounds', 10)
+        fit_params = {'eval_set': [(X_val, y_val)], 'verbose': False}
+
+    start = time.perf_counter()
+    with threadpool_limits(limits=n_jobs):
+        model = build_model(model_type, params, n_jobs=n_jobs)
+        model.fit(X_train, y_train, **fit_params)
+        metrics = regression_metrics(y_val, model.predict(X_val))
+
+    # predict() usa solo hasta la mejor iteración: ese es el modelo puntuado
+    best_iteration = getattr(model, 'best_iteration', None) if model_type == 'xgboost' else None
+    return {
+        'score': float(metrics['RMSE']),
+        'metrics': {k: float(v) for k, v in metrics.items()},
+        'wall_time_s': time.perf_counter() - start,
+        'best_n_estimators': int(best_iteration) + 1 if best_iteration is not None else None
+    }
+
+
+class HyperparameterSearch:
+    """Búsqueda de hiperparámetros con successive halving / Hyperband."""
+
+    METHODS = ('random', 'halving', 'hyperband')
+    RESOURCES = ('n_estimators', 'data_fraction')
+    # Modelos que aceptan n_estimators como presupuesto
+    TREE_MODELS = ('random_forest', 'xgboost')
+
+    def __init__(self, model='random_forest', param_space=None, n_trials=27,
+                 method='halving', resource=None, min_resource=None,
+                 max_resource=None, eta=3, n_workers=2, cache_dir='models/tuning',
+                 random_state=42):
+        """
+        Inicializa la búsqueda.
+
+        Args:
+            model (str): 'random_forest', 'xgboost' o 'linear_regression'
+            param_space (dict): Nombre -> lista de valores o distribución scipy
+            n_trials (int): Configuraciones iniciales (en Hyperband, las del bracket más agresivo)
+            method (str): 'random', 'halving' o 'hyperband'
+            resource (str): 'n_estimators' o 'data_fraction' (por defecto
+                'n_estimators' en modelos de árboles y 'data_fraction' en el resto)
+            min_resource (float): Presupuesto mínimo (por defecto 10 árboles o 10% de datos)
+            max_resource (float): Presupuesto máximo (por defecto 300 árboles o 100% de datos)
+            eta (int): Factor de reducción entre rondas
+            n_workers (int): Procesos en paralelo
+            cache_dir (str): Carpeta donde se guardan los trials completados
+            random_state (int): Semilla aleatoria
+        """
+        if model not in MODEL_TYPES:
+            raise ValueError(f"Tipo de modelo desconocido: {model}")
+        if method not in self.METHODS:
+            raise ValueError(f"Método no soportado: {method}. Opciones: {self.METHODS}")
+        if resource is None:
+            resource = 'n_estimators' if model in self.TREE_MODELS else 'data_fraction'
+        if resource not in self.RESOURCES:
+            raise ValueError(f"Recurso no soportado: {resource}. Opciones: {self.RESOURCES}")
+        if resource == 'n_estimators' and model not in self.TREE_MODELS:
+            raise ValueError(f"El recurso 'n_estimators' solo aplica a {self.TREE_MODELS}; "
+                             f"usa resource='data_fraction' con {model}")
+
+        self.model = model
+        self.param_space = param_space or {}
+        self.n_trials = n_trials
+        self.method = method
+        self.resource = resource
+        if resource == 'n_estimators':
+            self.min_resource = min_resource or 10
+            self.max_resource = max_resource or 300
+        else:
+            self.min_resource = min_resource or 0.1
+            self.max_resource = max_resource or 1.0
+        self.eta = eta
+        self.n_workers = n_workers
+        self.cache_dir = Path(cache_dir)
+        self.random_state = random_state
+
+        self.trials = []
+        self.best_params_ = None
+        self.best_score_ = None
+        self.best_n_estimators_ = None
+        self._cache = {}
+
+    def _cache_file(self):
+        return self.cache_dir / f'trials_{self.model}.jsonl'
+
+    def _load_cache(self):
+        """Lee los trials completados en ejecuciones anteriores."""
+        self._cache = {}
+        cache_file = self._cache_file()
+        if cache_file.exists():
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        trial = json.loads(line)
+                        self._cache[trial['key']] = trial
+
+    def _trial_key(self, params, resource_value):
+        payload = json.dumps([self.model, self.resource, resource_value, params, self._data_hash],
+                             sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode()).hexdigest()
+
+    def _budget(self, resource_value):
+        """Ajusta el presupuesto al tipo de recurso."""
+        if self.resource == 'n_estimators':
+            return int(round(resource_value))
+        return round(float(min(resource_value, self.max_resource)), 6)
+
+    def _max_rounds(self):
+        """Veces que cabe el factor eta entre el presupuesto mínimo y el máximo."""
+        return max(0, int(math.log(self.max_resource / self.min_resource, self.eta) + 1e-9))
+
+    def _evaluate(self, configs, resource_value, data_paths, executor):
+        """Evalúa configuraciones (desde caché o en el pool) con un presupuesto."""
+        budget = self._budget(resource_value)
+        n_jobs = max(1, (os.cpu_count() or 1) // self.n_workers)
+        keys = [self._trial_key(params, budget) for params in configs]
+
+        futures = {}
+        for key, params in zip(keys, configs):
+            if key not in self._cache and key not in futures:
+                futures[key] = executor.submit(
+                    _run_trial, self.model, params, self.resource, budget,
+                    data_paths, n_jobs, self.random_state
+                )
+
+        if futures:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+        for key, future in futures.items():
+            trial = {
+                'key': key,
+                'params': configs[keys.index(key)],
+                'resource': budget,
+                **future.result()
+            }
+            self._cache[key] = trial
+            # Guardar cada trial al terminar para poder reanudar
+            with open(self._cache_file(), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(trial) + '\n')
+
+        results = [self._cache[key] for key in keys]
+        self.trials.extend(results)
+        print(f"  - Presupuesto {budget}: {len(configs)} configuraciones "
+              f"({len(configs) - len(futures)} desde caché), mejor RMSE {min(r['score'] for r in results):.4f}")
+        return [r['score'] for r in results]
+
+    def _successive_halving(self, configs, min_resource, data_paths, executor):
+        """Evalúa, conserva el mejor 1/eta y multiplica el presupuesto por eta."""
+        resource_value = min_resource
+        while True:
+            scores = self._evaluate(configs, resource_value, data_paths, executor)
+            if len(configs) <= 1 or resource_value >= self.max_resource:
+                return configs, scores
+            n_keep = max(1, len(configs) // self.eta)
+            best = np.argsort(scores, kind='stable')[:n_keep]
+            configs = [configs[i] for i in best]
+            resource_value = min(resource_value * self.eta, self.max_resource)
+
+    def fit(self, X_train, y_train, X_val, y_val):
+        """
+        Ejecuta la búsqueda.
+
+        Args:
+            X_train: Features de entrenamiento
+            y_train: Target de entrenamiento
+            X_val: Features de validación (para puntuar y early stopping)
+            y_val: Target de validación
+
+        Returns:
+            HyperparameterSearch: self
+        """
+        arrays = [np.asarray(a, dtype=np.float64) for a in (X_train, y_train, X_val, y_val)]
+        self._data_hash = joblib.hash(arrays)
+        self._load_cache()
+        self.trials = []
+
+        print(f"\n Búsqueda de hiperparámetros ({self.method}) para {self.model}...")
+
+        with ProcessPoolExecutor(max_workers=self.n_workers) as executor:
+            tmp_dir = self.cache_dir / f'data_{self._data_hash[:12]}'
+            tmp_dir.mkdir(parents=True, exist_ok=True)
+            data_paths = []
+            for name, array in zip(('X_train', 'y_train', 'X_val', 'y_val'), arrays):
+                path = tmp_dir / f'{name}.npy'
+                if not path.exists():
+                    np.save(path, array)
+                data_paths.append(str(path))
+
+            try:
+                if self.method == 'random':
+                    configs = sample_params(self.param_space, self.n_trials, self.random_state)
+                    self._evaluate(configs, self.max_resource, data_paths, executor)
+                elif self.method == 'halving':
+                    # Rondas suficientes para que la última use el presupuesto máximo
+                    s = min(self._max_rounds(), int(math.log(self.n_trials, self.eta) + 1e-9))
+                    configs = sample_params(self.param_space, self.n_trials, self.random_state)
+                    self._successive_halving(configs, self.max_resource / self.eta ** s,
+                                             data_paths, executor)
+                else:
+                    # Hyperband: brackets que reparten el presupuesto entre
+                    # muchas configuraciones baratas o pocas caras
+                    s_max = self._max_rounds()
+                    for s in range(s_max, -1, -1):
+                        n_configs = int(math.ceil(self.n_trials * (s_max + 1) / (s + 1) / self.eta ** (s_max - s)))
+                        min_resource = self.max_resource / self.eta ** s
+                        print(f"  Bracket {s_max - s + 1}/{s_max + 1}: {n_configs} configuraciones")
+                        configs = sample_params(self.param_space, n_configs, self.random_state + s)
+                        self._successive_halving(configs, min_resource, data_paths, executor)
+            finally:
+                for path in data_paths:
+                    os.remove(path)
+                tmp_dir.rmdir()
+
+        # El ganador es el mejor trial con el presupuesto máximo
+        full_budget = self._budget(self.max_resource)
+        finalists = [t for t in self.trials if t['resource'] == full_budget] or self.trials
+        best = min(finalists, key=lambda t: t['score'])
+        self.best_params_ = best['params']
+        self.best_score_ = best['score']
+        self.best_n_estimators_ = best.get('best_n_estimators')
+
+        print(f" Mejor configuración (RMSE {self.best_score_:.4f}): {self.best_params_}")
+        return self
+
+    def results_table(self):
+        """
+        Devuelve los trials evaluados en esta búsqueda.
+
+        Una configuración muestreada de nuevo en otro bracket de Hyperband
+        aparece una sola vez por presupuesto.
+
+        Returns:
+            pd.DataFrame: Parámetros, presupuesto y RMSE por trial
+        """
+        trials = {t['key']: t for t in self.trials}
+        rows = [{**t['params'], 'resource': t['resource'], 'RMSE': t['score']} for t in trials.values()]
+        return pd.DataFrame(rows).sort_values(['resource', 'RMSE'], ascending=[False, True])
+
+    def apply_best(self, predictor, X_train, y_train, X_test, y_test, name=None):
+        """
+        Entrena el ganador con el presupuesto completo y lo registra en el predictor.
+
+        El modelo queda en predictor.models y sus métricas en
+        predictor.results, de modo que compare_models() lo incluye. En
+        XGBoost se reentrena sin early stopping (no hay conjunto de
+        validación) y con los árboles que usó el trial ganador, para que el
+        modelo entrenado sea la configuración que se puntuó.
+
+        Args:
+            predictor (SalesPredictor): Predictor donde registrar el modelo
+            X_train: Features de entrenamiento
+            y_train: Target de entrenamiento
+            X_test: Features de prueba
+            y_test: Target de prueba
+            name (str): Nombre del modelo (por defecto '<model> (tuned)')
+
+        Returns:
+            model: Modelo entrenado
+        """
+        if self.best_params_ is None:
+            raise ValueError("Ejecuta fit() antes de apply_best()")
+
+        name = name or f'{self.model} (tuned)'
+        params = dict(self.best_params_)
+        params.pop('early_stopping_rounds', None)
+        if self.best_n_estimators_ is not None:
+            params['n_estimators'] = self.best_n_estimators_
+        elif self.resource == 'n_estimators':
+            params['n_estimators'] = self._budget(self.max_resource)
+
+        print(f"\n Entrenando {name} con la mejor configuración...")
+        model = build_model(self.model, params, n_jobs=-1)
+        model.fit(X_train, y_train)
+
+        predictor.models[name] = model
+        predictor.evaluate_model(model, X_test, y_test, name)
+        return model
+
+
+# Ejemplo de uso
+if __name__ == "__main__":
+    print(" Módulo tuning.py listo para usar")
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LinearRegression
+
+from encoding import to_sparse_matrix
+from model_bundle import ModelBundle
+from preprocessing import DataPreprocessor
+
+
+@pytest.fixture
+def raw_frame():
+    rng = np.random.default_rng(0)
+    n = 300
+    return pd.DataFrame({
+        'City': rng.choice([f'city_{i}' for i in range(40)], n),
+        'Segment': rng.choice(['Consumer', 'Corporate', 'Home Office'], n),
+        'Quantity': rng.integers(1, 10, n).astype(float),
+        'Sales': rng.gamma(2.0, 50.0, n)
+    })
+
+
+@pytest.fixture
+def encoded_bundle(raw_frame, tmp_path):
+    features = raw_frame.drop(columns='Sales')
+    preprocessor = DataPreprocessor().fit(
+        features, clip_columns=[], scale_columns=[], hash_columns=['City'], hash_features=16,
+        onehot_columns=['Segment']
+    )
+    encoded = preprocessor.transform(features, verbose=False)
+    X, names = to_sparse_matrix(encoded)
+    model = LinearRegression().fit(X.toarray(), raw_frame['Sales'])
+
+    path = tmp_path / 'bundle.pkl'
+    ModelBundle(model, feature_names=names, preprocessor_state=preprocessor.to_state()).save(path)
+    return path, model, X.toarray()
+
+
+@pytest.fixture
+def client(encoded_bundle, monkeypatch):
+    from api import index
+
+    service = index.ModelService(encoded_bundle[0])
+    assert service.load()
+    monkeypatch.setattr(index, 'model_service', service)
+    monkeypatch.setattr(index, 'batcher', index.MicroBatcher(service.predict, max_rows=256))
+    return index.app.test_client()
+
+
+def test_raw_rows_with_hash_and_onehot_columns(client, encoded_bundle, raw_frame):
+    _, model, X = encoded_bundle
+    rows = raw_frame.drop(columns='Sales').head(20).to_dict('records')
+
+    response = client.post('/api/predict', json=rows)
+
+    assert response.status_code == 200, response.get_json()
+    expected = np.round(model.predict(X[:20]), 2)
+    np.testing.assert_allclose(response.get_json()['predictions'], expected, atol=0.011)
+
+
+def test_unseen_category_is_accepted(client, raw_frame):
+    row = raw_frame.drop(columns='Sales').iloc[0].to_dict()
+    row.update({'City': 'never_seen', 'Segment': 'never_seen'})
+
+    response = client.post('/api/predict', json=row)
+
+    assert response.status_code == 200, response.get_json()
+
+
+def test_missing_raw_column_is_rejected(client, raw_frame):
+    row = raw_frame.drop(columns=['Sales', 'City']).iloc[0].to_dict()
+
+    response = client.post('/api/predict', json=row)
+
+    assert response.status_code == 400
+    assert 'City' in response.get_json()['error']
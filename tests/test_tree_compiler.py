@@ -0,0 +1,131 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.tree import DecisionTreeRegressor
+
+from model_bundle import ModelBundle
+from tree_compiler import NUMBA_AVAILABLE, benchmark_latency, compile_model
+
+BACKENDS = ['numpy'] + (['numba'] if NUMBA_AVAILABLE else [])
+
+
+@pytest.fixture(scope='module')
+def data():
+    rng = np.random.default_rng(42)
+    X = rng.normal(size=(3000, 8))
+    y = X[:, 0] * 3 + np.sin(X[:, 1]) + rng.normal(scale=0.1, size=len(X))
+    X_nan = X.copy()
+    X_nan[rng.random(X.shape) < 0.05] = np.nan
+    return X, y, X_nan
+
+
+def _fit_with_nan(model, X_nan, y):
+    """Entrena con faltantes o salta si esta versión de scikit-learn no los admite."""
+    try:
+        return model.fit(X_nan, y)
+    except ValueError:
+        pytest.skip("scikit-learn sin soporte de NaN en árboles")
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_random_forest_parity(data, backend):
+    X, y, _ = data
+    model = RandomForestRegressor(n_estimators=30, max_depth=10, random_state=0).fit(X, y)
+    compiled = compile_model(model)
+
+    np.testing.assert_allclose(compiled.predict(X, backend=backend), model.predict(X),
+                               rtol=1e-5, atol=1e-6)
+    assert compiled.check_parity(model, X[:500], backend=backend)['ok']
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_decision_tree_parity(data, backend):
+    X, y, _ = data
+    model = DecisionTreeRegressor(max_depth=8, random_state=0).fit(X, y)
+
+    np.testing.assert_allclose(compile_model(model).predict(X, backend=backend), model.predict(X),
+                               rtol=1e-5, atol=1e-6)
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_random_forest_parity_with_missing_values(data, backend):
+    _, y, X_nan = data
+    model = _fit_with_nan(RandomForestRegressor(n_estimators=20, max_depth=8, random_state=0),
+                          X_nan, y)
+
+    np.testing.assert_allclose(compile_model(model).predict(X_nan, backend=backend),
+                               model.predict(X_nan), rtol=1e-5, atol=1e-6)
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_xgboost_parity_with_missing_values(data, backend):
+    xgb = pytest.importorskip('xgboost')
+    X, y, X_nan = data
+    model = xgb.XGBRegressor(n_estimators=60, max_depth=5, n_jobs=1, random_state=0).fit(X_nan, y)
+    compiled = compile_model(model)
+
+    for X_eval in (X, X_nan):
+        np.testing.assert_allclose(compiled.predict(X_eval, backend=backend), model.predict(X_eval),
+                                   rtol=1e-5, atol=1e-5)
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_xgboost_parity_uses_best_iteration(data, backend):
+    xgb = pytest.importorskip('xgboost')
+    X, y, X_nan = data
+    # Validación con ruido: el early stopping corta mucho antes de n_estimators
+    rng = np.random.default_rng(1)
+    X_val, y_val = X[:500], rng.normal(size=500)
+    model = xgb.XGBRegressor(n_estimators=300, max_depth=4, learning_rate=0.3, n_jobs=1,
+                             early_stopping_rounds=5, random_state=0)
+    model.fit(X_nan[500:], y[500:], eval_set=[(X_val, y_val)], verbose=False)
+    assert model.best_iteration < 299
+
+    compiled = compile_model(model)
+
+    assert compiled.n_trees == model.best_iteration + 1
+    np.testing.assert_allclose(compiled.predict(X_nan, backend=backend), model.predict(X_nan),
+                               rtol=1e-5, atol=1e-5)
+
+
+def test_wrong_width_is_rejected(data):
+    X, y, _ = data
+    compiled = compile_model(DecisionTreeRegressor(max_depth=3).fit(X, y))
+
+    with pytest.raises(ValueError):
+        compiled.predict(X[:, :3])
+
+
+def test_bundle_predicts_from_mapped_arrays(data, tmp_path):
+    X, y, _ = data
+    model = RandomForestRegressor(n_estimators=10, max_depth=6, random_state=0).fit(X, y)
+    path = tmp_path / 'bundle.pkl'
+    ModelBundle(model, compiled=compile_model(model)).save(path)
+
+    bundle = ModelBundle.load(path, mmap_mode='r')
+
+    assert isinstance(bundle.compiled.left.base, np.memmap)
+    np.testing.assert_allclose(bundle.predict(X[:100]), model.predict(X[:100]), rtol=1e-5, atol=1e-6)
+    # El estimador solo se deserializa si se pide
+    assert bundle._estimator is None
+    np.testing.assert_allclose(bundle.estimator.predict(X[:100]), model.predict(X[:100]))
+
+
+def test_native_is_faster_routes_large_batches(data):
+    X, y, _ = data
+    compiled = compile_model(DecisionTreeRegressor(max_depth=3).fit(X, y))
+
+    assert not compiled.native_is_faster(1)
+    assert compiled.native_is_faster(1_000_000)
+
+
+def test_benchmark_latency_reports_every_backend(data):
+    X, y, _ = data
+    model = RandomForestRegressor(n_estimators=5, max_depth=4, random_state=0).fit(X, y)
+
+    results = benchmark_latency(model, compile_model(model), X, batch_sizes=(1, 64), repeats=5)
+
+    assert [r['batch_size'] for r in results] == [1, 64]
+    for result in results:
+        assert set(result) == {'batch_size', 'sklearn/xgboost', *BACKENDS}
+        assert all(result[name] > 0 for name in BACKENDS)